@@ -1,8 +1,11 @@
+import os
+import copy
+import queue
+import atexit
 from time import time
 from datetime import datetime
 import logging
 from logging import (
-    FileHandler,
     StreamHandler,
     Formatter,
     getLogger,
@@ -11,10 +14,12 @@ from logging import (
     WARNING,
     ERROR,
 )
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 import pytz
 
 from .version import get_version
 from .config import Telegram
+from .log_broadcast import LogBroadcaster
 
 START_TIME = time()
 
@@ -27,6 +32,9 @@ __copyright__ = "Copyright 2026, Arctix Inc."
 DEBUG_MODE = Telegram.DEBUG_MODE
 IST = pytz.timezone("Asia/Kolkata")
 
+# in-memory tail of the log for /live-logs
+LOG_BROADCASTER = LogBroadcaster(Telegram.LOG_BUFFER_SIZE)
+
 
 class ISTFormatter(Formatter):
     def formatTime(self, record, datefmt=None):
@@ -34,6 +42,22 @@ class ISTFormatter(Formatter):
         return dt.strftime(datefmt or "%Y-%m-%d %I:%M:%S %p")
 
 
+class LoopQueueHandler(QueueHandler):
+    """
+    Only merges msg % args on the calling thread (the event loop);
+    time formatting, tracebacks and all I/O happen on the listener.
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+LOG_LISTENER = None
+
+
 LOG_FORMAT = (
     "[%(asctime)s] "
     "[%(levelname)s] "
@@ -44,6 +68,8 @@ LOG_FORMAT = (
 
 
 def setup_logging():
+    global LOG_LISTENER
+
     root = logging.getLogger()
 
     if root.handlers:
@@ -53,14 +79,35 @@ def setup_logging():
 
     formatter = ISTFormatter(LOG_FORMAT)
 
-    file_handler = FileHandler("log.txt", mode="w", encoding="utf-8")
+    file_handler = RotatingFileHandler(
+        "log.txt",
+        maxBytes=Telegram.LOG_MAX_MB * 1024 * 1024,
+        backupCount=Telegram.LOG_BACKUPS,
+        encoding="utf-8",
+    )
+    # a fresh log.txt per run, the previous one becomes log.txt.1
+    if os.path.getsize("log.txt") > 0:
+        file_handler.doRollover()
+
     stream_handler = StreamHandler()
 
     file_handler.setFormatter(formatter)
     stream_handler.setFormatter(formatter)
-
-    root.addHandler(file_handler)
-    root.addHandler(stream_handler)
+    LOG_BROADCASTER.setFormatter(formatter)
+
+    # callers only enqueue; the listener thread formats and writes
+    log_queue = queue.SimpleQueue()
+    root.addHandler(LoopQueueHandler(log_queue))
+
+    LOG_LISTENER = QueueListener(
+        log_queue,
+        file_handler,
+        stream_handler,
+        LOG_BROADCASTER,
+        respect_handler_level=True,
+    )
+    LOG_LISTENER.start()
+    atexit.register(stop_logging)
 
     noisy_loggers = {
         "requests": WARNING,
@@ -76,6 +123,30 @@ def setup_logging():
         getLogger(name).setLevel(level)
 
 
+def stop_logging():
+    """
+    Flush what is still queued and stop the listener thread.
+    """
+    global LOG_LISTENER
+
+    if LOG_LISTENER is not None:
+        LOG_LISTENER.stop()
+        LOG_LISTENER = None
+
+
+def set_log_level(name: str, level: str) -> int:
+    """
+    Runtime level change for one logger ("root" for the root logger).
+    Raises ValueError on an unknown level.
+    """
+    value = int(level) if level.isdigit() else logging.getLevelName(level.upper())
+    if not isinstance(value, int):
+        raise ValueError(f"unknown level {level!r}")
+
+    getLogger(None if name == "root" else name).setLevel(value)
+    return value
+
+
 def get_logger(name: str) -> logging.Logger:
     return logging.getLogger(name)
 
@@ -87,6 +158,9 @@ __all__ = (
     "__author__",
     "__license__",
     "setup_logging",
+    "stop_logging",
+    "set_log_level",
     "get_logger",
     "Telegram",
+    "LOG_BROADCASTER",
 )
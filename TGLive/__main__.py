@@ -11,9 +11,23 @@ from TGLive.helpers.playlist import VideoPlaylistManager
 from TGLive.helpers.playlist.stream_generator import PlaylistStreamGenerator
 from TGLive.helpers.database import MongoPlaylistStore
 from TGLive.helpers.encoding.hls import start_hls_runner, stop_all_hls
-from TGLive.helpers.encoding.cleaner import stop_cleaner
+from TGLive.helpers.encoding.segmenter import TSSegmenter
+from TGLive.helpers.encoding.store import get_memory_store
+from TGLive.helpers.encoding.splicer import TSSplicer
+from TGLive.helpers.encoding.slate import SourceSlate
+from TGLive.helpers.encoding.pacer import TSPacer
+from TGLive.helpers.encoding.abr import RenditionLadder
+from TGLive.helpers.encoding.cleaner import stop_cleaner, CLEANER_POOL
 from TGLive.helpers.process.stop_all import stop_all_ffmpeg
+from TGLive.helpers.process.resources import RESOURCES
+from TGLive.helpers.process.registry import FFMPEG_PROCS
 from TGLive.helpers.streaming.streamer import MultiClientStreamer
+from TGLive.helpers.streaming.options import StreamOptions
+from TGLive.helpers.streaming.fanout import TS_RINGS
+from TGLive.helpers.streaming.viewers import VIEWERS
+from TGLive.helpers.streaming.state import get_stream_state
+from TGLive.helpers.playlist.guide import CHANNEL_GUIDE
+from TGLive.helpers.metrics import BYTES_WRITTEN, STREAM_RESTARTS, WATCHDOG_TRIPS
 from TGLive.helpers.ext_utils import clean_hls_folder
 from TGLive.web.server import start_server, stop_server
 
@@ -26,7 +40,11 @@ def run_supdate():
     subprocess.run([os.sys.executable, "update.py"], check=False)
 
 
-async def run_stream_once(stream_name: str, chat_id: int, shutdown_event: asyncio.Event):
+async def run_stream_once(stream_name: str, chat_id: int, shutdown_event: asyncio.Event) -> bool:
+    """
+    Run the pipeline until it fails or (LAZY_STREAMS) goes idle.
+    Returns True when it was parked for lack of viewers.
+    """
     logger = get_logger(stream_name)
 
     worker_ids = list(ClientManager.multi_clients.keys())
@@ -35,10 +53,16 @@ async def run_stream_once(stream_name: str, chat_id: int, shutdown_event: asynci
 
     client = ClientManager.multi_clients[worker_ids[0]]
     store = MongoPlaylistStore(Telegram.DATABASE_URL, "TGLive2")
+    options = StreamOptions(stream_name, chat_id)
 
     manager = None
     ffmpeg = None
+    segmenter = None
+    ladder = None
+    producer_task = None
+    feed_task = None
     watchdog_task = None
+    idle_task = None
 
     manager = VideoPlaylistManager(
         client=client,
@@ -47,89 +71,301 @@ async def run_stream_once(stream_name: str, chat_id: int, shutdown_event: asynci
         auto_checker=True,
     )
     await manager.build()
+    CHANNEL_GUIDE.register(stream_name, manager)
 
     playlist_generator = PlaylistStreamGenerator(
         playlist_manager=manager,
         multi_streamer=MultiClientStreamer(),
         stream_name=stream_name,
+        options=options,
     )
 
     hls_dir = f"hls/{stream_name}"
-    last_activity = asyncio.get_running_loop().time()
+    splicer = TSSplicer(stream_name)
+    pacer = TSPacer(burst_seconds=Telegram.HLS_BURST_SEGMENTS * Telegram.HLS_TIME)
+    slate = SourceSlate(stream_name) if Telegram.SLATE_ENABLED else None
+
+    state = get_stream_state(stream_name)
+    state.pacer = pacer
+
+    loop = asyncio.get_running_loop()
+    last_activity = loop.time()
+    last_upstream = loop.time()
+
+    # upstream → feeder; bounded so pacing backpressures the download
+    queue: asyncio.Queue = asyncio.Queue(maxsize=16)
 
     async def watchdog():
-        nonlocal last_activity
+        # with a slate on air only a long upstream outage is a real failure
+        limit = Telegram.SLATE_MAX_SECONDS if slate else STREAM_STUCK_TIMEOUT
         while not shutdown_event.is_set():
             await asyncio.sleep(5)
-            if asyncio.get_running_loop().time() - last_activity > STREAM_STUCK_TIMEOUT:
+            now = loop.time()
+            if now - last_activity > STREAM_STUCK_TIMEOUT:
+                WATCHDOG_TRIPS.inc(stream_name, "no_ts")
                 raise RuntimeError("Stream stuck: no TS activity")
+            if now - last_upstream > limit:
+                WATCHDOG_TRIPS.inc(stream_name, "no_upstream")
+                raise RuntimeError("Stream stuck: no upstream data")
 
-    try:
-        ffmpeg = await start_hls_runner(
-            hls_dir=hls_dir,
-            stream_name=stream_name,
-        )
-        logger.info("[%s] FFmpeg started", stream_name)
+    async def idler():
+        idle_after = Telegram.LAZY_IDLE_MINUTES * 60
+        while not shutdown_event.is_set():
+            await asyncio.sleep(min(30, idle_after))
+            if VIEWERS.idle_for(stream_name) > idle_after:
+                logger.info(
+                    "[%s] no viewers for %.0f min, parking",
+                    stream_name,
+                    Telegram.LAZY_IDLE_MINUTES,
+                )
+                return
+
+    async def write_ts(chunk: bytes, from_slate: bool = False):
+        nonlocal last_activity
+        await pacer.pace(chunk)
+        if segmenter:
+            await segmenter.write(chunk)
+        else:
+            try:
+                ffmpeg.stdin.write(chunk)
+                ffmpeg.stdin.flush()
+            except (BrokenPipeError, OSError):
+                raise RuntimeError("FFmpeg pipe broken")
+        if ladder:
+            ladder.write(chunk)
 
-        watchdog_task = asyncio.create_task(watchdog())
+        BYTES_WRITTEN.inc(stream_name, amount=len(chunk))
 
-        async for video_id, ts_source in playlist_generator.iter_videos():
-            if shutdown_event.is_set():
-                break
+        # /live/<stream>.ts viewers (only while someone is connected); a
+        # raw TS can't signal the slate's parameter change, so they skip it
+        ring = TS_RINGS.get(stream_name)
+        if ring and ring.clients and not from_slate:
+            ring.push(chunk)
 
-            logger.info("[%s] Playing video %s", stream_name, video_id)
+        last_activity = loop.time()
 
-            async for chunk in ts_source:
-                if shutdown_event.is_set():
-                    break
-                try:
-                    ffmpeg.stdin.write(chunk)
-                    ffmpeg.stdin.flush()
-                    last_activity = asyncio.get_running_loop().time()
-                except (BrokenPipeError, OSError):
-                    raise RuntimeError("FFmpeg pipe broken")
+    async def produce():
+        try:
+            async for video_id, ts_source in playlist_generator.iter_videos():
+                await queue.put(("video", video_id))
+                async for chunk in ts_source:
+                    await queue.put(("data", chunk))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await queue.put(("error", e))
+
+    async def play_slate():
+        clip = await slate.clip()
+        if clip is None or not queue.empty():
+            return
+
+        logger.warning("[%s] upstream stalled, playing slate", stream_name)
+        state.set_status("slate")
+        await segmenter.mark_discontinuity()
+
+        while queue.empty() and not shutdown_event.is_set():
+            await write_ts(splicer.insert(clip), from_slate=True)
+            # never starve the producer, whatever write_ts blocks on
+            await asyncio.sleep(0)
+
+        # the splicer resumes the source on its next keyframe
+        await segmenter.mark_discontinuity()
+        state.set_status("playing")
+        logger.info("[%s] upstream resumed, leaving slate", stream_name)
+
+    async def feed():
+        nonlocal last_upstream
+        slate_after = Telegram.SLATE_AFTER_MS / 1000
+
+        while not shutdown_event.is_set():
+            try:
+                kind, item = await asyncio.wait_for(
+                    queue.get(),
+                    timeout=slate_after if slate else None,
+                )
+            except asyncio.TimeoutError:
+                await play_slate()
+                continue
+
+            last_upstream = loop.time()
+
+            if kind == "error":
+                raise item
+
+            if kind == "video":
+                logger.info("[%s] Playing video %s", stream_name, item)
+
+                # rebase timestamps so the runner sees one continuous timeline
+                splicer.begin_video()
+                if ladder:
+                    ladder.begin_video()
+                if slate:
+                    slate.begin_video()
+                if segmenter and Telegram.HLS_DISCONTINUITY and splicer.videos > 1:
+                    await segmenter.mark_discontinuity()
+                continue
+
+            data = splicer.process(item)
+            if data:
+                if slate:
+                    slate.feed(data)
+                await write_ts(data)
+
+    # thread shares for encoders depend on how many channels are live
+    RESOURCES.stream_started()
+
+    try:
+        segment_store = None
+
+        # CMAF needs the ffmpeg dash muxer; the python segmenter is TS only
+        if Telegram.HLS_SEGMENTER == "python" and options.output == "ts":
+            if Telegram.HLS_STORAGE == "memory":
+                # window + one extra segment for clients on the old playlist
+                segment_store = get_memory_store(
+                    stream_name, Telegram.HLS_LIST_SIZE + 2
+                )
+
+            segmenter = TSSegmenter(
+                hls_dir=hls_dir,
+                stream_name=stream_name,
+                target_duration=Telegram.HLS_TIME,
+                list_size=Telegram.HLS_LIST_SIZE,
+                store=segment_store,
+                part_duration=(
+                    Telegram.HLS_PART_TIME if Telegram.HLS_LOW_LATENCY else None
+                ),
+            )
+            await segmenter.start()
+        else:
+            if Telegram.HLS_STORAGE == "memory" or Telegram.HLS_LOW_LATENCY:
+                logger.warning(
+                    "[%s] HLS_STORAGE=memory / HLS_LOW_LATENCY need "
+                    "HLS_SEGMENTER=python, ignoring",
+                    stream_name,
+                )
+            ffmpeg = await start_hls_runner(
+                hls_dir=hls_dir,
+                stream_name=stream_name,
+                output=options.output,
+            )
+            logger.info("[%s] FFmpeg started", stream_name)
+
+            # the runner copies codecs and can't tag a discontinuity,
+            # so a slate with other parameters would break its output
+            if slate:
+                logger.warning(
+                    "[%s] slate needs HLS_SEGMENTER=python, disabled",
+                    stream_name,
+                )
+                slate = None
+
+        if options.abr or options.audio_only:
+            ladder = RenditionLadder(
+                stream_name=stream_name,
+                hls_dir=hls_dir,
+                names=options.renditions if options.abr else [],
+                store=segment_store,
+                audio_only=options.audio_only,
+            )
+            await ladder.start()
+
+        producer_task = asyncio.create_task(produce())
+        feed_task = asyncio.create_task(feed())
+        watchdog_task = asyncio.create_task(watchdog())
+        if Telegram.LAZY_STREAMS:
+            idle_task = asyncio.create_task(idler())
+
+        done, _ = await asyncio.wait(
+            {t for t in (feed_task, watchdog_task, idle_task) if t},
+            return_when=asyncio.FIRST_COMPLETED,
+        )
+        for task in done:
+            task.result()
+
+        return idle_task in done
 
     finally:
-        # stop watchdog
-        if watchdog_task:
-            watchdog_task.cancel()
+        # stop feeder, producer and watchdog
+        for task in (feed_task, producer_task, watchdog_task, idle_task):
+            if task and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except (asyncio.CancelledError, Exception):
+                    pass
 
         # 🔥 STOP AUTO-CHECKER TASKS (CRITICAL)
         if manager:
             await manager.stop()
 
+        # 🔥 STOP ABR / AUDIO RENDITIONS
+        if ladder:
+            await ladder.close()
+
+        # 🔥 STOP SEGMENTER
+        if segmenter:
+            await segmenter.close()
+
         # 🔥 STOP FFmpeg
         if ffmpeg:
             try:
                 if ffmpeg.stdin:
                     ffmpeg.stdin.close()
-                await asyncio.wait_for(ffmpeg.wait(), timeout=5)
+                await asyncio.wait_for(asyncio.to_thread(ffmpeg.wait), timeout=5)
             except Exception:
                 ffmpeg.kill()
+            FFMPEG_PROCS.discard(ffmpeg)
 
         # 🔥 STOP CLEANER FFmpeg
         await stop_cleaner(stream_name)
 
+        RESOURCES.stream_stopped()
+        state.pacer = None
+        state.set_status("stopped")
+
         logger.warning("[%s] Stream stopped", stream_name)
 
 
 async def start_stream(stream_index: int, chat_id: int, shutdown_event: asyncio.Event):
     stream_name = f"stream{stream_index}"
     logger = get_logger(stream_name)
+    state = get_stream_state(stream_name)
+    state.chat_id = chat_id
+
+    idle_after = Telegram.LAZY_IDLE_MINUTES * 60
 
     while not shutdown_event.is_set():
+        if Telegram.LAZY_STREAMS and VIEWERS.idle_for(stream_name) > idle_after:
+            # playlist position lives in the store (last started video);
+            # the last window stays served until new segments arrive
+            logger.info("[%s] Parked until the next viewer", stream_name)
+            state.set_status("parked")
+            try:
+                await VIEWERS.wait_for_viewer(stream_name)
+            except asyncio.CancelledError:
+                break
+            logger.info("[%s] Viewer arrived, resuming", stream_name)
+
         logger.warning("[%s] Starting stream", stream_name)
+        state.set_status("starting")
 
+        parked = False
         try:
-            await run_stream_once(stream_name, chat_id, shutdown_event)
+            parked = await run_stream_once(stream_name, chat_id, shutdown_event)
         except asyncio.CancelledError:
             break
         except Exception as e:
             logger.error("[%s] Stream crashed: %s", stream_name, e)
+            STREAM_RESTARTS.inc(stream_name)
+            state.restarts += 1
 
         if shutdown_event.is_set():
             break
 
+        if parked:
+            continue
+
         logger.warning("[%s] Restarting stream in %ss", stream_name, STREAM_RESTART_DELAY)
         await asyncio.sleep(STREAM_RESTART_DELAY)
 
@@ -147,6 +383,8 @@ async def main():
     web_runner = await start_server(port=Telegram.PORT)
     logger.info("Web server started on port %s", Telegram.PORT)
 
+    FFMPEG_PROCS.start_sampler(Telegram.PROC_SAMPLE_INTERVAL)
+
     await gather(
         ClientManager.start(),
         ClientManager.start_multi_clients(),
@@ -173,6 +411,8 @@ async def main():
             except asyncio.CancelledError:
                 pass
 
+        await FFMPEG_PROCS.stop_sampler()
+        await CLEANER_POOL.close()
         await stop_all_ffmpeg()
         await stop_server(web_runner)
         await ClientManager.stop()
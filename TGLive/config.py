@@ -1,3 +1,4 @@
+import json
 from os import getenv, path
 from dotenv import load_dotenv
 
@@ -55,6 +56,104 @@ class Telegram:
     ]
     
     DEBUG_MODE = getenv("DEBUG_MODE", "False").lower() == "true"
+    LOG_BUFFER_SIZE = int(getenv("LOG_BUFFER_SIZE", "5000"))  # /live-logs records
+    LOG_MAX_MB = int(getenv("LOG_MAX_MB", "20"))  # log.txt rotation size
+    LOG_BACKUPS = int(getenv("LOG_BACKUPS", "3"))
+
+    # HLS output
+    HLS_SEGMENTER = getenv("HLS_SEGMENTER", "python").lower()  # python | ffmpeg
+    HLS_TIME = float(getenv("HLS_TIME", "4"))
+    HLS_LIST_SIZE = int(getenv("HLS_LIST_SIZE", "6"))
+    HLS_STORAGE = getenv("HLS_STORAGE", "disk").lower()  # disk | memory
+    HLS_DISCONTINUITY = getenv("HLS_DISCONTINUITY", "False").lower() == "true"
+    # LL-HLS partial segments + blocking reload (python segmenter only)
+    HLS_LOW_LATENCY = getenv("HLS_LOW_LATENCY", "False").lower() == "true"
+    HLS_PART_TIME = float(getenv("HLS_PART_TIME", "1"))
+    # playlist micro-cache TTL and segment Cache-Control max-age (upper
+    # bound; never longer than the playlist window)
+    HLS_PLAYLIST_TTL = float(getenv("HLS_PLAYLIST_TTL", "0.5"))
+    HLS_SEGMENT_MAX_AGE = int(getenv("HLS_SEGMENT_MAX_AGE", "600"))
+    # segments produced faster than real time after a (re)start
+    HLS_BURST_SEGMENTS = int(getenv("HLS_BURST_SEGMENTS", "3"))
+
+    # ffmpeg CPU scheduling (see helpers/process/resources.py)
+    FFMPEG_RESERVED_CORES = int(getenv("FFMPEG_RESERVED_CORES", "1"))
+    FFMPEG_NICE = int(getenv("FFMPEG_NICE", "5"))
+    FFMPEG_IONICE = getenv("FFMPEG_IONICE", "True").lower() == "true"
+    FFMPEG_AFFINITY = getenv("FFMPEG_AFFINITY", "False").lower() == "true"
+
+    # /live/<stream>.ts fan-out
+    TS_FANOUT_BUFFER_MB = int(getenv("TS_FANOUT_BUFFER_MB", "8"))
+    TS_FANOUT_MAX_CLIENTS = int(getenv("TS_FANOUT_MAX_CLIENTS", "200"))
+    TS_FANOUT_WRITE_TIMEOUT = float(getenv("TS_FANOUT_WRITE_TIMEOUT", "10"))
+
+    # park channels nobody watches; the next request resumes them
+    LAZY_STREAMS = getenv("LAZY_STREAMS", "False").lower() == "true"
+    LAZY_IDLE_MINUTES = float(getenv("LAZY_IDLE_MINUTES", "10"))
+    # how long the first playlist request may wait for a waking channel
+    LAZY_WAKE_TIMEOUT = float(getenv("LAZY_WAKE_TIMEOUT", "15"))
+
+    # /epg.xml
+    EPG_HOURS = int(getenv("EPG_HOURS", "24"))
+    EPG_DEFAULT_MINUTES = float(getenv("EPG_DEFAULT_MINUTES", "22"))
+    EPG_MAX_PROGRAMMES = int(getenv("EPG_MAX_PROGRAMMES", "200"))
+
+    # per-IP / per-stream token buckets, 0 = unlimited. Off by default:
+    # behind a router (Heroku…) every viewer shares the router's address
+    # unless RATE_LIMIT_TRUST_PROXY is set as well
+    RATE_LIMIT_ENABLED = getenv("RATE_LIMIT_ENABLED", "False").lower() == "true"
+    RATE_LIMIT_IP_RPS = float(getenv("RATE_LIMIT_IP_RPS", "20"))
+    RATE_LIMIT_IP_BURST = float(getenv("RATE_LIMIT_IP_BURST", "100"))
+    RATE_LIMIT_STREAM_RPS = float(getenv("RATE_LIMIT_STREAM_RPS", "0"))
+    RATE_LIMIT_STREAM_BURST = float(getenv("RATE_LIMIT_STREAM_BURST", "0"))
+    RATE_LIMIT_IP_CONNECTIONS = int(getenv("RATE_LIMIT_IP_CONNECTIONS", "32"))
+    RATE_LIMIT_IP_KBPS = float(getenv("RATE_LIMIT_IP_KBPS", "0"))  # kbit/s
+    RATE_LIMIT_STREAM_KBPS = float(getenv("RATE_LIMIT_STREAM_KBPS", "0"))  # kbit/s
+    EGRESS_LIMIT_MBPS = float(getenv("EGRESS_LIMIT_MBPS", "0"))  # Mbit/s, all clients
+    # honour X-Forwarded-For (only behind a trusted reverse proxy); the
+    # client is the entry this many hops from the right (1 = Heroku router)
+    RATE_LIMIT_TRUST_PROXY = getenv("RATE_LIMIT_TRUST_PROXY", "False").lower() == "true"
+    RATE_LIMIT_PROXY_HOPS = max(1, int(getenv("RATE_LIMIT_PROXY_HOPS", "1")))
+    RATE_LIMIT_EXEMPT = [
+        ip.strip() for ip in getenv("RATE_LIMIT_EXEMPT", "127.0.0.1,::1").split(",") if ip.strip()
+    ]
+
+    # /vod/<chat_id>/<message_id> (on-demand, Range capable)
+    VOD_ENABLED = getenv("VOD_ENABLED", "True").lower() == "true"
+    VOD_MAX_CONCURRENT = int(getenv("VOD_MAX_CONCURRENT", "8"))
+    VOD_MAX_PER_IP = int(getenv("VOD_MAX_PER_IP", "2"))
+    # a client already serving this many transfers is not used for VOD
+    VOD_MAX_CLIENT_LOAD = int(getenv("VOD_MAX_CLIENT_LOAD", "2"))
+
+    # psutil CPU/RSS/IO sampling of tracked ffmpeg processes (seconds)
+    PROC_SAMPLE_INTERVAL = int(getenv("PROC_SAMPLE_INTERVAL", "10"))
+
+    # warm cleaner ffmpeg processes (-1 = one per channel, 0 = off)
+    CLEANER_POOL_SIZE = int(getenv("CLEANER_POOL_SIZE", "-1"))
+
+    # MP4 with moov at the end: fetch moov first and send it before mdat
+    MOOV_FIRST = getenv("MOOV_FIRST", "True").lower() == "true"
+
+    # probe each video's head (and MP4 moov) before it goes on air
+    PREFLIGHT_ENABLED = getenv("PREFLIGHT_ENABLED", "True").lower() == "true"
+    PREFLIGHT_TIMEOUT = int(getenv("PREFLIGHT_TIMEOUT", "20"))
+
+    # per-channel overrides keyed by stream name or chat id (JSON), e.g.
+    # {"stream2": {"output": "cmaf", "abr": true, "audio_only": true}}
+    STREAM_OPTIONS = json.loads(getenv("STREAM_OPTIONS", "{}"))
+
+    # slate played while the next video is slow to arrive
+    SLATE_ENABLED = getenv("SLATE_ENABLED", "True").lower() == "true"
+    SLATE_AFTER_MS = int(getenv("SLATE_AFTER_MS", "1500"))
+    SLATE_MAX_SECONDS = int(getenv("SLATE_MAX_SECONDS", "300"))
+    SLATE_DURATION = float(getenv("SLATE_DURATION", "2"))
+    SLATE_RESOLUTION = getenv("SLATE_RESOLUTION", "1280x720")
+
+    # extra transcoded renditions for channels with {"abr": true}
+    ABR_LADDER = getenv("ABR_LADDER", "480p,360p,240p").split(",")
+    ABR_CPU_BUDGET = float(getenv("ABR_CPU_BUDGET", "0"))  # cores, 0 = no cap
+    ABR_CPU_RESERVE = float(getenv("ABR_CPU_RESERVE", "1"))  # cores kept free
+    ABR_CHECK_INTERVAL = int(getenv("ABR_CHECK_INTERVAL", "15"))
     
     
     STREAM_DB_IDS = [
@@ -183,6 +183,22 @@ class JsonPlaylistStore:
 
         log.info("completed: chat=%s video=%s", chat_id, video_id)
 
+    async def mark_bad(self, chat_id: int | str, video_id: int, reason: str = ""):
+        async with self._lock:
+            data = await self._load_all()
+            entry = data.get(self._key(chat_id))
+            if not entry:
+                return
+
+            bad_ids = entry.setdefault("bad_ids", [])
+            if video_id not in bad_ids:
+                bad_ids.append(video_id)
+
+            entry["updated_at"] = int(time.time())
+            await self._save_all(data)
+
+        log.info("bad: chat=%s video=%s reason=%s", chat_id, video_id, reason)
+
     async def get_playlist(self, chat_id: int | str) -> List[int]:
         async with self._lock:
             data = await self._load_all()
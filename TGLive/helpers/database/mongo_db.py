@@ -29,6 +29,7 @@ class MongoPlaylistStore:
             "last_completed_id": row.get("last_completed_id"),
             "reverse": row.get("reverse", False),
             "channel_name": row.get("channel_name"),
+            "bad_ids": row.get("bad_ids", []),
         }
 
         log.debug(
@@ -131,6 +132,17 @@ class MongoPlaylistStore:
 
         log.info("completed: chat=%s video=%s", chat_id, video_id)
 
+    async def mark_bad(self, chat_id: int | str, video_id: int, reason: str = ""):
+        await self.col.update_one(
+            {"_id": chat_id},
+            {
+                "$addToSet": {"bad_ids": video_id},
+                "$set": {"updated_at": int(time.time())},
+            },
+        )
+
+        log.info("bad: chat=%s video=%s reason=%s", chat_id, video_id, reason)
+
     async def get_playlist(self, chat_id: int | str) -> List[int]:
         row = await self.col.find_one({"_id": chat_id})
         if not row:
@@ -27,6 +27,7 @@ class PostgresPlaylistStore:
                         max_size=5,
                         timeout=10,
                     )
+                    await self._migrate()
                     log.info("connected")
                     return
                 except Exception as e:
@@ -36,6 +37,15 @@ class PostgresPlaylistStore:
             log.error("connection failed permanently")
             raise RuntimeError("PostgreSQL connection failed")
 
+    async def _migrate(self):
+        async with self.pool.acquire() as conn:
+            await conn.execute(
+                """
+                ALTER TABLE playlists
+                ADD COLUMN IF NOT EXISTS bad_ids BIGINT[] NOT NULL DEFAULT '{}'
+                """
+            )
+
     async def _acquire(self):
         await self.connect()
         return self.pool.acquire()
@@ -49,7 +59,8 @@ class PostgresPlaylistStore:
                     latest_id,
                     reverse,
                     last_started_id,
-                    last_completed_id
+                    last_completed_id,
+                    bad_ids
                 FROM playlists
                 WHERE chat_id = $1
                 """,
@@ -66,6 +77,7 @@ class PostgresPlaylistStore:
                 "reverse": row["reverse"],
                 "last_started_id": row["last_started_id"],
                 "last_completed_id": row["last_completed_id"],
+                "bad_ids": list(row["bad_ids"] or []),
             }
 
             log.debug(
@@ -191,6 +203,26 @@ class PostgresPlaylistStore:
 
         log.info("completed: chat=%s video=%s", chat_id, message_id)
 
+    async def mark_bad(self, chat_id: int | str, message_id: int, reason: str = ""):
+        async with await self._acquire() as conn:
+            await conn.execute(
+                """
+                UPDATE playlists
+                SET
+                    bad_ids = CASE
+                        WHEN $2 = ANY(bad_ids) THEN bad_ids
+                        ELSE array_append(bad_ids, $2)
+                    END,
+                    updated_at = $3
+                WHERE chat_id = $1
+                """,
+                str(chat_id),
+                message_id,
+                int(time.time()),
+            )
+
+        log.info("bad: chat=%s video=%s reason=%s", chat_id, message_id, reason)
+
     async def get_playlist(self, chat_id: int | str) -> List[int]:
         row = await self.load(chat_id)
         if not row:
@@ -1,7 +1,7 @@
 from typing import List, Optional, Dict
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import declarative_base, sessionmaker
-from sqlalchemy import Column, BigInteger, Boolean, Text, select
+from sqlalchemy import Column, BigInteger, Boolean, Text, select, inspect, text
 from TGLive import get_logger
 
 log = get_logger(__name__)
@@ -22,6 +22,7 @@ class PlaylistTable(Base):
 
     reverse = Column(Boolean, default=False)
     channel_name = Column(Text, nullable=True)
+    bad_ids = Column(Text, nullable=True, default="")
 
 
 class SQLPlaylistStore:
@@ -34,8 +35,22 @@ class SQLPlaylistStore:
     async def init(self):
         async with self.engine.begin() as conn:
             await conn.run_sync(Base.metadata.create_all)
+            await conn.run_sync(self._migrate)
         log.info("tables ready")
 
+    @staticmethod
+    def _migrate(conn):
+        # create_all never alters an existing table; add columns that
+        # were introduced after the table was first created.
+        existing = {
+            c["name"] for c in inspect(conn).get_columns(PlaylistTable.__tablename__)
+        }
+        if "bad_ids" not in existing:
+            conn.execute(
+                text("ALTER TABLE playlists ADD COLUMN bad_ids TEXT DEFAULT ''")
+            )
+            log.info("migrated: added playlists.bad_ids")
+
     @staticmethod
     def _encode_playlist(playlist: List[int]) -> str:
         return ",".join(map(str, playlist))
@@ -66,6 +81,7 @@ class SQLPlaylistStore:
                 "last_completed_id": row.last_completed_id,
                 "reverse": row.reverse,
                 "channel_name": row.channel_name,
+                "bad_ids": self._decode_playlist(row.bad_ids),
             }
 
             log.debug(
@@ -196,6 +212,22 @@ class SQLPlaylistStore:
 
         log.info("completed: chat=%s video=%s", chat_id, video_id)
 
+    async def mark_bad(self, chat_id: int | str, video_id: int, reason: str = ""):
+        async with self.Session() as session:
+            row = await session.get(PlaylistTable, int(chat_id))
+            if not row:
+                return
+
+            bad_ids = self._decode_playlist(row.bad_ids)
+            if video_id in bad_ids:
+                return
+
+            bad_ids.append(video_id)
+            row.bad_ids = self._encode_playlist(bad_ids)
+            await session.commit()
+
+        log.info("bad: chat=%s video=%s reason=%s", chat_id, video_id, reason)
+
     async def get_playlist(self, chat_id: int | str) -> List[int]:
         data = await self.load(chat_id)
         if not data:
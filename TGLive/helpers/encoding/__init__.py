@@ -1,3 +1,4 @@
 from .hls import start_hls_runner
+from .segmenter import TSSegmenter
 
-__all__ = ("start_hls_runner",)
+__all__ = ("start_hls_runner", "TSSegmenter")
@@ -0,0 +1,509 @@
+import os
+import shutil
+import asyncio
+from typing import Dict, List, Optional
+
+import psutil
+
+from TGLive import get_logger, Telegram
+from TGLive.helpers.encoding.probe import ProbeError, probe_streams
+from TGLive.helpers.process.registry import FFMPEG_PROCS
+from TGLive.helpers.process.resources import RESOURCES
+
+LOGGER = get_logger(__name__)
+
+# name -> (height, video bitrate kbps, estimated cores at real time)
+RENDITION_PRESETS = {
+    "720p": (720, 2500, 1.2),
+    "480p": (480, 1000, 0.6),
+    "360p": (360, 600, 0.35),
+    "240p": (240, 300, 0.2),
+}
+
+AUDIO_BITRATE = 128_000
+
+AUDIO_RENDITION = "audio"
+
+# TS probed per video to learn the source height
+PROBE_BYTES = 1 << 20
+
+
+class Rendition:
+    """
+    One extra transcoded rendition: ffmpeg reading the channel's TS on
+    stdin and writing hls/<stream>/<name>/live.m3u8. Input is fed
+    through a bounded queue; a rendition that cannot keep up is dropped
+    instead of backpressuring the channel.
+    """
+
+    role = "rendition"
+
+    def __init__(self, stream_name: str, hls_dir: str, name: str, preset=None):
+        self.stream_name = stream_name
+        self.name = name
+        self.height, self.kbps, self.cost = preset or RENDITION_PRESETS[name]
+        self.out_dir = os.path.join(hls_dir, name)
+
+        self.proc: Optional[asyncio.subprocess.Process] = None
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=64)
+        self._writer: Optional[asyncio.Task] = None
+        self.failed = False
+
+    @property
+    def bandwidth(self) -> int:
+        return int(self.kbps * 1000 * 1.1) + AUDIO_BITRATE
+
+    @property
+    def running(self) -> bool:
+        return self.proc is not None and self.proc.returncode is None and not self.failed
+
+    def _cmd(self) -> List[str]:
+        return [
+            "ffmpeg",
+            "-loglevel", "error",
+            "-threads", str(RESOURCES.threads(self.role)),
+            "-fflags", "+genpts",
+            "-copyts",
+            "-i", "pipe:0",
+            "-map", "0:v:0",
+            "-map", "0:a:0?",
+            "-vf", f"scale=-2:{self.height}",
+            "-c:v", "libx264",
+            "-preset", "veryfast",
+            "-b:v", f"{self.kbps}k",
+            "-maxrate", f"{int(self.kbps * 1.1)}k",
+            "-bufsize", f"{self.kbps * 2}k",
+            # same timestamps and keyframes as the source, so segments
+            # line up across renditions and players can switch
+            "-force_key_frames", "source",
+            "-sc_threshold", "0",
+            "-c:a", "copy",
+            "-f", "hls",
+            "-hls_time", str(Telegram.HLS_TIME),
+            "-hls_list_size", str(Telegram.HLS_LIST_SIZE),
+            "-hls_flags", "delete_segments+omit_endlist+independent_segments",
+            "-hls_segment_filename", os.path.join(self.out_dir, "%d.ts"),
+            os.path.join(self.out_dir, "live.m3u8"),
+        ]
+
+    async def start(self):
+        os.makedirs(self.out_dir, exist_ok=True)
+
+        self.proc = await asyncio.create_subprocess_exec(
+            *self._cmd(),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        FFMPEG_PROCS.add(self.proc, stream=self.stream_name, role=self.role)
+        RESOURCES.apply(self.proc.pid, self.role)
+        self._writer = asyncio.create_task(self._write_loop())
+
+        LOGGER.info(
+            "[%s] rendition %s started (pid=%s)",
+            self.stream_name,
+            self.name,
+            self.proc.pid,
+        )
+
+    def feed(self, chunk: bytes):
+        if not self.running:
+            return
+        try:
+            self.queue.put_nowait(chunk)
+        except asyncio.QueueFull:
+            LOGGER.warning(
+                "[%s] rendition %s can't keep up, dropping it",
+                self.stream_name,
+                self.name,
+            )
+            self.failed = True
+
+    async def _write_loop(self):
+        try:
+            while True:
+                chunk = await self.queue.get()
+                self.proc.stdin.write(chunk)
+                await self.proc.stdin.drain()
+        except asyncio.CancelledError:
+            pass
+        except (BrokenPipeError, ConnectionResetError):
+            self.failed = True
+
+    async def stop(self):
+        if self._writer:
+            self._writer.cancel()
+            self._writer = None
+
+        if self.proc:
+            try:
+                if not self.proc.stdin.is_closing():
+                    self.proc.stdin.close()
+                await asyncio.wait_for(self.proc.wait(), timeout=5)
+            except Exception:
+                self.proc.kill()
+            FFMPEG_PROCS.discard(self.proc)
+            self.proc = None
+
+        shutil.rmtree(self.out_dir, ignore_errors=True)
+        LOGGER.info("[%s] rendition %s stopped", self.stream_name, self.name)
+
+
+class AudioRendition(Rendition):
+    """
+    Audio-only rendition: the AAC track the cleaner already produced,
+    copied out of the TS (no decode), for ~128 kbps clients.
+    """
+
+    role = "audio"
+
+    def __init__(self, stream_name: str, hls_dir: str):
+        super().__init__(
+            stream_name,
+            hls_dir,
+            AUDIO_RENDITION,
+            preset=(0, AUDIO_BITRATE // 1000, 0.02),
+        )
+
+    @property
+    def bandwidth(self) -> int:
+        return int(AUDIO_BITRATE * 1.1)
+
+    def _cmd(self) -> List[str]:
+        return [
+            "ffmpeg",
+            "-loglevel", "error",
+            "-threads", str(RESOURCES.threads(self.role)),
+            "-fflags", "+genpts",
+            "-i", "pipe:0",
+            "-map", "0:a:0",
+            "-vn",
+            "-c:a", "copy",
+            "-f", "hls",
+            "-hls_time", str(Telegram.HLS_TIME),
+            "-hls_list_size", str(Telegram.HLS_LIST_SIZE),
+            "-hls_flags", "delete_segments+omit_endlist+independent_segments",
+            "-hls_segment_filename", os.path.join(self.out_dir, "%d.ts"),
+            os.path.join(self.out_dir, "live.m3u8"),
+        ]
+
+
+class RenditionLadder:
+    """
+    Optional lower renditions for one channel plus its master playlist.
+
+    The source rendition (live.m3u8) is always listed; extra video
+    renditions are switched on and off by ABR_SCHEDULER. The audio-only
+    rendition is nearly free and runs for the whole session.
+    """
+
+    def __init__(
+        self,
+        stream_name: str,
+        hls_dir: str,
+        names: List[str],
+        store=None,
+        audio_only: bool = False,
+    ):
+        self.stream_name = stream_name
+        self.hls_dir = hls_dir
+        self.names = [n for n in names if n in RENDITION_PRESETS]
+        self.store = store
+
+        self.active: Dict[str, Rendition] = {}
+        self.audio: Optional[AudioRendition] = (
+            AudioRendition(stream_name, hls_dir) if audio_only else None
+        )
+
+        # measured source bitrate
+        self._bytes = 0
+        self._since = 0.0
+        self.source_bandwidth = 0
+
+        # source height, probed from the head of each video (None = unknown)
+        self.source_height: Optional[int] = None
+        self._head: Optional[bytearray] = bytearray() if self.names else None
+        self._probe_task: Optional[asyncio.Task] = None
+        self._audio_task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        os.makedirs(self.hls_dir, exist_ok=True)
+        self._since = asyncio.get_running_loop().time()
+        if self.audio:
+            await self.audio.start()
+            self._audio_task = asyncio.create_task(self._watch_audio())
+        await self.write_master()
+        if self.names:
+            ABR_SCHEDULER.register(self)
+
+    async def close(self):
+        ABR_SCHEDULER.unregister(self)
+        for task in (self._probe_task, self._audio_task):
+            if task:
+                task.cancel()
+        self._probe_task = self._audio_task = None
+        for name in list(self.active):
+            await self.disable(name)
+        if self.audio:
+            await self.audio.stop()
+
+    def begin_video(self):
+        """
+        Re-learn the source height from the next video's head.
+        """
+        if self.names:
+            self._head = bytearray()
+
+    def write(self, chunk: bytes):
+        self._bytes += len(chunk)
+        if self._head is not None:
+            self._head += chunk
+            if len(self._head) >= PROBE_BYTES:
+                head, self._head = bytes(self._head), None
+                if self._probe_task:
+                    self._probe_task.cancel()
+                self._probe_task = asyncio.create_task(self._probe_source(head))
+        for rendition in self.active.values():
+            rendition.feed(chunk)
+        if self.audio:
+            self.audio.feed(chunk)
+
+    # --------------------------------------------------
+    # RENDITIONS
+    # --------------------------------------------------
+    def _upscales(self, name: str) -> bool:
+        return (
+            self.source_height is not None
+            and RENDITION_PRESETS[name][0] >= self.source_height
+        )
+
+    def next_candidate(self) -> Optional[str]:
+        for name in self.names:
+            if name not in self.active and not self._upscales(name):
+                return name
+        return None
+
+    async def _probe_source(self, head: bytes):
+        try:
+            streams = await probe_streams(head)
+        except ProbeError as e:
+            LOGGER.debug("[%s] source probe failed: %s", self.stream_name, e)
+            return
+
+        heights = [
+            s["height"] for s in streams
+            if s.get("codec_type") == "video" and s.get("height")
+        ]
+        if not heights or heights[0] == self.source_height:
+            return
+
+        self.source_height = heights[0]
+        LOGGER.info("[%s] source height %sp", self.stream_name, self.source_height)
+
+        # a smaller source came on: rungs at or above it would upscale
+        for name in [n for n in self.active if self._upscales(n)]:
+            await self.disable(name)
+
+    async def enable(self, name: str):
+        if name in self.active:
+            return
+        rendition = Rendition(self.stream_name, self.hls_dir, name)
+        await rendition.start()
+        self.active[name] = rendition
+        await self.write_master()
+
+    async def disable(self, name: str):
+        rendition = self.active.pop(name, None)
+        if rendition is None:
+            return
+        await self.write_master()
+        await rendition.stop()
+
+    async def _watch_audio(self):
+        """
+        The audio rendition runs for the whole session, with or without
+        a video ladder: restart it when it falls behind or ffmpeg dies,
+        and keep master.m3u8 from advertising it while it's down.
+        """
+        try:
+            while True:
+                await asyncio.sleep(Telegram.ABR_CHECK_INTERVAL)
+                if self.audio.running:
+                    continue
+
+                LOGGER.warning("[%s] audio rendition failed, restarting", self.stream_name)
+                await self.audio.stop()
+                await self.write_master()
+
+                self.audio = AudioRendition(self.stream_name, self.hls_dir)
+                try:
+                    await self.audio.start()
+                except Exception as e:
+                    LOGGER.warning(
+                        "[%s] audio rendition restart failed: %s",
+                        self.stream_name,
+                        e,
+                    )
+                    continue
+                await self.write_master()
+        except asyncio.CancelledError:
+            pass
+
+    async def reap_failed(self) -> List[str]:
+        failed = [n for n, r in self.active.items() if not r.running]
+        for name in failed:
+            await self.disable(name)
+        return failed
+
+    # --------------------------------------------------
+    # MASTER PLAYLIST
+    # --------------------------------------------------
+    def _update_bandwidth(self):
+        now = asyncio.get_running_loop().time()
+        elapsed = now - self._since
+        if elapsed >= 10:
+            self.source_bandwidth = int(self._bytes * 8 / elapsed)
+            self._bytes = 0
+            self._since = now
+
+    def render_master(self) -> str:
+        self._update_bandwidth()
+
+        lines = [
+            "#EXTM3U",
+            "#EXT-X-VERSION:3",
+            "#EXT-X-INDEPENDENT-SEGMENTS",
+            f'#EXT-X-STREAM-INF:BANDWIDTH={self.source_bandwidth or 3_000_000},NAME="source"',
+            "live.m3u8",
+        ]
+
+        for name in self.names:
+            rendition = self.active.get(name)
+            if rendition is None:
+                continue
+            lines.append(
+                f'#EXT-X-STREAM-INF:BANDWIDTH={rendition.bandwidth},NAME="{name}"'
+            )
+            lines.append(f"{name}/live.m3u8")
+
+        if self.audio and self.audio.running:
+            lines.append(
+                f'#EXT-X-STREAM-INF:BANDWIDTH={self.audio.bandwidth},'
+                f'CODECS="mp4a.40.2",NAME="{AUDIO_RENDITION}"'
+            )
+            lines.append(f"{AUDIO_RENDITION}/live.m3u8")
+
+        return "\n".join(lines) + "\n"
+
+    async def write_master(self):
+        text = self.render_master()
+
+        if self.store is not None:
+            await self.store.put_playlist(text, name="master.m3u8")
+            return
+
+        await asyncio.to_thread(
+            self._write_file, os.path.join(self.hls_dir, "master.m3u8"), text
+        )
+
+    @staticmethod
+    def _write_file(path: str, text: str):
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp, path)
+
+
+class CPUBudgetScheduler:
+    """
+    Turns extra renditions on/off across all channels so they only use
+    cores that are actually free (minus ABR_CPU_RESERVE for the event
+    loop and the copy-only pipelines), capped at ABR_CPU_BUDGET.
+    """
+
+    def __init__(self):
+        self.ladders: List[RenditionLadder] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def register(self, ladder: RenditionLadder):
+        self.ladders.append(ladder)
+        if self._task is None or self._task.done():
+            psutil.cpu_percent(interval=None)
+            self._task = asyncio.create_task(self._loop())
+
+    def unregister(self, ladder: RenditionLadder):
+        if ladder in self.ladders:
+            self.ladders.remove(ladder)
+        if not self.ladders and self._task:
+            self._task.cancel()
+            self._task = None
+
+    def used(self) -> float:
+        return sum(
+            r.cost for ladder in self.ladders for r in ladder.active.values()
+        )
+
+    async def _loop(self):
+        try:
+            while True:
+                await asyncio.sleep(Telegram.ABR_CHECK_INTERVAL)
+                try:
+                    await self.rebalance()
+                except Exception as e:
+                    LOGGER.warning("ABR rebalance failed: %s", e)
+        except asyncio.CancelledError:
+            pass
+
+    async def rebalance(self):
+        for ladder in self.ladders:
+            for name in await ladder.reap_failed():
+                LOGGER.warning("[%s] rendition %s failed", ladder.stream_name, name)
+
+        cores = psutil.cpu_count() or 1
+        free = cores * (1 - psutil.cpu_percent(interval=None) / 100)
+        budget = Telegram.ABR_CPU_BUDGET or cores
+        used = self.used()
+
+        if free < Telegram.ABR_CPU_RESERVE or used > budget:
+            await self._drop_one()
+            return
+
+        candidate = self._pick_candidate()
+        if candidate is None:
+            return
+
+        ladder, name = candidate
+        cost = RENDITION_PRESETS[name][2]
+        if free - cost >= Telegram.ABR_CPU_RESERVE and used + cost <= budget:
+            LOGGER.info(
+                "[%s] enabling %s (free=%.2f cores, used=%.2f)",
+                ladder.stream_name,
+                name,
+                free,
+                used,
+            )
+            await ladder.enable(name)
+
+    def _pick_candidate(self):
+        # fill channels evenly: fewest active renditions first
+        best = None
+        for ladder in self.ladders:
+            name = ladder.next_candidate()
+            if name is None:
+                continue
+            if best is None or len(ladder.active) < len(best[0].active):
+                best = (ladder, name)
+        return best
+
+    async def _drop_one(self):
+        # drop from the channel with the most renditions, lowest priority first
+        ladders = [l for l in self.ladders if l.active]
+        if not ladders:
+            return
+        ladder = max(ladders, key=lambda l: len(l.active))
+        name = [n for n in ladder.names if n in ladder.active][-1]
+        LOGGER.warning("[%s] CPU budget exceeded, disabling %s", ladder.stream_name, name)
+        await ladder.disable(name)
+
+
+ABR_SCHEDULER = CPUBudgetScheduler()
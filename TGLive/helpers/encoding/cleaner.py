@@ -1,32 +1,161 @@
 import asyncio
+from typing import Dict, List, Optional, Set, Tuple
+
 from TGLive.helpers.process.registry import FFMPEG_PROCS
-from TGLive import get_logger
+from TGLive.helpers.process.resources import RESOURCES
+from TGLive import get_logger, Telegram
 
 LOGGER = get_logger(__name__)
 
-async def ffmpeg_cleaner(byte_source, stream_name):
-    proc = await asyncio.create_subprocess_exec(
+
+def _cleaner_cmd(audio_map: List[str]) -> List[str]:
+    return [
         "ffmpeg",
-        "-threads", "1",
+        "-threads", str(RESOURCES.threads("cleaner")),
         "-loglevel", "error",
         "-fflags", "+genpts",
         "-avoid_negative_ts", "make_zero",
         "-i", "pipe:0",
         "-map", "0:v:0?",
-        "-map", "0:a?",
+        *audio_map,
         "-c:v", "copy",
         "-c:a", "aac",
         "-b:a", "128k",
         "-ac", "2",
         "-f", "mpegts",
         "pipe:1",
-        stdin=asyncio.subprocess.PIPE,
-        stdout=asyncio.subprocess.PIPE,
-        stderr=asyncio.subprocess.PIPE,
-    )
+    ]
+
+
+class CleanerPool:
+    """
+    Pre-spawned cleaner ffmpeg processes, blocked on stdin until a video
+    boundary claims one.
+
+    Processes are keyed by their argument list (audio mapping differs per
+    channel). Each key keeps one warm process per channel that used it,
+    capped at `size`, and is refilled in the background after a claim.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+
+        self._idle: Dict[Tuple[str, ...], List[asyncio.subprocess.Process]] = {}
+        self._users: Dict[Tuple[str, ...], Set[str]] = {}
+        self._refilling: Set[Tuple[str, ...]] = set()
+        self._closed = False
+
+        # claimed processes per stream, for stop_cleaner()
+        self.active: Dict[str, Set[asyncio.subprocess.Process]] = {}
+
+    async def _spawn(self, cmd: Tuple[str, ...]) -> asyncio.subprocess.Process:
+        proc = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        FFMPEG_PROCS.add(proc, stream="(warm)", role="cleaner")
+        RESOURCES.apply(proc.pid, "cleaner")
+        return proc
+
+    async def acquire(self, stream_name: str, cmd: List[str]) -> asyncio.subprocess.Process:
+        key = tuple(cmd)
+        self._users.setdefault(key, set()).add(stream_name)
+
+        proc = None
+        idle = self._idle.get(key, [])
+        while idle:
+            candidate = idle.pop()
+            if candidate.returncode is None:
+                proc = candidate
+                break
+            FFMPEG_PROCS.discard(candidate)
+
+        warm = proc is not None
+        if proc is None:
+            proc = await self._spawn(key)
+
+        self.active.setdefault(stream_name, set()).add(proc)
+        FFMPEG_PROCS.assign(proc, stream_name)
+        self._schedule_refill(key)
 
-    FFMPEG_PROCS.add(proc)
-    LOGGER.info("[%s] cleaner ffmpeg started (pid=%s)", stream_name, proc.pid)
+        LOGGER.info(
+            "[%s] cleaner ffmpeg %s (pid=%s)",
+            stream_name,
+            "claimed warm" if warm else "started",
+            proc.pid,
+        )
+        return proc
+
+    def release(self, stream_name: str, proc: asyncio.subprocess.Process):
+        procs = self.active.get(stream_name)
+        if procs is not None:
+            procs.discard(proc)
+        FFMPEG_PROCS.discard(proc)
+
+    def _schedule_refill(self, key: Tuple[str, ...]):
+        if self.size <= 0 or self._closed or key in self._refilling:
+            return
+        self._refilling.add(key)
+        asyncio.create_task(self._refill(key))
+
+    async def _refill(self, key: Tuple[str, ...]):
+        try:
+            target = min(self.size, len(self._users.get(key, ())))
+            idle = self._idle.setdefault(key, [])
+            while not self._closed and len(idle) < target and self._idle_total() < self.size:
+                idle.append(await self._spawn(key))
+        except Exception as e:
+            LOGGER.warning("cleaner pool refill failed: %s", e)
+        finally:
+            self._refilling.discard(key)
+
+    def _idle_total(self) -> int:
+        return sum(len(v) for v in self._idle.values())
+
+    async def stop_stream(self, stream_name: str):
+        for proc in list(self.active.pop(stream_name, ())):
+            if proc.returncode is None:
+                proc.kill()
+                try:
+                    await proc.wait()
+                except Exception:
+                    pass
+            FFMPEG_PROCS.discard(proc)
+
+    async def close(self):
+        self._closed = True
+        for procs in self._idle.values():
+            for proc in procs:
+                if proc.returncode is None:
+                    proc.kill()
+                FFMPEG_PROCS.discard(proc)
+        self._idle.clear()
+
+
+CLEANER_POOL = CleanerPool(
+    size=Telegram.CLEANER_POOL_SIZE
+    if Telegram.CLEANER_POOL_SIZE >= 0
+    else len(Telegram.STREAM_DB_IDS)
+)
+
+
+async def stop_cleaner(stream_name: str):
+    """
+    Kill the cleaner ffmpeg(s) a stream still holds (used on restart).
+    """
+    await CLEANER_POOL.stop_stream(stream_name)
+
+
+async def ffmpeg_cleaner(byte_source, stream_name, audio_map: Optional[List[str]] = None):
+    """
+    audio_map: -map args for the audio to keep (default: every track).
+    """
+    proc = await CLEANER_POOL.acquire(
+        stream_name,
+        _cleaner_cmd(audio_map or ["-map", "0:a?"]),
+    )
 
     async def pump():
         async for chunk in byte_source:
@@ -46,6 +175,9 @@ async def ffmpeg_cleaner(byte_source, stream_name):
             yield data
     finally:
         pump_task.cancel()
+        if proc.returncode is None and not proc.stdout.at_eof():
+            # abandoned mid-video (skip, restart)
+            proc.kill()
         await proc.wait()
-        FFMPEG_PROCS.discard(proc)
+        CLEANER_POOL.release(stream_name, proc)
         LOGGER.info("[%s] cleaner ffmpeg stopped", stream_name)
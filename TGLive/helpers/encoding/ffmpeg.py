@@ -20,7 +20,7 @@ class FFmpegProcess:
             stderr=asyncio.subprocess.PIPE,
         )
 
-        FFMPEG_PROCS.add(self.proc)
+        FFMPEG_PROCS.add(self.proc, stream=self.stream_name, role="ffmpeg")
 
         LOGGER.info(
             "[%s] ffmpeg started (pid=%s)",
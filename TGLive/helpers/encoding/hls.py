@@ -1,27 +1,55 @@
 import os
 import subprocess
-from TGLive import get_logger
+from TGLive import get_logger, Telegram
 from TGLive.helpers.encoding.ffmpeg import FFmpegProcess
+from TGLive.helpers.process.resources import RESOURCES
+from TGLive.helpers.process.registry import FFMPEG_PROCS
 
 LOGGER = get_logger(__name__)
 
 
 _hls_processes: dict[str, subprocess.Popen] = {}
 
-async def start_hls_runner(hls_dir: str, stream_name: str) -> subprocess.Popen:
-    if stream_name in _hls_processes:
-        return _hls_processes[stream_name]
+async def start_hls_runner(
+    hls_dir: str,
+    stream_name: str,
+    output: str = "ts",
+) -> subprocess.Popen:
+    proc = _hls_processes.get(stream_name)
+    if proc and proc.poll() is None:
+        return proc
 
     os.makedirs(hls_dir, exist_ok=True)
 
+    if output == "cmaf":
+        cmd = _cmaf_cmd(hls_dir)
+    else:
+        cmd = _ts_cmd(hls_dir)
+
+    LOGGER.info("[%s] Starting persistent FFmpeg (%s)", stream_name, output)
+
+    proc = subprocess.Popen(
+        cmd,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+    )
+
+    RESOURCES.apply(proc.pid, "runner")
+    FFMPEG_PROCS.add(proc, stream=stream_name, role=f"runner-{output}")
+
+    _hls_processes[stream_name] = proc
+    return proc
+
+
+def _ts_cmd(hls_dir: str) -> list[str]:
     playlist_path = os.path.join(hls_dir, "live.m3u8")
     segment_pattern = os.path.join(hls_dir, "%d.ts")
 
-    cmd = [
+    return [
         "ffmpeg",
         "-loglevel", "error",
-        "-re",
-        "-threads", "1",
+        "-threads", str(RESOURCES.threads("runner")),
         "-fflags", "+genpts",
         "-i", "pipe:0",
         "-map", "0:v:0",
@@ -31,34 +59,56 @@ async def start_hls_runner(hls_dir: str, stream_name: str) -> subprocess.Popen:
         "-b:a", "128k",
         "-ac", "2",
         "-f", "hls",
-        "-hls_time", "4",
-        "-hls_list_size", "6",
+        "-hls_time", str(Telegram.HLS_TIME),
+        "-hls_list_size", str(Telegram.HLS_LIST_SIZE),
         "-hls_flags",
         "delete_segments+append_list+omit_endlist+independent_segments",
 
         "-hls_segment_filename", segment_pattern,
         playlist_path,
     ]
-    
-    LOGGER.info("[%s] Starting persistent FFmpeg", stream_name)
-    
-    proc = subprocess.Popen(
-        cmd,
-        stdin=subprocess.PIPE,
-        stdout=subprocess.DEVNULL,
-        stderr=subprocess.PIPE,
-    )
 
-    _hls_processes[stream_name] = proc
-    return proc
 
-    
-    
+def _cmaf_cmd(hls_dir: str) -> list[str]:
+    """
+    CMAF (init + .m4s) segments shared by one DASH manifest (manifest.mpd)
+    and one HLS master playlist (live.m3u8 -> media_N.m3u8).
+    Audio is already AAC from the cleaner, so everything is copied.
+
+    No -adaptation_sets: the muxer's default (one set per mapped stream)
+    gives the same video/audio split, and an explicit audio set would
+    match nothing on a silent source and stop the runner from starting.
+    """
+    return [
+        "ffmpeg",
+        "-loglevel", "error",
+        "-threads", str(RESOURCES.threads("runner")),
+        "-fflags", "+genpts",
+        "-i", "pipe:0",
+        "-map", "0:v:0",
+        "-map", "0:a:0?",
+        "-c", "copy",
+        "-f", "dash",
+        "-seg_duration", str(Telegram.HLS_TIME),
+        "-window_size", str(Telegram.HLS_LIST_SIZE),
+        "-extra_window_size", "2",
+        "-use_template", "1",
+        "-use_timeline", "1",
+        "-hls_playlist", "1",
+        "-hls_master_name", "live.m3u8",
+        "-init_seg_name", "init-$RepresentationID$.m4s",
+        "-media_seg_name", "chunk-$RepresentationID$-$Number%05d$.m4s",
+        os.path.join(hls_dir, "manifest.mpd"),
+    ]
+
+
+
 async def stop_all_hls():
     """
     Stop ALL FFmpeg processes cleanly (used on shutdown).
     """
     for name, proc in _hls_processes.items():
+        FFMPEG_PROCS.discard(proc)
         try:
             LOGGER.warning("[%s] Stopping FFmpeg", name)
             if proc.stdin:
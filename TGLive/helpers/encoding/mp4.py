@@ -0,0 +1,194 @@
+import struct
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+from TGLive.helpers.encoding.probe import ProbeError
+
+# largest moov we are willing to fetch out of order
+MOOV_MAX_BYTES = 64 * 1024 * 1024
+MAX_TOP_LEVEL_BOXES = 64
+
+# boxes on the path moov -> trak -> mdia -> minf -> stbl -> stco/co64
+CONTAINER_BOXES = {b"moov", b"trak", b"mdia", b"minf", b"stbl"}
+
+RangeReader = Callable[[int, int], Awaitable[bytes]]
+
+
+def is_mp4(head: bytes) -> bool:
+    return head[4:8] == b"ftyp"
+
+
+def parse_box_header(data: bytes, pos: int = 0) -> Optional[Tuple[int, bytes, int]]:
+    """
+    Returns (size, type, header_len); size 0 means "to end of file".
+    """
+    if pos + 8 > len(data):
+        return None
+
+    size, kind = struct.unpack_from(">I4s", data, pos)
+    if size == 1:
+        if pos + 16 > len(data):
+            return None
+        size = struct.unpack_from(">Q", data, pos + 8)[0]
+        return size, kind, 16
+
+    return size, kind, 8
+
+
+def moov_end_in_head(head: bytes) -> Optional[int]:
+    """
+    End offset of a moov box that starts inside head but does not fit in
+    it (e.g. a faststart file with a big moov), else None.
+    """
+    pos = 0
+    while pos + 8 <= len(head):
+        parsed = parse_box_header(head, pos)
+        if parsed is None:
+            return None
+
+        size, kind, header_len = parsed
+        if size < header_len:
+            return None
+
+        if kind == b"moov":
+            end = pos + size
+            if len(head) < end <= MOOV_MAX_BYTES:
+                return end
+            return None
+
+        pos += size
+
+    return None
+
+
+async def top_level_boxes(
+    head: bytes,
+    file_size: int,
+    read_range: RangeReader,
+) -> List[Tuple[bytes, int, int]]:
+    """
+    Walk the top-level boxes (reading headers past the head when needed).
+    Returns [(type, offset, size)]; stops early on a broken header.
+    Raises ProbeError when a ranged read comes back short (e.g. a GetFile
+    timeout), which says nothing about the file.
+    """
+    boxes = []
+    pos = 0
+    for _ in range(MAX_TOP_LEVEL_BOXES):
+        if pos >= file_size:
+            break
+
+        if pos + 16 <= len(head):
+            header = head[pos:pos + 16]
+        else:
+            header = await read_range(pos, 16)
+            if len(header) < min(16, file_size - pos):
+                raise ProbeError(f"short read at offset {pos}")
+
+        parsed = parse_box_header(header)
+        if parsed is None:
+            break
+
+        size, kind, header_len = parsed
+        if size == 0:
+            size = file_size - pos
+        if size < header_len:
+            break
+
+        boxes.append((kind, pos, size))
+        pos += size
+
+    return boxes
+
+
+async def locate_moov(
+    head: bytes,
+    file_size: int,
+    read_range: RangeReader,
+) -> Optional[Tuple[int, int]]:
+    """
+    (offset, size) of the moov box, or None if there is none.
+    """
+    for kind, offset, size in await top_level_boxes(head, file_size, read_range):
+        if kind == b"moov":
+            return offset, size
+    return None
+
+
+async def fetch_moov(
+    head: bytes,
+    file_size: int,
+    read_range: RangeReader,
+) -> Optional[Tuple[int, bytes]]:
+    """
+    (offset, moov box bytes), taken from the head when it is already
+    there and fetched with a ranged read otherwise. None when the file
+    has no moov; ProbeError when it can't be fetched (short read, or
+    larger than MOOV_MAX_BYTES, a local limit rather than corruption).
+    """
+    found = await locate_moov(head, file_size, read_range)
+    if found is None:
+        return None
+
+    offset, size = found
+    if offset + size <= len(head):
+        return offset, head[offset:offset + size]
+
+    if size > MOOV_MAX_BYTES:
+        raise ProbeError(f"moov of {size} bytes exceeds MOOV_MAX_BYTES")
+
+    moov = await read_range(offset, size)
+    if len(moov) != size:
+        raise ProbeError(f"short moov read ({len(moov)}/{size} bytes)")
+    return offset, moov
+
+
+def shift_chunk_offsets(moov: bytes, delta: int) -> Optional[bytes]:
+    """
+    Copy of moov with every stco/co64 chunk offset moved by delta
+    (the faststart rewrite when moov is placed in front of mdat).
+    None if a 32-bit stco entry would overflow.
+    """
+    buf = bytearray(moov)
+    if not _shift_in(buf, 0, len(buf), delta):
+        return None
+    return bytes(buf)
+
+
+def _shift_in(buf: bytearray, start: int, end: int, delta: int) -> bool:
+    pos = start
+    while pos + 8 <= end:
+        parsed = parse_box_header(buf, pos)
+        if parsed is None:
+            return True
+
+        size, kind, header_len = parsed
+        if size == 0:
+            size = end - pos
+        if size < header_len or pos + size > end:
+            return True
+
+        body = pos + header_len
+
+        if kind in CONTAINER_BOXES:
+            if not _shift_in(buf, body, pos + size, delta):
+                return False
+
+        elif kind == b"stco":
+            count = struct.unpack_from(">I", buf, body + 4)[0]
+            for i in range(count):
+                at = body + 8 + i * 4
+                value = struct.unpack_from(">I", buf, at)[0] + delta
+                if value > 0xFFFFFFFF:
+                    return False
+                struct.pack_into(">I", buf, at, value)
+
+        elif kind == b"co64":
+            count = struct.unpack_from(">I", buf, body + 4)[0]
+            for i in range(count):
+                at = body + 8 + i * 8
+                value = struct.unpack_from(">Q", buf, at)[0] + delta
+                struct.pack_into(">Q", buf, at, value)
+
+        pos += size
+
+    return True
@@ -0,0 +1,118 @@
+import asyncio
+from typing import Optional
+
+from TGLive.helpers.encoding.segmenter import (
+    TS_PACKET_SIZE,
+    TS_SYNC_BYTE,
+    PTS_CLOCK,
+    PTS_WRAP,
+    MAX_PTS_GAP,
+    parse_pts,
+    pts_diff,
+)
+
+
+class TSPacer:
+    """
+    Real-time pacing of a TS stream against its own clock (PCR/DTS).
+
+    Replaces ffmpeg -re for both runners. The first burst_seconds of
+    media pass without waiting, so a fresh channel fills its HLS window
+    within a couple of seconds and then continues at real time.
+    """
+
+    def __init__(self, burst_seconds: float = 0.0):
+        self.burst_seconds = burst_seconds
+
+        self._clock: Optional[int] = None
+        self._first_ts: Optional[int] = None
+        self._anchor_ts: Optional[int] = None
+        self._anchor_wall = 0.0
+
+    def observe(self, data: bytes):
+        """
+        Advance the media clock from packet-aligned TS data.
+        """
+        for pos in range(0, len(data) - TS_PACKET_SIZE + 1, TS_PACKET_SIZE):
+            if data[pos] != TS_SYNC_BYTE:
+                continue
+
+            afc = (data[pos + 3] >> 4) & 0x03
+            payload = pos + 4
+
+            if afc & 0x02:
+                af_len = data[pos + 4]
+                if af_len >= 7 and data[pos + 5] & 0x10:
+                    p = pos + 6
+                    self._tick(
+                        data[p] << 25
+                        | data[p + 1] << 17
+                        | data[p + 2] << 9
+                        | data[p + 3] << 1
+                        | data[p + 4] >> 7
+                    )
+                payload += 1 + af_len
+
+            if (
+                data[pos + 1] & 0x40
+                and afc & 0x01
+                and payload + 14 <= pos + TS_PACKET_SIZE
+                and data[payload:payload + 3] == b"\x00\x00\x01"
+            ):
+                flags = data[payload + 7] >> 6
+                if flags == 0x03:
+                    self._tick(parse_pts(data, payload + 14))
+                elif flags & 0x02:
+                    self._tick(parse_pts(data, payload + 9))
+
+    def _tick(self, ts: int):
+        if self._clock is None:
+            self._clock = ts
+            self._first_ts = ts
+            return
+
+        step = pts_diff(ts, self._clock)
+        if step > MAX_PTS_GAP or step < -MAX_PTS_GAP:
+            # timeline jumped: move the anchor along, keep the lead
+            if self._anchor_ts is not None:
+                self._anchor_ts = (self._anchor_ts + step) % PTS_WRAP
+            self._clock = ts
+        elif step > 0:
+            self._clock = ts
+
+    async def pace(self, data: bytes):
+        self.observe(data)
+        if self._clock is None:
+            return
+
+        now = asyncio.get_running_loop().time()
+
+        if self._anchor_ts is None:
+            self._anchor_ts = self._first_ts
+            self._anchor_wall = now - self.burst_seconds
+
+        ahead = (
+            pts_diff(self._clock, self._anchor_ts) / PTS_CLOCK
+            - (now - self._anchor_wall)
+        )
+        if ahead < -self.burst_seconds:
+            # wall time ran on during a stall: catch up by at most one
+            # burst instead of racing through the whole gap
+            self._anchor_ts = self._clock
+            self._anchor_wall = now - self.burst_seconds
+        elif ahead > 0:
+            await asyncio.sleep(ahead)
+
+    @property
+    def buffered_seconds(self) -> float:
+        """
+        How far the media clock runs ahead of real time.
+        """
+        if self._anchor_ts is None or self._clock is None:
+            return 0.0
+        now = asyncio.get_running_loop().time()
+        return max(
+            0.0,
+            pts_diff(self._clock, self._anchor_ts) / PTS_CLOCK
+            - (now - self._anchor_wall),
+        )
@@ -0,0 +1,73 @@
+import os
+import asyncio
+import tempfile
+from typing import List, Optional, Tuple
+
+from TGLive import get_logger
+from TGLive.helpers.encoding.mp4 import RangeReader, is_mp4, fetch_moov
+from TGLive.helpers.encoding.probe import probe_streams
+
+LOGGER = get_logger(__name__)
+
+
+async def preflight(
+    head: bytes,
+    file_size: int,
+    read_range: RangeReader,
+) -> Tuple[List[dict], Optional[str]]:
+    """
+    Quick playability check before a video goes on air.
+
+    Probes the head of the file; for MP4 whose moov is not in the head
+    the moov is fetched with a ranged read and probed from a sparse temp
+    file laid out like the real one.
+
+    Returns (streams, reason); reason is None when the video looks fine.
+    Raises ProbeError when ffprobe itself could not run or the moov
+    could not be fetched (short read, MOOV_MAX_BYTES), so the caller
+    skips the check instead of rejecting the video.
+    """
+    if not head:
+        return [], "empty file"
+
+    if is_mp4(head):
+        found = await fetch_moov(head, file_size, read_range)
+        if found is None:
+            return [], "mp4 without moov"
+
+        offset, moov = found
+        if offset + len(moov) <= len(head):
+            streams = await probe_streams(head)
+        else:
+            streams = await _probe_sparse(head, offset, moov, file_size)
+    else:
+        streams = await probe_streams(head)
+
+    if not streams:
+        return [], "unrecognised or corrupt container"
+
+    if not any(s.get("codec_type") == "video" for s in streams):
+        return streams, "no video stream"
+
+    return streams, None
+
+
+def _write_sparse(head: bytes, offset: int, moov: bytes, file_size: int) -> str:
+    fd, path = tempfile.mkstemp(prefix="tglive-probe-", suffix=".mp4")
+    with os.fdopen(fd, "wb") as f:
+        f.write(head)
+        f.seek(offset)
+        f.write(moov)
+        f.truncate(file_size)
+    return path
+
+
+async def _probe_sparse(head: bytes, offset: int, moov: bytes, file_size: int) -> List[dict]:
+    path = await asyncio.to_thread(_write_sparse, head, offset, moov, file_size)
+    try:
+        return await probe_streams(b"", path=path)
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,131 @@
+import json
+import asyncio
+from typing import AsyncGenerator, List, Optional, Tuple
+
+from TGLive import get_logger
+from TGLive.helpers.process.resources import RESOURCES
+
+LOGGER = get_logger(__name__)
+
+# enough for TS/MKV/faststart MP4 headers
+PROBE_BYTES = 512 * 1024
+PROBE_TIMEOUT = 10
+
+# cleaner default: every audio track
+ALL_AUDIO = ["-map", "0:a?"]
+
+
+class ProbeError(Exception):
+    """
+    ffprobe could not run to completion (timeout, unreadable output);
+    says nothing about the file itself.
+    """
+
+
+async def peek(
+    source: AsyncGenerator[bytes, None],
+    size: int = PROBE_BYTES,
+) -> Tuple[bytes, AsyncGenerator[bytes, None]]:
+    """
+    Read the first `size` bytes of a byte stream without losing them.
+    Returns (head, stream) where stream yields the head first.
+    """
+    parts = []
+    read = 0
+    while read < size:
+        try:
+            chunk = await source.__anext__()
+        except StopAsyncIteration:
+            break
+        parts.append(chunk)
+        read += len(chunk)
+
+    head = b"".join(parts)
+
+    async def chained():
+        try:
+            if head:
+                yield head
+            async for chunk in source:
+                yield chunk
+        finally:
+            await source.aclose()
+
+    return head, chained()
+
+
+async def probe_streams(data: bytes, path: Optional[str] = None) -> List[dict]:
+    """
+    ffprobe stream metadata from in-memory bytes (or a file path).
+    Returns [] when ffprobe ran and found no streams; raises ProbeError
+    when the probe itself did not complete.
+    """
+    proc = await asyncio.create_subprocess_exec(
+        "ffprobe",
+        "-v", "error",
+        "-show_entries",
+        "stream=index,codec_type,codec_name,channels,sample_rate,width,height,r_frame_rate"
+        ":stream_tags=language,title",
+        "-of", "json",
+        "-i", path or "pipe:0",
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.DEVNULL,
+    )
+    RESOURCES.apply(proc.pid, "probe")
+
+    try:
+        stdout, _ = await asyncio.wait_for(
+            proc.communicate(None if path else data),
+            timeout=PROBE_TIMEOUT,
+        )
+    except (asyncio.TimeoutError, BrokenPipeError, ConnectionResetError) as e:
+        proc.kill()
+        await proc.wait()
+        raise ProbeError(f"ffprobe did not finish: {e!r}") from e
+
+    try:
+        return json.loads(stdout or b"{}").get("streams", [])
+    except ValueError as e:
+        raise ProbeError("unreadable ffprobe output") from e
+
+
+def audio_streams(streams: List[dict]) -> List[dict]:
+    return [s for s in streams if s.get("codec_type") == "audio"]
+
+
+def _language_matches(tag: str, wanted: str) -> bool:
+    tag, wanted = tag.lower(), wanted.lower()
+    # "hi" vs "hin", "en" vs "eng"
+    return tag == wanted or tag.startswith(wanted) or wanted.startswith(tag)
+
+
+def select_audio_map(streams: List[dict], options) -> List[str]:
+    """
+    ffmpeg -map arguments for the audio the channel actually publishes,
+    chosen from probed metadata and the channel's StreamOptions.
+    """
+    audio = audio_streams(streams)
+
+    if options.audio_languages:
+        for wanted in options.audio_languages:
+            for n, stream in enumerate(audio):
+                tag = stream.get("tags", {}).get("language", "")
+                if tag and _language_matches(tag, wanted):
+                    return ["-map", f"0:a:{n}"]
+
+    if options.audio_track is not None:
+        if audio and options.audio_track < len(audio):
+            return ["-map", f"0:a:{options.audio_track}"]
+        if audio:
+            LOGGER.debug(
+                "audio track %s not present (%s tracks), using first",
+                options.audio_track,
+                len(audio),
+            )
+
+    if options.audio_languages or options.audio_track is not None or options.audio_first_only:
+        # nothing matched (or probe failed): still publish a single track
+        return ["-map", "0:a:0?"]
+
+    return ALL_AUDIO
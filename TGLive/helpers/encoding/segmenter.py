@@ -0,0 +1,519 @@
+import math
+import time
+from typing import List, Optional
+
+from TGLive import get_logger
+from TGLive.helpers.encoding.store import DiskSegmentStore, get_notifier
+from TGLive.helpers.metrics import SEGMENT_INTERVAL
+
+LOGGER = get_logger(__name__)
+
+TS_PACKET_SIZE = 188
+TS_SYNC_BYTE = 0x47
+PTS_CLOCK = 90000
+PTS_WRAP = 1 << 33
+
+VIDEO_STREAM_TYPES = {0x01, 0x02, 0x10, 0x1B, 0x24}
+
+# a PTS step bigger than this (or backwards) is treated as a discontinuity
+MAX_PTS_GAP = 10 * PTS_CLOCK
+
+
+def parse_pts(data: bytes, pos: int) -> int:
+    return (
+        ((data[pos] >> 1) & 0x07) << 30
+        | data[pos + 1] << 22
+        | (data[pos + 2] >> 1) << 15
+        | data[pos + 3] << 7
+        | data[pos + 4] >> 1
+    )
+
+
+def pts_diff(a: int, b: int) -> int:
+    """
+    Signed a - b, taking the 33-bit wrap into account.
+    """
+    d = (a - b) % PTS_WRAP
+    return d - PTS_WRAP if d >= PTS_WRAP // 2 else d
+
+
+class TSPacketInfo:
+    __slots__ = ("pid", "pusi", "random_access", "payload_offset", "cc", "has_payload")
+
+    def __init__(self, pkt: bytes):
+        self.pid = ((pkt[1] & 0x1F) << 8) | pkt[2]
+        self.pusi = bool(pkt[1] & 0x40)
+        afc = (pkt[3] >> 4) & 0x03
+        self.cc = pkt[3] & 0x0F
+        self.has_payload = bool(afc & 0x01)
+        self.random_access = False
+        offset = 4
+
+        if afc & 0x02:
+            af_len = pkt[4]
+            if af_len > 0:
+                self.random_access = bool(pkt[5] & 0x40)
+            offset += 1 + af_len
+
+        self.payload_offset = offset
+
+
+def psi_section(pkt: bytes, info: TSPacketInfo) -> Optional[bytes]:
+    """
+    PSI section starting in this packet (single-packet PAT/PMT only).
+    """
+    if not info.pusi or not info.has_payload:
+        return None
+    offset = info.payload_offset
+    pointer = pkt[offset]
+    start = offset + 1 + pointer
+    if start + 3 > len(pkt):
+        return None
+    length = ((pkt[start + 1] & 0x0F) << 8) | pkt[start + 2]
+    return pkt[start:start + 3 + length]
+
+
+def parse_pes_timestamps(pkt: bytes, offset: int) -> tuple[Optional[int], Optional[int]]:
+    """
+    Returns (pts, dts) from a PES header starting at offset.
+    """
+    if offset + 14 > len(pkt) or pkt[offset:offset + 3] != b"\x00\x00\x01":
+        return None, None
+
+    flags = pkt[offset + 7] >> 6
+    pts = dts = None
+
+    if flags & 0x02:
+        pts = parse_pts(pkt, offset + 9)
+        dts = pts
+    if flags == 0x03 and offset + 19 <= len(pkt):
+        dts = parse_pts(pkt, offset + 14)
+
+    return pts, dts
+
+
+class HLSSegment:
+    __slots__ = ("sequence", "duration", "discontinuity", "parts")
+
+    def __init__(self, sequence: int, duration: float, discontinuity: bool, parts: list):
+        self.sequence = sequence
+        self.duration = duration
+        self.discontinuity = discontinuity
+        # [(duration, independent)] — only kept in low-latency mode
+        self.parts = parts
+
+
+class TSSegmenter:
+    """
+    In-process HLS segmenter for copy-codec MPEG-TS.
+
+    - tracks PAT/PMT to find the video (or first audio) PID
+    - cuts on random-access points once target_duration is reached
+    - writes %d.ts + live.m3u8 through a segment store
+      (atomic files on disk, or the in-memory ring)
+    - low-latency mode also writes %d.%d.ts partial segments and an
+      LL-HLS playlist (EXT-X-PART / EXT-X-PRELOAD-HINT)
+    """
+
+    # segments at the live edge that keep their parts listed
+    PART_WINDOW = 3
+
+    def __init__(
+        self,
+        hls_dir: str,
+        stream_name: str,
+        target_duration: float = 4.0,
+        list_size: int = 6,
+        store=None,
+        part_duration: Optional[float] = None,
+    ):
+        self.hls_dir = hls_dir
+        self.stream_name = stream_name
+        self.target_duration = target_duration
+        self.list_size = list_size
+        self.store = store or DiskSegmentStore(hls_dir)
+        self.part_duration = part_duration
+        self.notifier = get_notifier(stream_name)
+
+        # PSI
+        self.pmt_pid: Optional[int] = None
+        self.main_pid: Optional[int] = None
+        self.pat_pkt: Optional[bytes] = None
+        self.pmt_pkt: Optional[bytes] = None
+
+        # carry-over for packets split across writes
+        self._remainder = b""
+
+        # current segment
+        self.sequence = 0
+        self._buffer = bytearray()
+        self._tail_psi: List[bytes] = []
+        self._seg_start_pts: Optional[int] = None
+        self._seg_last_pts: Optional[int] = None
+        self._pending_discontinuity = False
+
+        # partial segments of the open segment
+        self._parts: List[tuple[float, bool]] = []
+        self._part_offset = 0
+        self._part_start_pts: Optional[int] = None
+        self._part_independent = True
+        self._au_step = 0
+
+        # published window
+        self.segments: List[HLSSegment] = []
+        self.discontinuity_sequence = 0
+        self.media_sequence = 0
+        self._last_finished: Optional[float] = None
+
+    # --------------------------------------------------
+    # LIFECYCLE
+    # --------------------------------------------------
+    async def start(self):
+        await self.store.open()
+        self.sequence = self.store.next_sequence()
+        self.media_sequence = self.sequence
+
+        # resuming an existing window: the new timeline is a discontinuity
+        self._pending_discontinuity = self.sequence > 1
+        if self._pending_discontinuity:
+            self.discontinuity_sequence = self._resume_discontinuity_sequence(
+                await self.store.last_playlist()
+            )
+
+        LOGGER.info(
+            "[%s] segmenter started (seq=%s target=%ss memory=%s)",
+            self.stream_name,
+            self.sequence,
+            self.target_duration,
+            self.store.in_memory,
+        )
+
+    @staticmethod
+    def _resume_discontinuity_sequence(previous: Optional[str]) -> int:
+        """
+        EXT-X-DISCONTINUITY-SEQUENCE must never go backwards. The new
+        window drops every segment of the previous playlist, so it starts
+        at the old value plus the discontinuities that leave with them.
+        """
+        if not previous:
+            return 0
+        value = 0
+        for line in previous.splitlines():
+            if line.startswith("#EXT-X-DISCONTINUITY-SEQUENCE:"):
+                try:
+                    value = int(line.split(":", 1)[1])
+                except ValueError:
+                    pass
+            elif line == "#EXT-X-DISCONTINUITY":
+                value += 1
+        return value
+
+    async def close(self):
+        if self._buffer and self._seg_start_pts is not None:
+            await self._finish_segment(self._seg_last_pts)
+
+        LOGGER.info("[%s] segmenter stopped", self.stream_name)
+
+    async def mark_discontinuity(self):
+        """
+        Close the open segment right here and tag the next one with
+        EXT-X-DISCONTINUITY (e.g. codec parameters change between videos).
+        Callers splice on a keyframe, so the new segment starts decodable.
+        """
+        if self._seg_start_pts is not None:
+            end_pts = (self._seg_last_pts + self._au_step) % PTS_WRAP
+            await self._finish_segment(end_pts)
+
+        self._pending_discontinuity = True
+        self._seg_start_pts = None
+        self._seg_last_pts = None
+        self._part_start_pts = None
+        self._part_independent = True
+
+    # --------------------------------------------------
+    # INPUT
+    # --------------------------------------------------
+    async def write(self, data: bytes):
+        data = self._remainder + data
+
+        start = data.find(bytes([TS_SYNC_BYTE]))
+        if start < 0:
+            self._remainder = b""
+            return
+
+        end = start + ((len(data) - start) // TS_PACKET_SIZE) * TS_PACKET_SIZE
+        self._remainder = data[end:]
+
+        for pos in range(start, end, TS_PACKET_SIZE):
+            pkt = data[pos:pos + TS_PACKET_SIZE]
+            if pkt[0] != TS_SYNC_BYTE:
+                continue
+            await self._handle_packet(pkt)
+
+    async def _handle_packet(self, pkt: bytes):
+        info = TSPacketInfo(pkt)
+
+        if info.pid == 0:
+            self.pat_pkt = pkt
+            self._parse_pat(pkt, info)
+            self._append_psi(pkt)
+            return
+
+        if info.pid == self.pmt_pid:
+            self.pmt_pkt = pkt
+            self._parse_pmt(pkt, info)
+            self._append_psi(pkt)
+            return
+
+        if info.pid == self.main_pid and info.pusi:
+            pts, _ = parse_pes_timestamps(pkt, info.payload_offset)
+            if pts is not None:
+                await self._on_access_unit(pts, info.random_access)
+
+        self._tail_psi.clear()
+        self._buffer += pkt
+
+    def _append_psi(self, pkt: bytes):
+        self._tail_psi.append(pkt)
+        self._buffer += pkt
+
+    # --------------------------------------------------
+    # PSI
+    # --------------------------------------------------
+    def _parse_pat(self, pkt: bytes, info: TSPacketInfo):
+        section = psi_section(pkt, info)
+        if not section or section[0] != 0x00:
+            return
+
+        for pos in range(8, len(section) - 4, 4):
+            program = (section[pos] << 8) | section[pos + 1]
+            if program == 0:
+                continue
+            self.pmt_pid = ((section[pos + 2] & 0x1F) << 8) | section[pos + 3]
+            return
+
+    def _parse_pmt(self, pkt: bytes, info: TSPacketInfo):
+        section = psi_section(pkt, info)
+        if not section or section[0] != 0x02:
+            return
+
+        info_len = ((section[10] & 0x0F) << 8) | section[11]
+        pos = 12 + info_len
+        video_pid = audio_pid = None
+
+        while pos + 5 <= len(section) - 4:
+            stream_type = section[pos]
+            pid = ((section[pos + 1] & 0x1F) << 8) | section[pos + 2]
+            es_len = ((section[pos + 3] & 0x0F) << 8) | section[pos + 4]
+
+            if stream_type in VIDEO_STREAM_TYPES and video_pid is None:
+                video_pid = pid
+            elif audio_pid is None:
+                audio_pid = pid
+
+            pos += 5 + es_len
+
+        main_pid = video_pid if video_pid is not None else audio_pid
+        if main_pid != self.main_pid:
+            LOGGER.debug(
+                "[%s] segmenter main pid=%s (video=%s)",
+                self.stream_name,
+                main_pid,
+                video_pid is not None,
+            )
+            self.main_pid = main_pid
+
+    # --------------------------------------------------
+    # CUTTING
+    # --------------------------------------------------
+    async def _on_access_unit(self, pts: int, keyframe: bool):
+        if self._seg_start_pts is None:
+            self._seg_start_pts = pts
+            self._seg_last_pts = pts
+            self._part_start_pts = pts
+            return
+
+        step = pts_diff(pts, self._seg_last_pts)
+        if step < -PTS_CLOCK or step > MAX_PTS_GAP:
+            LOGGER.warning(
+                "[%s] PTS jump (%.2fs), starting new timeline",
+                self.stream_name,
+                step / PTS_CLOCK,
+            )
+            await self._finish_segment(self._seg_last_pts)
+            self._pending_discontinuity = True
+            self._seg_start_pts = pts
+            self._seg_last_pts = pts
+            self._part_start_pts = pts
+            return
+
+        if step > 0:
+            self._seg_last_pts = pts
+            self._au_step = step
+
+        elapsed = pts_diff(pts, self._seg_start_pts) / PTS_CLOCK
+        if keyframe and elapsed >= self.target_duration:
+            await self._finish_segment(pts)
+            self._seg_start_pts = pts
+            self._seg_last_pts = pts
+            self._part_start_pts = pts
+            self._part_independent = True
+            return
+
+        # parts never exceed PART-TARGET: cut before the AU that would overflow
+        if self.part_duration and self._part_start_pts is not None:
+            part_elapsed = pts_diff(pts, self._part_start_pts) + self._au_step
+            if part_elapsed / PTS_CLOCK > self.part_duration:
+                await self._finish_part(pts)
+                self._part_independent = keyframe
+
+    async def _finish_part(self, end_pts: Optional[int]):
+        data = bytes(self._buffer[self._part_offset:])
+        if not data:
+            return
+
+        duration = 0.0
+        if end_pts is not None and self._part_start_pts is not None:
+            duration = max(0.0, pts_diff(end_pts, self._part_start_pts) / PTS_CLOCK)
+
+        await self.store.put_segment(f"{self.sequence}.{len(self._parts)}.ts", data)
+
+        self._parts.append((duration, self._part_independent))
+        self._part_offset = len(self._buffer)
+        self._part_start_pts = end_pts
+
+        await self.store.put_playlist(self.render_playlist())
+        await self.notifier.publish(self.sequence - 1, self.sequence, len(self._parts))
+
+    async def _finish_segment(self, end_pts: Optional[int]):
+        if not self._buffer:
+            return
+
+        # PAT/PMT emitted right before the keyframe belong to the next segment
+        carry = list(self._tail_psi)
+        if carry:
+            del self._buffer[len(self._buffer) - TS_PACKET_SIZE * len(carry):]
+        elif self.pat_pkt and self.pmt_pkt:
+            carry = [self.pat_pkt, self.pmt_pkt]
+
+        if self.part_duration:
+            self._part_offset = min(self._part_offset, len(self._buffer))
+            await self._finish_part(end_pts)
+
+        duration = 0.0
+        if end_pts is not None and self._seg_start_pts is not None:
+            duration = max(0.0, pts_diff(end_pts, self._seg_start_pts) / PTS_CLOCK)
+        if duration <= 0:
+            duration = self.target_duration
+
+        seq = self.sequence
+        data = bytes(self._buffer)
+        parts = self._parts
+
+        self._buffer = bytearray(b"".join(carry))
+        self._tail_psi = list(carry)
+        self._parts = []
+        self._part_offset = 0
+        self.sequence += 1
+
+        await self.store.put_segment(f"{seq}.ts", data)
+
+        self.segments.append(
+            HLSSegment(seq, duration, self._pending_discontinuity, parts)
+        )
+        self._pending_discontinuity = False
+
+        removed = []
+        while len(self.segments) > self.list_size:
+            old = self.segments.pop(0)
+            if old.discontinuity:
+                self.discontinuity_sequence += 1
+            removed.append(old.sequence)
+
+        if self.segments:
+            self.media_sequence = self.segments[0].sequence
+
+        await self._publish(removed)
+        await self.notifier.publish(seq, self.sequence, 0)
+
+        now = time.monotonic()
+        if self._last_finished is not None:
+            SEGMENT_INTERVAL.observe(self.stream_name, value=now - self._last_finished)
+        self._last_finished = now
+
+        LOGGER.debug(
+            "[%s] segment %s ready (%.2fs, %d bytes)",
+            self.stream_name,
+            seq,
+            duration,
+            len(data),
+        )
+
+    # --------------------------------------------------
+    # OUTPUT
+    # --------------------------------------------------
+    def render_playlist(self) -> str:
+        durations = [math.ceil(seg.duration) for seg in self.segments]
+        target = max([math.ceil(self.target_duration), *durations])
+
+        lines = [
+            "#EXTM3U",
+            f"#EXT-X-VERSION:{6 if self.part_duration else 3}",
+            f"#EXT-X-TARGETDURATION:{target}",
+        ]
+
+        if self.part_duration:
+            lines += [
+                "#EXT-X-SERVER-CONTROL:CAN-BLOCK-RELOAD=YES,"
+                f"PART-HOLD-BACK={self.part_duration * 3:.3f}",
+                f"#EXT-X-PART-INF:PART-TARGET={self.part_duration:.3f}",
+            ]
+
+        lines += [
+            f"#EXT-X-MEDIA-SEQUENCE:{self.media_sequence}",
+            f"#EXT-X-DISCONTINUITY-SEQUENCE:{self.discontinuity_sequence}",
+            "#EXT-X-INDEPENDENT-SEGMENTS",
+        ]
+
+        part_from = len(self.segments) - self.PART_WINDOW
+        for i, seg in enumerate(self.segments):
+            if seg.discontinuity:
+                lines.append("#EXT-X-DISCONTINUITY")
+            if self.part_duration and i >= part_from:
+                lines += self._render_parts(seg.sequence, seg.parts)
+            lines.append(f"#EXTINF:{seg.duration:.3f},")
+            lines.append(f"{seg.sequence}.ts")
+
+        if self.part_duration:
+            if self._pending_discontinuity and self._parts:
+                lines.append("#EXT-X-DISCONTINUITY")
+            lines += self._render_parts(self.sequence, self._parts)
+            lines.append(
+                "#EXT-X-PRELOAD-HINT:TYPE=PART,"
+                f'URI="{self.sequence}.{len(self._parts)}.ts"'
+            )
+
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _render_parts(sequence: int, parts: list) -> List[str]:
+        lines = []
+        for idx, (duration, independent) in enumerate(parts):
+            attrs = f'DURATION={duration:.3f},URI="{sequence}.{idx}.ts"'
+            if independent:
+                attrs += ",INDEPENDENT=YES"
+            lines.append(f"#EXT-X-PART:{attrs}")
+        return lines
+
+    async def _publish(self, removed: List[int]):
+        await self.store.put_playlist(self.render_playlist())
+
+        # keep one extra segment for clients still on the old playlist
+        for seq in removed:
+            await self.store.remove(f"{seq - 1}.ts")
+
+        # parts are only listed near the live edge
+        if self.part_duration and len(self.segments) > self.PART_WINDOW:
+            old = self.segments[-self.PART_WINDOW - 1]
+            for idx in range(len(old.parts)):
+                await self.store.remove(f"{old.sequence}.{idx}.ts")
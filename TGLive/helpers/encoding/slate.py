@@ -0,0 +1,155 @@
+import asyncio
+from typing import Dict, List, Optional, Tuple
+
+from TGLive import get_logger, Telegram
+from TGLive.helpers.encoding.probe import PROBE_BYTES, ProbeError, probe_streams
+from TGLive.helpers.process.resources import RESOURCES
+
+LOGGER = get_logger(__name__)
+
+# (video codec, width, height, fps, audio sample rate)
+SlateParams = Tuple[str, int, int, str, int]
+
+VIDEO_ENCODERS = {"h264": "libx264", "hevc": "libx265"}
+
+# encoded slates by parameters; None = that encode failed, don't retry
+_slates: Dict[SlateParams, Optional[bytes]] = {}
+_slate_lock = asyncio.Lock()
+
+
+def default_params() -> SlateParams:
+    width, _, height = Telegram.SLATE_RESOLUTION.partition("x")
+    return ("h264", int(width), int(height), "25", 48000)
+
+
+def slate_params(streams: List[dict]) -> Optional[SlateParams]:
+    """
+    Slate parameters matching probed source streams, None when the
+    source has no video the slate could stand in for.
+    """
+    video = next((s for s in streams if s.get("codec_type") == "video"), None)
+    if not video or not video.get("width") or not video.get("height"):
+        return None
+
+    audio = next((s for s in streams if s.get("codec_type") == "audio"), {})
+    fps = video.get("r_frame_rate") or "25"
+    if fps in ("0/0", "0/1"):
+        fps = "25"
+
+    return (
+        video.get("codec_name") or "h264",
+        int(video["width"]),
+        int(video["height"]),
+        fps,
+        int(audio.get("sample_rate") or 48000),
+    )
+
+
+async def get_slate(params: Optional[SlateParams] = None) -> Optional[bytes]:
+    """
+    Returns a short pre-encoded black/silent TS clip (one GOP) with the
+    given parameters (SLATE_RESOLUTION / h264 / 25 fps by default),
+    encoded once per parameter set and cached in memory. None when
+    encoding fails.
+    """
+    params = params or default_params()
+
+    if params in _slates:
+        return _slates[params]
+
+    async with _slate_lock:
+        if params in _slates:
+            return _slates[params]
+
+        codec, width, height, fps, sample_rate = params
+        encoder = VIDEO_ENCODERS.get(codec)
+        if encoder is None:
+            LOGGER.warning("no slate encoder for %s", codec)
+            _slates[params] = None
+            return None
+
+        duration = str(Telegram.SLATE_DURATION)
+        proc = await asyncio.create_subprocess_exec(
+            "ffmpeg",
+            "-loglevel", "error",
+            "-threads", str(RESOURCES.threads("slate")),
+            "-f", "lavfi",
+            "-i", f"color=c=black:s={width}x{height}:r={fps}:d={duration}",
+            "-f", "lavfi",
+            "-i", f"anullsrc=r={sample_rate}:cl=stereo",
+            "-t", duration,
+            "-c:v", encoder,
+            "-preset", "ultrafast",
+            "-tune", "stillimage" if encoder == "libx264" else "zerolatency",
+            "-pix_fmt", "yuv420p",
+            "-g", "250",
+            "-c:a", "aac",
+            "-b:a", "64k",
+            "-ac", "2",
+            "-f", "mpegts",
+            "pipe:1",
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        RESOURCES.apply(proc.pid, "slate")
+        stdout, stderr = await proc.communicate()
+
+        if proc.returncode != 0 or not stdout:
+            LOGGER.error(
+                "slate encode failed (%s): %s",
+                params,
+                stderr.decode(errors="ignore").strip(),
+            )
+            _slates[params] = None
+            return None
+
+        _slates[params] = stdout
+        LOGGER.info(
+            "slate ready (%s %sx%s@%s, %ss, %.1f KB)",
+            codec,
+            width,
+            height,
+            fps,
+            duration,
+            len(stdout) / 1024,
+        )
+        return stdout
+
+
+class SourceSlate:
+    """
+    Slate matched to the video currently on air: keeps the head of the
+    running video's TS and, when a slate is needed, probes it and uses a
+    slate with the same codec, size, frame rate and audio sample rate.
+    Falls back to the default slate when the source can't be probed.
+    """
+
+    def __init__(self, stream_name: str):
+        self.stream_name = stream_name
+        self._head = bytearray()
+        self._clip: Optional[bytes] = None
+        self._resolved = False
+
+    def begin_video(self):
+        self._head = bytearray()
+        self._clip = None
+        self._resolved = False
+
+    def feed(self, data: bytes):
+        if len(self._head) < PROBE_BYTES:
+            self._head += data
+
+    async def clip(self) -> Optional[bytes]:
+        if self._resolved:
+            return self._clip
+
+        params = None
+        if self._head:
+            try:
+                params = slate_params(await probe_streams(bytes(self._head)))
+            except ProbeError as e:
+                LOGGER.warning("[%s] slate probe failed: %s", self.stream_name, e)
+
+        self._clip = (await get_slate(params) if params else None) or await get_slate()
+        self._resolved = True
+        return self._clip
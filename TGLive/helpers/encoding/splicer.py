@@ -0,0 +1,298 @@
+from typing import Dict, Optional
+
+from TGLive import get_logger
+from TGLive.helpers.encoding.segmenter import (
+    TS_PACKET_SIZE,
+    TS_SYNC_BYTE,
+    PTS_CLOCK,
+    PTS_WRAP,
+    VIDEO_STREAM_TYPES,
+    TSPacketInfo,
+    parse_pes_timestamps,
+    parse_pts,
+    psi_section,
+    pts_diff,
+)
+
+LOGGER = get_logger(__name__)
+
+# gap left between the last timestamp of a video and the first of the next
+SPLICE_GAP = PTS_CLOCK // 25
+
+# give up waiting for a keyframe after an insert (~4 MB of source)
+RESYNC_MAX_PACKETS = 20000
+
+# source held back while looking for the first PES to anchor on
+ANCHOR_HOLD_MAX = 256 * 1024
+
+
+def write_pts(buf: bytearray, pos: int, ts: int):
+    prefix = buf[pos] & 0xF0
+    buf[pos] = prefix | (((ts >> 30) & 0x07) << 1) | 0x01
+    buf[pos + 1] = (ts >> 22) & 0xFF
+    buf[pos + 2] = (((ts >> 15) & 0x7F) << 1) | 0x01
+    buf[pos + 3] = (ts >> 7) & 0xFF
+    buf[pos + 4] = ((ts & 0x7F) << 1) | 0x01
+
+
+class TSSplicer:
+    """
+    Joins per-video cleaner output into one continuous TS.
+
+    Every cleaner run restarts timestamps near zero
+    (-avoid_negative_ts make_zero). The splicer rebases PTS/DTS/PCR
+    of each new video onto the end of the previous one and rewrites
+    continuity counters, so the runner/segmenter sees a monotonic
+    stream and never has to restart at a video boundary.
+
+    After an insert the interrupted video is resumed on its next
+    random-access point, so both ends of the splice sit on a keyframe.
+    """
+
+    def __init__(self, stream_name: str):
+        self.stream_name = stream_name
+
+        self._remainder = b""
+        self._offset = 0
+        self._need_anchor = False
+        self._held = bytearray()
+
+        self._end_ts: Optional[int] = None
+        self._cc: Dict[int, int] = {}
+
+        # source PSI, to know which pid carries the keyframes
+        self._pmt_pid: Optional[int] = None
+        self._main_pid: Optional[int] = None
+        self._resync = False
+        self._dropped = 0
+
+        self.videos = 0
+
+    # --------------------------------------------------
+    # BOUNDARIES
+    # --------------------------------------------------
+    def begin_video(self):
+        """
+        The next video's first PES DTS/PTS becomes the splice point.
+        """
+        self._remainder = b""
+        self._held = bytearray()
+        self._resync = False
+        self.videos += 1
+
+        # first video keeps its own timeline
+        self._need_anchor = self._end_ts is not None
+
+    def insert(self, clip: bytes) -> bytes:
+        """
+        Splice a complete TS clip (e.g. the slate) in at the current
+        position. The interrupted video is re-anchored after it.
+        """
+        remainder, held = self._remainder, self._held
+        self._remainder, self._held = b"", bytearray()
+        self._need_anchor = self._end_ts is not None
+
+        out = self._process(clip, source=False)
+
+        self._remainder, self._held = remainder, held
+        self._need_anchor = self._end_ts is not None
+
+        # resume on a keyframe instead of mid-GOP (needs the source PMT)
+        self._resync = self._main_pid is not None
+        self._dropped = 0
+        return out
+
+    def _anchor(self, first_ts: int):
+        target = (self._end_ts + SPLICE_GAP) % PTS_WRAP
+        self._offset = (target - first_ts) % PTS_WRAP
+        self._need_anchor = False
+
+        LOGGER.debug(
+            "[%s] splice #%s offset=%.3fs",
+            self.stream_name,
+            self.videos,
+            self._offset / PTS_CLOCK,
+        )
+
+    def _rebase(self, ts: int) -> int:
+        if self._need_anchor:
+            self._anchor(ts)
+
+        out = (ts + self._offset) % PTS_WRAP
+        if self._end_ts is None or pts_diff(out, self._end_ts) > 0:
+            self._end_ts = out
+        return out
+
+    # --------------------------------------------------
+    # PACKETS
+    # --------------------------------------------------
+    def process(self, data: bytes) -> bytes:
+        return self._process(data, source=True)
+
+    def _process(self, data: bytes, source: bool) -> bytes:
+        data = self._remainder + data
+
+        start = data.find(bytes([TS_SYNC_BYTE]))
+        if start < 0:
+            self._remainder = b""
+            return b""
+
+        end = start + ((len(data) - start) // TS_PACKET_SIZE) * TS_PACKET_SIZE
+        self._remainder = data[end:]
+
+        buf = bytearray(data[start:end])
+        if source:
+            self._track_psi(buf)
+            if self._resync:
+                buf = self._skip_to_keyframe(buf)
+
+        if self._need_anchor:
+            # PCR runs ahead of the stream's DTS by the mux delay, so
+            # anchor on the first DTS/PTS and shift the PCR along with it
+            buf = self._held + buf
+            self._held = bytearray()
+            first = self._first_pes_ts(buf, self._main_pid if source else None)
+            if first is not None:
+                self._anchor(first)
+            elif len(buf) < ANCHOR_HOLD_MAX:
+                self._held = buf
+                return b""
+
+        for pos in range(0, len(buf), TS_PACKET_SIZE):
+            if buf[pos] == TS_SYNC_BYTE:
+                self._process_packet(buf, pos)
+
+        return bytes(buf)
+
+    @staticmethod
+    def _first_pes_ts(buf: bytearray, pid: Optional[int]) -> Optional[int]:
+        """
+        DTS (else PTS) of the first PES starting in buf, on `pid` when
+        given.
+        """
+        for pos in range(0, len(buf), TS_PACKET_SIZE):
+            pkt = bytes(buf[pos:pos + TS_PACKET_SIZE])
+            info = TSPacketInfo(pkt)
+            if not info.pusi or not info.has_payload or info.pid == 0:
+                continue
+            if pid is not None and info.pid != pid:
+                continue
+            pts, dts = parse_pes_timestamps(pkt, info.payload_offset)
+            if dts is not None or pts is not None:
+                return dts if dts is not None else pts
+        return None
+
+    def _track_psi(self, buf: bytearray):
+        for pos in range(0, len(buf), TS_PACKET_SIZE):
+            pid = ((buf[pos + 1] & 0x1F) << 8) | buf[pos + 2]
+            if pid != 0 and pid != self._pmt_pid:
+                continue
+
+            pkt = bytes(buf[pos:pos + TS_PACKET_SIZE])
+            section = psi_section(pkt, TSPacketInfo(pkt))
+            if not section:
+                continue
+
+            if section[0] == 0x00:
+                for i in range(8, len(section) - 4, 4):
+                    if (section[i] << 8) | section[i + 1]:
+                        self._pmt_pid = ((section[i + 2] & 0x1F) << 8) | section[i + 3]
+                        break
+
+            elif section[0] == 0x02:
+                info_len = ((section[10] & 0x0F) << 8) | section[11]
+                i = 12 + info_len
+                first = None
+                while i + 5 <= len(section) - 4:
+                    es_pid = ((section[i + 1] & 0x1F) << 8) | section[i + 2]
+                    if section[i] in VIDEO_STREAM_TYPES:
+                        first = es_pid
+                        break
+                    if first is None:
+                        first = es_pid
+                    i += 5 + (((section[i + 3] & 0x0F) << 8) | section[i + 4])
+                self._main_pid = first
+
+    def _skip_to_keyframe(self, buf: bytearray) -> bytearray:
+        """
+        Drop source packets until the main pid starts a random-access
+        unit. PAT/PMT pass through so the resumed part is self-describing.
+        """
+        out = bytearray()
+        for pos in range(0, len(buf), TS_PACKET_SIZE):
+            pkt = buf[pos:pos + TS_PACKET_SIZE]
+            pid = ((pkt[1] & 0x1F) << 8) | pkt[2]
+
+            if self._resync and pid == self._main_pid:
+                info = TSPacketInfo(bytes(pkt))
+                if info.pusi and info.random_access:
+                    self._resync = False
+                    LOGGER.debug(
+                        "[%s] resumed on keyframe, dropped %s packets",
+                        self.stream_name,
+                        self._dropped,
+                    )
+                elif self._dropped >= RESYNC_MAX_PACKETS:
+                    self._resync = False
+                    LOGGER.warning(
+                        "[%s] no keyframe after slate, resuming mid-GOP",
+                        self.stream_name,
+                    )
+
+            if self._resync and pid != 0 and pid != self._pmt_pid:
+                self._dropped += 1
+                continue
+            out += pkt
+        return out
+
+    def _process_packet(self, buf: bytearray, pos: int):
+        pid = ((buf[pos + 1] & 0x1F) << 8) | buf[pos + 2]
+        if pid == 0x1FFF:
+            return
+
+        pusi = buf[pos + 1] & 0x40
+        afc = (buf[pos + 3] >> 4) & 0x03
+        payload = pos + 4
+
+        # PCR
+        if afc & 0x02:
+            af_len = buf[pos + 4]
+            if af_len >= 7 and buf[pos + 5] & 0x10:
+                p = pos + 6
+                base = (
+                    buf[p] << 25
+                    | buf[p + 1] << 17
+                    | buf[p + 2] << 9
+                    | buf[p + 3] << 1
+                    | buf[p + 4] >> 7
+                )
+                base = self._rebase(base)
+                buf[p] = (base >> 25) & 0xFF
+                buf[p + 1] = (base >> 17) & 0xFF
+                buf[p + 2] = (base >> 9) & 0xFF
+                buf[p + 3] = (base >> 1) & 0xFF
+                buf[p + 4] = ((base & 0x01) << 7) | (buf[p + 4] & 0x7F)
+            payload += 1 + af_len
+
+        # PES timestamps
+        if (
+            pusi
+            and afc & 0x01
+            and pid != 0
+            and payload + 14 <= pos + TS_PACKET_SIZE
+            and buf[payload:payload + 3] == b"\x00\x00\x01"
+        ):
+            flags = buf[payload + 7] >> 6
+            if flags & 0x02:
+                write_pts(buf, payload + 9, self._rebase(parse_pts(buf, payload + 9)))
+            if flags == 0x03 and payload + 19 <= pos + TS_PACKET_SIZE:
+                write_pts(buf, payload + 14, self._rebase(parse_pts(buf, payload + 14)))
+
+        # continuity counter (only advances on payload packets)
+        last = self._cc.get(pid)
+        if afc & 0x01:
+            cc = 0 if last is None else (last + 1) & 0x0F
+        else:
+            cc = 0 if last is None else last
+        self._cc[pid] = cc
+        buf[pos + 3] = (buf[pos + 3] & 0xF0) | cc
@@ -0,0 +1,207 @@
+import os
+import time
+import asyncio
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from TGLive import get_logger
+from TGLive.helpers.encoding.utils import get_last_segment_number
+
+LOGGER = get_logger(__name__)
+
+PLAYLIST_NAME = "live.m3u8"
+
+
+class DiskSegmentStore:
+    """
+    Writes segments + playlist under hls/<stream>/ (tmp + rename).
+    """
+
+    in_memory = False
+
+    def __init__(self, hls_dir: str):
+        self.hls_dir = hls_dir
+
+    def next_sequence(self) -> int:
+        return get_last_segment_number(self.hls_dir)
+
+    async def open(self):
+        os.makedirs(self.hls_dir, exist_ok=True)
+
+    async def put_segment(self, name: str, data: bytes):
+        await asyncio.to_thread(
+            self._write_atomic, os.path.join(self.hls_dir, name), data
+        )
+
+    async def put_playlist(self, text: str, name: str = PLAYLIST_NAME):
+        await asyncio.to_thread(
+            self._write_atomic, os.path.join(self.hls_dir, name), text.encode()
+        )
+
+    async def remove(self, name: str):
+        await asyncio.to_thread(self._remove, os.path.join(self.hls_dir, name))
+
+    async def last_playlist(self, name: str = PLAYLIST_NAME) -> Optional[str]:
+        return await asyncio.to_thread(self._read, os.path.join(self.hls_dir, name))
+
+    @staticmethod
+    def _read(path: str) -> Optional[str]:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    @staticmethod
+    def _write_atomic(path: str, data: bytes):
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+class MemorySegmentStore:
+    """
+    Bounded per-stream ring of segments + playlists held as bytes.
+
+    Survives pipeline restarts (kept in SEGMENT_STORES) so segment
+    numbering continues and viewers keep a valid window.
+    """
+
+    in_memory = True
+
+    def __init__(self, stream_name: str, max_segments: int, max_parts: int = 64):
+        self.stream_name = stream_name
+        self.max_segments = max_segments
+        self.max_parts = max_parts
+
+        self.segments: "OrderedDict[str, bytes]" = OrderedDict()
+        self.parts: "OrderedDict[str, bytes]" = OrderedDict()
+        self.playlists: Dict[str, bytes] = {}
+        self.updated_at: Dict[str, float] = {}
+        self._last_sequence = 0
+
+    def next_sequence(self) -> int:
+        return self._last_sequence + 1
+
+    async def open(self):
+        pass
+
+    async def put_segment(self, name: str, data: bytes):
+        self.updated_at[name] = time.time()
+
+        # partial segments (<seq>.<part>.ts) have their own bound
+        if name.count(".") > 1:
+            ring, limit = self.parts, self.max_parts
+        else:
+            ring, limit = self.segments, self.max_segments
+            stem = name.split(".", 1)[0]
+            if stem.isdigit():
+                self._last_sequence = max(self._last_sequence, int(stem))
+
+        ring[name] = data
+        while len(ring) > limit:
+            old, _ = ring.popitem(last=False)
+            self.updated_at.pop(old, None)
+
+    async def put_playlist(self, text: str, name: str = PLAYLIST_NAME):
+        self.playlists[name] = text.encode()
+        self.updated_at[name] = time.time()
+
+    async def remove(self, name: str):
+        self.segments.pop(name, None)
+        self.parts.pop(name, None)
+        self.updated_at.pop(name, None)
+
+    async def last_playlist(self, name: str = PLAYLIST_NAME) -> Optional[str]:
+        body = self.playlists.get(name)
+        return body.decode() if body is not None else None
+
+    def get(self, name: str) -> Optional[bytes]:
+        if name in self.playlists:
+            return self.playlists[name]
+        if name in self.segments:
+            return self.segments[name]
+        return self.parts.get(name)
+
+    @property
+    def size(self) -> int:
+        return sum(len(v) for v in self.segments.values()) + sum(
+            len(v) for v in self.parts.values()
+        )
+
+
+SEGMENT_STORES: Dict[str, MemorySegmentStore] = {}
+
+
+def get_memory_store(stream_name: str, max_segments: int) -> MemorySegmentStore:
+    store = SEGMENT_STORES.get(stream_name)
+    if store is None:
+        store = MemorySegmentStore(stream_name, max_segments)
+        SEGMENT_STORES[stream_name] = store
+        LOGGER.info(
+            "[%s] in-memory HLS ring created (%s segments)",
+            stream_name,
+            max_segments,
+        )
+    return store
+
+
+class PlaylistNotifier:
+    """
+    Wakes blocking playlist reloads (_HLS_msn / _HLS_part) and
+    preload-hinted part requests when the segmenter publishes.
+    """
+
+    def __init__(self):
+        self.complete_msn = -1   # last fully published segment
+        self.open_msn = -1       # segment currently being written
+        self.parts_done = 0      # finished parts of the open segment
+        self.published_at = 0.0  # monotonic time of the last publish
+        self._cond = asyncio.Condition()
+
+    async def publish(self, complete_msn: int, open_msn: int, parts_done: int):
+        async with self._cond:
+            self.complete_msn = complete_msn
+            self.open_msn = open_msn
+            self.parts_done = parts_done
+            self.published_at = time.monotonic()
+            self._cond.notify_all()
+
+    def ready(self, msn: int, part: Optional[int] = None) -> bool:
+        if self.complete_msn >= msn:
+            return True
+        if part is None:
+            return False
+        return self.open_msn > msn or (
+            self.open_msn == msn and self.parts_done > part
+        )
+
+    async def wait_for(self, msn: int, part: Optional[int], timeout: float) -> bool:
+        async with self._cond:
+            try:
+                await asyncio.wait_for(
+                    self._cond.wait_for(lambda: self.ready(msn, part)),
+                    timeout=timeout,
+                )
+                return True
+            except asyncio.TimeoutError:
+                return False
+
+
+PLAYLIST_NOTIFIERS: Dict[str, PlaylistNotifier] = {}
+
+
+def get_notifier(stream_name: str) -> PlaylistNotifier:
+    notifier = PLAYLIST_NOTIFIERS.get(stream_name)
+    if notifier is None:
+        notifier = PlaylistNotifier()
+        PLAYLIST_NOTIFIERS[stream_name] = notifier
+    return notifier
@@ -1,5 +1,6 @@
 # byte_streamer.py (debug-enhanced, logic unchanged)
 
+import time
 import asyncio
 from typing import Dict, Union
 
@@ -10,6 +11,7 @@ from pyrogram.session import Session, Auth
 
 from TGLive.helpers.ext_utils.utils import get_file_ids
 from TGLive.helpers.ext_utils.exception import FIleNotFound
+from TGLive.helpers.metrics import FILEID_CACHE, GETFILE_LATENCY, CLIENT_ERRORS
 
 
 from TGLive import get_logger
@@ -47,7 +49,9 @@ class ByteStreamer:
             message_id,
         )
 
-        if message_id not in self.__cached_file_ids:
+        key = (int(chat_id), int(message_id))
+        if key not in self.__cached_file_ids:
+            FILEID_CACHE.inc("miss")
             LOGGER.debug(
                 "[get_file_properties] cache miss for message_id=%s",
                 message_id,
@@ -81,18 +85,19 @@ class ByteStreamer:
                 )
                 raise ValueError("Only video files are supported.")
 
-            self.__cached_file_ids[message_id] = file_id
+            self.__cached_file_ids[key] = file_id
             LOGGER.debug(
                 "[get_file_properties] cached file_id for message_id=%s",
                 message_id,
             )
         else:
+            FILEID_CACHE.inc("hit")
             LOGGER.debug(
                 "[get_file_properties] cache hit for message_id=%s",
                 message_id,
             )
 
-        return self.__cached_file_ids[message_id]
+        return self.__cached_file_ids[key]
 
     # ---------------------------------------------------------
     # FILE STREAMING
@@ -138,6 +143,7 @@ class ByteStreamer:
                 chunk_size,
             )
 
+            started = time.perf_counter()
             r = await media_session.send(
                 raw.functions.upload.GetFile(
                     location=location,
@@ -145,6 +151,7 @@ class ByteStreamer:
                     limit=chunk_size,
                 )
             )
+            GETFILE_LATENCY.observe(str(index), value=time.perf_counter() - started)
 
             LOGGER.debug(
                 "[yield_file] first GetFile response type=%s",
@@ -202,6 +209,7 @@ class ByteStreamer:
                         LOGGER.debug("[yield_file] reached final part, stopping")
                         break
 
+                    started = time.perf_counter()
                     r = await media_session.send(
                         raw.functions.upload.GetFile(
                             location=location,
@@ -209,14 +217,20 @@ class ByteStreamer:
                             limit=chunk_size,
                         )
                     )
+                    GETFILE_LATENCY.observe(str(index), value=time.perf_counter() - started)
 
         except (TimeoutError, AttributeError) as e:
+            CLIENT_ERRORS.inc(str(index), type(e).__name__)
             LOGGER.debug(
                 "[yield_file] streaming exception=%s",
                 repr(e),
                 exc_info=True,
             )
 
+        except Exception as e:
+            CLIENT_ERRORS.inc(str(index), type(e).__name__)
+            raise
+
         finally:
             LOGGER.debug(
                 "[yield_file] FINISH index=%s total_parts_sent=%s",
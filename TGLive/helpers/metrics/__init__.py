@@ -0,0 +1,27 @@
+from .registry import (
+    METRICS,
+    BYTES_FETCHED,
+    BYTES_WRITTEN,
+    STREAM_RESTARTS,
+    WATCHDOG_TRIPS,
+    SEGMENT_INTERVAL,
+    GETFILE_LATENCY,
+    FILEID_CACHE,
+    CLIENT_ERRORS,
+    HTTP_REQUESTS,
+    HTTP_BYTES,
+)
+
+__all__ = (
+    "METRICS",
+    "BYTES_FETCHED",
+    "BYTES_WRITTEN",
+    "STREAM_RESTARTS",
+    "WATCHDOG_TRIPS",
+    "SEGMENT_INTERVAL",
+    "GETFILE_LATENCY",
+    "FILEID_CACHE",
+    "CLIENT_ERRORS",
+    "HTTP_REQUESTS",
+    "HTTP_BYTES",
+)
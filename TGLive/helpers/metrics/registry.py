@@ -0,0 +1,208 @@
+import bisect
+from typing import Callable, Dict, Iterable, List, Tuple
+
+LabelValues = Tuple[str, ...]
+
+# GetFile round trips and segment intervals, in seconds
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 16, 30)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Tuple[str, ...], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, doc: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.doc = doc
+        self.labels = tuple(labels)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.doc}",
+            f"# TYPE {self.name} {self.kind}",
+            *self.samples(),
+        ]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, doc: str, labels: Iterable[str] = ()):
+        super().__init__(name, doc, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labels, k)} {_format_value(v)}"
+            for k, v in sorted(self._values.items())
+        ]
+
+
+class Gauge(Metric):
+    """
+    Set directly, or computed at scrape time by `collect`.
+    """
+
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        doc: str,
+        labels: Iterable[str] = (),
+        collect: Callable[[], Dict[LabelValues, float]] = None,
+    ):
+        super().__init__(name, doc, labels)
+        self._values: Dict[LabelValues, float] = {}
+        self._collect = collect
+
+    def set(self, *labels, value: float):
+        self._values[labels] = value
+
+    def samples(self) -> List[str]:
+        values = self._collect() if self._collect else self._values
+        return [
+            f"{self.name}{_format_labels(self.labels, k)} {_format_value(v)}"
+            for k, v in sorted(values.items())
+        ]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        doc: str,
+        labels: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, doc, labels)
+        self.buckets = tuple(sorted(buckets))
+        # per label set: [bucket counts..., +Inf count], sum
+        self._counts: Dict[LabelValues, List[int]] = {}
+        self._sums: Dict[LabelValues, float] = {}
+
+    def observe(self, *labels, value: float):
+        counts = self._counts.get(labels)
+        if counts is None:
+            counts = self._counts[labels] = [0] * (len(self.buckets) + 1)
+            self._sums[labels] = 0.0
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        self._sums[labels] += value
+
+    def samples(self) -> List[str]:
+        out = []
+        for key in sorted(self._counts):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), self._counts[key]):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                out.append(
+                    f"{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}"
+                )
+            labels = _format_labels(self.labels, key)
+            out.append(f"{self.name}_sum{labels} {_format_value(self._sums[key])}")
+            out.append(f"{self.name}_count{labels} {cumulative}")
+        return out
+
+
+class MetricsRegistry:
+    """
+    In-process metrics, rendered in the Prometheus text format.
+
+    Updates are plain dict operations on the event loop (no locks, no
+    threads), so instrumenting hot paths costs next to nothing.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, doc: str, labels: Iterable[str] = ()) -> Counter:
+        return self.register(Counter(name, doc, labels))
+
+    def gauge(self, name: str, doc: str, labels: Iterable[str] = (), collect=None) -> Gauge:
+        return self.register(Gauge(name, doc, labels, collect))
+
+    def histogram(self, name: str, doc: str, labels: Iterable[str] = (), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, doc, labels, buckets))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+METRICS = MetricsRegistry()
+
+
+# --------------------------------------------------
+# PIPELINE
+# --------------------------------------------------
+BYTES_FETCHED = METRICS.counter(
+    "tglive_bytes_fetched_total", "Bytes downloaded from Telegram", ("stream",)
+)
+BYTES_WRITTEN = METRICS.counter(
+    "tglive_bytes_written_total", "TS bytes written to the segmenter / runner", ("stream",)
+)
+STREAM_RESTARTS = METRICS.counter(
+    "tglive_stream_restarts_total", "Pipeline (ffmpeg) restarts after a failure", ("stream",)
+)
+WATCHDOG_TRIPS = METRICS.counter(
+    "tglive_watchdog_trips_total", "Watchdog-detected stalls", ("stream", "reason")
+)
+SEGMENT_INTERVAL = METRICS.histogram(
+    "tglive_segment_interval_seconds", "Wall-clock time between finished segments", ("stream",)
+)
+
+# --------------------------------------------------
+# TELEGRAM CLIENTS
+# --------------------------------------------------
+GETFILE_LATENCY = METRICS.histogram(
+    "tglive_getfile_seconds", "upload.GetFile round trip", ("client",)
+)
+FILEID_CACHE = METRICS.counter(
+    "tglive_fileid_cache_total", "FileId cache lookups", ("result",)
+)
+CLIENT_ERRORS = METRICS.counter(
+    "tglive_client_errors_total", "Download errors per client", ("client", "error")
+)
+
+# --------------------------------------------------
+# HTTP
+# --------------------------------------------------
+HTTP_REQUESTS = METRICS.counter(
+    "tglive_http_requests_total", "HTTP requests", ("stream", "route", "status")
+)
+HTTP_BYTES = METRICS.counter(
+    "tglive_http_bytes_total", "HTTP response bytes", ("stream", "route")
+)
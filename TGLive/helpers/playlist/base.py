@@ -57,6 +57,13 @@ class PlaylistStore(Protocol):
         """
         ...
 
+    async def mark_bad(self, chat_id: int | str, video_id: int, reason: str = ""):
+        """
+        Remember a video that failed pre-flight validation
+        (returned as bad_ids by load()).
+        """
+        ...
+
     async def get_playlist(self, chat_id: int | str) -> List[int]:
         """
         Return playlist respecting reverse flag.
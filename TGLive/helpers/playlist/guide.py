@@ -0,0 +1,173 @@
+import re
+import time
+import asyncio
+from itertools import cycle, islice
+from html import escape
+from typing import Dict, List, Optional, Tuple
+
+from TGLive import get_logger, Telegram
+from TGLive.helpers.streaming.options import StreamOptions
+from TGLive.helpers.streaming.state import get_stream_state
+
+LOGGER = get_logger(__name__)
+
+XMLTV_TIME = "%Y%m%d%H%M%S +0000"
+
+# characters XML 1.0 does not allow (captions can contain anything)
+INVALID_XML = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+def tvg_id(stream_name: str) -> str:
+    return f"{stream_name}@TG"
+
+
+class ChannelGuide:
+    """
+    XMLTV EPG and M3U for all channels, built from the running playlist
+    managers and kept until an input changes (playlist version, current
+    video, channel name), so requests only ever serve cached bytes.
+
+    Programme lengths: Telegram's video duration, else the measured play
+    time of an earlier airing, else EPG_DEFAULT_MINUTES.
+    """
+
+    def __init__(self):
+        self._managers: Dict[str, object] = {}
+        self._epg: Optional[Tuple[tuple, bytes]] = None
+        self._m3u: Optional[Tuple[tuple, bytes]] = None
+        self._lock = asyncio.Lock()
+
+    def register(self, stream_name: str, manager):
+        # kept after the pipeline stops: a parked channel keeps its guide
+        self._managers[stream_name] = manager
+
+    # --------------------------------------------------
+    # CHANNELS
+    # --------------------------------------------------
+    @staticmethod
+    def channels() -> List[Tuple[str, int]]:
+        return [
+            (f"stream{idx}", chat_id)
+            for idx, chat_id in enumerate(Telegram.STREAM_DB_IDS, start=1)
+        ]
+
+    def channel_name(self, stream_name: str) -> str:
+        manager = self._managers.get(stream_name)
+        name = getattr(manager, "channel_name", None)
+        return name or get_stream_state(stream_name).channel_name or stream_name
+
+    # --------------------------------------------------
+    # M3U
+    # --------------------------------------------------
+    def m3u(self, base_url: str) -> bytes:
+        key = (base_url,) + tuple(self.channel_name(s) for s, _ in self.channels())
+        if self._m3u and self._m3u[0] == key:
+            return self._m3u[1]
+
+        lines = [f'#EXTM3U url-tvg="{base_url}/epg.xml"']
+        for stream_name, chat_id in self.channels():
+            options = StreamOptions(stream_name, chat_id)
+            # "," ends the EXTINF attributes, '"' would break tvg-name
+            name = self.channel_name(stream_name).replace(",", " ").replace('"', "'")
+
+            lines.append(
+                f'#EXTINF:-1 tvg-id="{tvg_id(stream_name)}" '
+                f'tvg-name="{name}" '
+                f'tvg-chno="{stream_name[len("stream"):]}" '
+                f'group-title="TGLive",{name}'
+            )
+            lines.append(f"{base_url}/hls/{stream_name}/{options.playlist}")
+
+        body = ("\n".join(lines) + "\n").encode("utf-8")
+        self._m3u = (key, body)
+        return body
+
+    # --------------------------------------------------
+    # XMLTV
+    # --------------------------------------------------
+    def _epg_key(self) -> tuple:
+        key = []
+        for stream_name, _ in self.channels():
+            manager = self._managers.get(stream_name)
+            key.append((
+                stream_name,
+                self.channel_name(stream_name),
+                id(manager),
+                getattr(manager, "version", None),
+                get_stream_state(stream_name).current_video,
+            ))
+        return tuple(key)
+
+    async def epg(self) -> bytes:
+        key = self._epg_key()
+        if self._epg and self._epg[0] == key:
+            return self._epg[1]
+
+        async with self._lock:
+            # another request may have rebuilt it meanwhile
+            key = self._epg_key()
+            if self._epg and self._epg[0] == key:
+                return self._epg[1]
+
+            body = await self._build_epg()
+            self._epg = (key, body)
+            LOGGER.debug("EPG rebuilt (%d bytes)", len(body))
+            return body
+
+    async def _build_epg(self) -> bytes:
+        now = time.time()
+        horizon = now + Telegram.EPG_HOURS * 3600
+        default = Telegram.EPG_DEFAULT_MINUTES * 60
+
+        channels = []
+        programmes = []
+
+        for stream_name, _ in self.channels():
+            name = escape(INVALID_XML.sub("", self.channel_name(stream_name)))
+            channels.append(
+                f'  <channel id="{tvg_id(stream_name)}">\n'
+                f"    <display-name>{name}</display-name>\n"
+                f"  </channel>"
+            )
+
+            manager = self._managers.get(stream_name)
+            if manager is None:
+                continue
+
+            state = get_stream_state(stream_name)
+            ids = manager.upcoming(state.current_video, Telegram.EPG_MAX_PROGRAMMES)
+            await manager.fetch_meta(ids)
+
+            start = state.video_started_at if state.current_video else now
+            # short playlists loop within the horizon
+            for vid in islice(cycle(ids), Telegram.EPG_MAX_PROGRAMMES):
+                length = manager.durations.get(vid, default)
+                stop = start + length
+                if stop > now - 3600:
+                    title = escape(
+                        INVALID_XML.sub("", manager.titles.get(vid) or f"Video {vid}")
+                    )
+                    programmes.append(
+                        f'  <programme start="{time.strftime(XMLTV_TIME, time.gmtime(start))}" '
+                        f'stop="{time.strftime(XMLTV_TIME, time.gmtime(stop))}" '
+                        f'channel="{tvg_id(stream_name)}">\n'
+                        f'    <title lang="en">{title}</title>\n'
+                        f"  </programme>"
+                    )
+                start = stop
+                if start > horizon:
+                    break
+
+        doc = "\n".join(
+            [
+                '<?xml version="1.0" encoding="UTF-8"?>',
+                '<tv generator-info-name="TGLive">',
+                *channels,
+                *programmes,
+                "</tv>",
+            ]
+        )
+        return (doc + "\n").encode("utf-8")
+
+
+CHANNEL_GUIDE = ChannelGuide()
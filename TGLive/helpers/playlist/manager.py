@@ -1,5 +1,5 @@
 import asyncio
-from typing import List, Optional
+from typing import Dict, Iterable, List, Optional
 from pyrogram.errors import FloodWait
 
 from TGLive import get_logger
@@ -12,6 +12,9 @@ log = get_logger(__name__)
 # ============================================================
 SCAN_SEMAPHORE = asyncio.Semaphore(1)
 
+# get_messages accepts at most this many ids per call
+META_BATCH = 200
+
 
 class VideoPlaylistManager:
     """
@@ -44,12 +47,23 @@ class VideoPlaylistManager:
         self.last_started_id: Optional[int] = None
         self.last_completed_id: Optional[int] = None
 
+        # ids that failed pre-flight validation; never picked again
+        self.bad_ids: set[int] = set()
+
         self.running = False
         self.lock = asyncio.Lock()
 
         self.preloaded_playlist = preloaded_playlist
         self.channel_name: Optional[str] = None
 
+        # bumped on every playlist change (EPG / M3U cache key)
+        self.version = 0
+
+        # programme metadata for the EPG, filled lazily
+        self.durations: Dict[int, float] = {}
+        self.titles: Dict[int, str] = {}
+        self._meta_checked: set[int] = set()
+
         # 🔥 task tracking (FIX)
         self._auto_task: Optional[asyncio.Task] = None
         self._delayed_task: Optional[asyncio.Task] = None
@@ -103,15 +117,18 @@ class VideoPlaylistManager:
     async def build(self):
         try:
             chat = await self.client.get_chat(self.chat_id)
-            self.channel_name = chat.title or chat.username or str(self.chat_id)
+            self.channel_name = chat.title or chat.username
         except Exception:
-            self.channel_name = str(self.chat_id)
+            self.channel_name = None
 
         # 1️⃣ PRELOADED PLAYLIST
         if self.preloaded_playlist:
             async with self.lock:
                 self.playlist = list(self.preloaded_playlist)
                 self.latest_id = max(self.playlist) if self.playlist else 0
+                self.version += 1
+
+            self.channel_name = self.channel_name or str(self.chat_id)
 
             log.warning(
                 "using preloaded playlist (%s items)",
@@ -128,6 +145,12 @@ class VideoPlaylistManager:
                 self.reverse = data.get("reverse", self.reverse)
                 self.last_started_id = data.get("last_started_id")
                 self.last_completed_id = data.get("last_completed_id")
+                self.bad_ids = set(data.get("bad_ids") or [])
+                self.version += 1
+
+            self.channel_name = (
+                self.channel_name or data.get("channel_name") or str(self.chat_id)
+            )
 
             log.info(
                 "playlist loaded (%s items, latest_id=%s)",
@@ -143,6 +166,7 @@ class VideoPlaylistManager:
 
         # 3️⃣ FIRST TELEGRAM SCAN (CHUNKED)
         log.info("building playlist from Telegram (first run)…")
+        self.channel_name = self.channel_name or str(self.chat_id)
 
         temp: List[int] = []
         latest = 0
@@ -158,6 +182,7 @@ class VideoPlaylistManager:
             ):
                 temp.append(msg.id)
                 latest = max(latest, msg.id)
+                self._remember(msg)
 
             if scanned % 200 == 0:
                 await asyncio.sleep(1)
@@ -165,6 +190,7 @@ class VideoPlaylistManager:
         async with self.lock:
             self.playlist = temp
             self.latest_id = latest
+            self.version += 1
 
         await self.store.append_new(
             self.chat_id,
@@ -233,6 +259,7 @@ class VideoPlaylistManager:
             ):
                 new_ids.append(msg.id)
                 local_latest = max(local_latest, msg.id)
+                self._remember(msg)
 
         if not new_ids:
             return
@@ -244,6 +271,7 @@ class VideoPlaylistManager:
 
             self.playlist.extend(new_ids)
             self.latest_id = local_latest
+            self.version += 1
 
         await self.store.append_new(
             self.chat_id,
@@ -265,6 +293,7 @@ class VideoPlaylistManager:
         async with self.lock:
             if message_id in self.playlist:
                 self.playlist.remove(message_id)
+                self.version += 1
 
             if self.last_started_id == message_id:
                 self.last_started_id = None
@@ -274,6 +303,17 @@ class VideoPlaylistManager:
         await self.store.remove_video(self.chat_id, message_id)
         log.warning("removed video %s", message_id)
 
+    async def mark_bad(self, message_id: int, reason: str):
+        async with self.lock:
+            self.bad_ids.add(message_id)
+            self.version += 1
+
+            if self.last_started_id == message_id:
+                self.last_started_id = None
+
+        await self.store.mark_bad(self.chat_id, message_id, reason)
+        log.warning("video %s marked bad: %s", message_id, reason)
+
     async def next_video(self, current_id: Optional[int]) -> Optional[int]:
         async with self.lock:
             if not self.playlist:
@@ -282,18 +322,92 @@ class VideoPlaylistManager:
             size = len(self.playlist)
 
             if current_id is None:
-                if self.last_started_id in self.playlist:
+                if (
+                    self.last_started_id in self.playlist
+                    and self.last_started_id not in self.bad_ids
+                ):
                     return self.last_started_id
                 if self.last_completed_id in self.playlist:
                     idx = self.playlist.index(self.last_completed_id)
-                    return self.playlist[(idx + 1) % size]
-                return self.playlist[0]
+                    return self._skip_bad((idx + 1) % size)
+                return self._skip_bad(0)
 
             try:
                 idx = self.playlist.index(current_id)
-                return self.playlist[(idx + 1) % size]
+                return self._skip_bad((idx + 1) % size)
             except ValueError:
-                return self.playlist[0]
+                return self._skip_bad(0)
+
+    def _skip_bad(self, idx: int) -> Optional[int]:
+        size = len(self.playlist)
+        for step in range(size):
+            vid = self.playlist[(idx + step) % size]
+            if vid not in self.bad_ids:
+                return vid
+        return None
+
+    def upcoming(self, start_id: Optional[int], count: int) -> List[int]:
+        """
+        Up to `count` ids in play order from start_id (included), the
+        same way next_video walks the playlist.
+        """
+        if not self.playlist:
+            return []
+
+        size = len(self.playlist)
+        try:
+            idx = self.playlist.index(start_id)
+        except ValueError:
+            idx = 0
+
+        out = []
+        for step in range(size):
+            vid = self.playlist[(idx + step) % size]
+            if vid not in self.bad_ids:
+                out.append(vid)
+                if len(out) >= count:
+                    break
+        return out
+
+    # ============================================================
+    # PROGRAMME METADATA (EPG)
+    # ============================================================
+    def _remember(self, msg):
+        self._meta_checked.add(msg.id)
+
+        media = msg.video or msg.document
+        duration = getattr(media, "duration", None)
+        if duration:
+            self.durations[msg.id] = float(duration)
+
+        title = (msg.caption or "").strip().split("\n")[0]
+        if not title:
+            title = getattr(media, "file_name", None) or ""
+        if title:
+            self.titles[msg.id] = title[:200]
+
+    async def fetch_meta(self, ids: Iterable[int]):
+        """
+        Durations / titles for ids not seen yet, in batched get_messages
+        calls (playlists loaded from the DB only carry ids).
+        """
+        missing = [i for i in ids if i not in self._meta_checked]
+
+        for pos in range(0, len(missing), META_BATCH):
+            batch = missing[pos:pos + META_BATCH]
+            try:
+                messages = await self.client.get_messages(self.chat_id, batch)
+            except FloodWait as e:
+                log.warning("FloodWait %ss while fetching metadata", e.value)
+                return
+            except Exception as e:
+                log.warning("metadata fetch failed: %s", e)
+                return
+
+            self._meta_checked.update(batch)
+            for msg in messages or []:
+                if msg and not msg.empty:
+                    self._remember(msg)
 
     async def get_playlist(self) -> List[int]:
         return self.playlist[::-1] if self.reverse else self.playlist
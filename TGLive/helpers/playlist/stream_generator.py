@@ -1,10 +1,21 @@
+import time
 import asyncio
 from typing import AsyncGenerator
 import pytz
 
-from TGLive import get_logger
+from TGLive import get_logger, Telegram
 from TGLive.helpers.ext_utils import FIleNotFound
 from TGLive.helpers.encoding.cleaner import ffmpeg_cleaner
+from TGLive.helpers.encoding.probe import (
+    peek,
+    probe_streams,
+    audio_streams,
+    ProbeError,
+    select_audio_map,
+)
+from TGLive.helpers.encoding.preflight import preflight
+from TGLive.helpers.encoding.mp4 import moov_end_in_head
+from TGLive.helpers.streaming.state import get_stream_state
 
 LOGGER = get_logger(__name__)
 
@@ -12,10 +23,11 @@ LOCAL_TZ = pytz.timezone("Asia/Kolkata")
 
 
 class PlaylistStreamGenerator:
-    def __init__(self, playlist_manager, multi_streamer, stream_name: str):
+    def __init__(self, playlist_manager, multi_streamer, stream_name: str, options=None):
         self.pm = playlist_manager
         self.ms = multi_streamer
         self.stream_name = stream_name
+        self.options = options
 
         LOGGER.debug(
             "[%s] PlaylistStreamGenerator initialized | chat_id=%s",
@@ -30,6 +42,9 @@ class PlaylistStreamGenerator:
         """
 
         current_id = None
+        state = get_stream_state(self.stream_name)
+        state.chat_id = self.pm.chat_id
+        state.channel_name = getattr(self.pm, "channel_name", None)
 
         while True:
             # --------------------------------------------------
@@ -51,9 +66,15 @@ class PlaylistStreamGenerator:
             # --------------------------------------------------
             self.pm.last_started_id = next_id
             current_id = next_id
+            state.start_video(next_id)
 
             LOGGER.info("[%s] Starting video %s", self.stream_name, next_id)
 
+            try:
+                state.next_video = await self.pm.next_video(next_id)
+            except Exception:
+                state.next_video = None
+
             try:
                 await self.pm.store.set_last_started(
                     self.pm.chat_id, next_id
@@ -75,9 +96,21 @@ class PlaylistStreamGenerator:
                     stream_name=self.stream_name,
                 )
 
+                raw_source, audio_map = await self._prepare_source(
+                    raw_source, next_id
+                )
+                if raw_source is None:
+                    LOGGER.warning(
+                        "[%s] Skipping unplayable video %s",
+                        self.stream_name,
+                        next_id,
+                    )
+                    continue
+
                 ts_source = ffmpeg_cleaner(
                     raw_source,
                     self.stream_name,
+                    audio_map=audio_map,
                 )
 
                 # ✅ THIS IS THE KEY FIX
@@ -88,6 +121,11 @@ class PlaylistStreamGenerator:
                 # --------------------------------------------------
                 self.pm.last_completed_id = next_id
 
+                # played in real time: a duration for the EPG when
+                # Telegram had none
+                if next_id not in self.pm.durations and state.video_started_at:
+                    self.pm.durations[next_id] = time.time() - state.video_started_at
+
                 try:
                     await self.pm.store.set_last_completed(
                         self.pm.chat_id, next_id
@@ -127,3 +165,90 @@ class PlaylistStreamGenerator:
                 )
                 current_id = None
                 continue
+
+    # --------------------------------------------------
+    # PRE-FLIGHT
+    # --------------------------------------------------
+    async def _prepare_source(self, raw_source, video_id: int):
+        """
+        Validate the video from its head (and moov, for MP4) and pick the
+        audio to publish. Returns (raw_source, audio_map), or
+        (None, None) when the video was rejected and marked bad.
+        """
+        selects_audio = bool(self.options and self.options.selects_audio)
+        if not Telegram.PREFLIGHT_ENABLED and not selects_audio:
+            return raw_source, None
+
+        head, raw_source = await peek(raw_source)
+
+        # moov sent up front (faststart / MOOV_FIRST) but bigger than the
+        # head: read on through it instead of a ranged re-fetch
+        moov_end = moov_end_in_head(head)
+        if moov_end:
+            head, raw_source = await peek(raw_source, moov_end)
+
+        streams = None
+
+        if Telegram.PREFLIGHT_ENABLED:
+            try:
+                file_size = await self.ms.get_file_size(self.pm.chat_id, video_id)
+                streams, reason = await asyncio.wait_for(
+                    preflight(
+                        head,
+                        file_size,
+                        lambda offset, length: self.ms.read_range(
+                            self.pm.chat_id,
+                            video_id,
+                            self.stream_name,
+                            offset,
+                            length,
+                        ),
+                    ),
+                    timeout=Telegram.PREFLIGHT_TIMEOUT,
+                )
+            except Exception as e:
+                # can't tell (timeout, ffprobe missing…): let the cleaner try
+                LOGGER.warning(
+                    "[%s] pre-flight skipped for %s: %r",
+                    self.stream_name,
+                    video_id,
+                    e,
+                )
+                streams, reason = None, None
+
+            if reason:
+                await raw_source.aclose()
+                try:
+                    await self.pm.mark_bad(video_id, reason)
+                except Exception as e:
+                    LOGGER.warning(
+                        "[%s] store bad update failed: %s",
+                        self.stream_name,
+                        e,
+                    )
+                return None, None
+
+        if not selects_audio:
+            return raw_source, None
+
+        if streams is None:
+            try:
+                streams = await probe_streams(head)
+            except ProbeError as e:
+                LOGGER.warning(
+                    "[%s] audio probe failed for %s: %s",
+                    self.stream_name,
+                    video_id,
+                    e,
+                )
+                streams = []
+        audio_map = select_audio_map(streams, self.options)
+
+        LOGGER.info(
+            "[%s] video %s audio: %s (%s tracks probed)",
+            self.stream_name,
+            video_id,
+            audio_map[-1],
+            len(audio_streams(streams)),
+        )
+        return raw_source, audio_map
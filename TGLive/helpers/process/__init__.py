@@ -1,4 +1,5 @@
 from .registry import FFMPEG_PROCS
 from .stop_all import stop_all_ffmpeg
+from .resources import RESOURCES
 
-__all__ = ("FFMPEG_PROCS", "stop_all_ffmpeg")
+__all__ = ("FFMPEG_PROCS", "stop_all_ffmpeg", "RESOURCES")
@@ -1 +1,165 @@
-FFMPEG_PROCS = set()
+import time
+import asyncio
+from typing import Dict, List, Optional
+
+import psutil
+
+from TGLive import get_logger
+
+LOGGER = get_logger(__name__)
+
+
+class ProcEntry:
+    __slots__ = (
+        "proc",
+        "pid",
+        "stream",
+        "role",
+        "started_at",
+        "cpu",
+        "rss",
+        "read_bytes",
+        "write_bytes",
+        "_ps",
+    )
+
+    def __init__(self, proc, stream: str, role: str):
+        self.proc = proc
+        self.pid = proc.pid
+        self.stream = stream
+        self.role = role
+        self.started_at = time.time()
+
+        self.cpu = 0.0
+        self.rss = 0
+        self.read_bytes = 0
+        self.write_bytes = 0
+        self._ps: Optional[psutil.Process] = None
+
+    def as_dict(self) -> dict:
+        return {
+            "pid": self.pid,
+            "stream": self.stream,
+            "role": self.role,
+            "uptime": round(time.time() - self.started_at),
+            "cpu_percent": round(self.cpu, 1),
+            "rss_mb": round(self.rss / (1024 * 1024), 1),
+            "read_mb": round(self.read_bytes / (1024 * 1024), 1),
+            "write_mb": round(self.write_bytes / (1024 * 1024), 1),
+        }
+
+
+class ProcessRegistry:
+    """
+    Every ffmpeg we spawn, with the stream and role it belongs to.
+
+    Keeps the old set API (add / discard / clear / iteration yields the
+    process objects) and samples CPU%, RSS and I/O through psutil on a
+    low-frequency timer.
+    """
+
+    def __init__(self):
+        self._entries: Dict[int, ProcEntry] = {}
+        self._sampler: Optional[asyncio.Task] = None
+
+    # --------------------------------------------------
+    # SET API
+    # --------------------------------------------------
+    def add(self, proc, stream: str = "", role: str = "ffmpeg"):
+        entry = self._entries.get(id(proc))
+        if entry is None:
+            self._entries[id(proc)] = ProcEntry(proc, stream, role)
+        else:
+            entry.stream = stream or entry.stream
+            entry.role = role or entry.role
+
+    def discard(self, proc):
+        self._entries.pop(id(proc), None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __iter__(self):
+        return iter([e.proc for e in self._entries.values()])
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, proc) -> bool:
+        return id(proc) in self._entries
+
+    # --------------------------------------------------
+    # ACCOUNTING
+    # --------------------------------------------------
+    def assign(self, proc, stream: str):
+        entry = self._entries.get(id(proc))
+        if entry is not None:
+            entry.stream = stream
+
+    def sample(self):
+        for entry in list(self._entries.values()):
+            try:
+                if entry._ps is None:
+                    entry._ps = psutil.Process(entry.pid)
+                    # first call only primes the counter
+                    entry._ps.cpu_percent(None)
+                    continue
+
+                ps = entry._ps
+                entry.cpu = ps.cpu_percent(None)
+                entry.rss = ps.memory_info().rss
+
+                try:
+                    io = ps.io_counters()
+                    entry.read_bytes = io.read_bytes
+                    entry.write_bytes = io.write_bytes
+                except (psutil.AccessDenied, AttributeError):
+                    pass
+
+            except psutil.Error:
+                entry.cpu = 0.0
+
+    def snapshot(self) -> List[dict]:
+        return sorted(
+            (e.as_dict() for e in self._entries.values()),
+            key=lambda d: (d["stream"], d["role"], d["pid"]),
+        )
+
+    def totals(self) -> Dict[str, dict]:
+        """
+        CPU / RSS summed per stream.
+        """
+        out: Dict[str, dict] = {}
+        for e in self._entries.values():
+            t = out.setdefault(e.stream or "-", {"procs": 0, "cpu_percent": 0.0, "rss_mb": 0.0})
+            t["procs"] += 1
+            t["cpu_percent"] = round(t["cpu_percent"] + e.cpu, 1)
+            t["rss_mb"] = round(t["rss_mb"] + e.rss / (1024 * 1024), 1)
+        return out
+
+    # --------------------------------------------------
+    # SAMPLER
+    # --------------------------------------------------
+    def start_sampler(self, interval: float):
+        if self._sampler is None or self._sampler.done():
+            self._sampler = asyncio.create_task(self._sample_loop(interval))
+
+    async def stop_sampler(self):
+        if self._sampler:
+            self._sampler.cancel()
+            try:
+                await self._sampler
+            except asyncio.CancelledError:
+                pass
+            self._sampler = None
+
+    async def _sample_loop(self, interval: float):
+        while True:
+            try:
+                await asyncio.to_thread(self.sample)
+            except Exception as e:
+                LOGGER.debug("process sampling failed: %s", e)
+            await asyncio.sleep(interval)
+
+
+FFMPEG_PROCS = ProcessRegistry()
@@ -0,0 +1,87 @@
+import os
+from typing import List, Optional
+
+import psutil
+
+from TGLive import get_logger, Telegram
+
+LOGGER = get_logger(__name__)
+
+# copy-only pipelines on the live path
+LIVE_ROLES = {"cleaner", "runner", "audio"}
+# CPU-heavy work that may lag or be dropped
+BACKGROUND_ROLES = {"rendition", "probe", "slate"}
+
+
+class ResourceManager:
+    """
+    Decides how much CPU each ffmpeg gets, so the asyncio loop (HTTP +
+    every stream's feeder) is never starved.
+
+    - threads: copy roles get 1; encoders share the cores left after
+      FFMPEG_RESERVED_CORES between active streams
+    - nice / ionice: live roles at FFMPEG_NICE, background roles lower
+    - affinity (FFMPEG_AFFINITY): ffmpeg stays off the reserved cores,
+      which are left to the python process
+    """
+
+    def __init__(self):
+        self.cores = psutil.cpu_count() or os.cpu_count() or 1
+        self.active_streams = 0
+
+    # --------------------------------------------------
+    # STREAM COUNT
+    # --------------------------------------------------
+    def stream_started(self):
+        self.active_streams += 1
+
+    def stream_stopped(self):
+        self.active_streams = max(0, self.active_streams - 1)
+
+    # --------------------------------------------------
+    # POLICY
+    # --------------------------------------------------
+    @property
+    def usable_cores(self) -> int:
+        return max(1, self.cores - Telegram.FFMPEG_RESERVED_CORES)
+
+    def threads(self, role: str) -> int:
+        if role not in BACKGROUND_ROLES:
+            return 1
+        share = self.usable_cores // max(1, self.active_streams)
+        return max(1, min(share, 4))
+
+    def nice(self, role: str) -> int:
+        if role in BACKGROUND_ROLES:
+            return min(19, Telegram.FFMPEG_NICE + 5)
+        return Telegram.FFMPEG_NICE
+
+    def affinity(self) -> Optional[List[int]]:
+        if not Telegram.FFMPEG_AFFINITY or self.cores <= Telegram.FFMPEG_RESERVED_CORES:
+            return None
+        return list(range(Telegram.FFMPEG_RESERVED_CORES, self.cores))
+
+    # --------------------------------------------------
+    # APPLY
+    # --------------------------------------------------
+    def apply(self, pid: int, role: str):
+        """
+        Best effort: missing permissions or an exited process are ignored.
+        """
+        try:
+            proc = psutil.Process(pid)
+            proc.nice(self.nice(role))
+
+            if Telegram.FFMPEG_IONICE and hasattr(psutil, "IOPRIO_CLASS_BE"):
+                level = 7 if role in BACKGROUND_ROLES else 4
+                proc.ionice(psutil.IOPRIO_CLASS_BE, level)
+
+            cpus = self.affinity()
+            if cpus and hasattr(proc, "cpu_affinity"):
+                proc.cpu_affinity(cpus)
+
+        except (psutil.Error, OSError, ValueError) as e:
+            LOGGER.debug("resource limits not applied to pid=%s: %s", pid, e)
+
+
+RESOURCES = ResourceManager()
@@ -9,8 +9,10 @@ LOGGER = get_logger(__name__)
 async def stop_all_ffmpeg(timeout: int = 5):
     LOGGER.info("[FFMPEG] stopping all ffmpeg processes")
 
-    procs = list(FFMPEG_PROCS)
-    FFMPEG_PROCS.clear()
+    # Popen runners are stopped by stop_all_hls()
+    procs = [p for p in FFMPEG_PROCS if isinstance(p, asyncio.subprocess.Process)]
+    for proc in procs:
+        FFMPEG_PROCS.discard(proc)
 
     for proc in procs:
         try:
@@ -1,3 +1,4 @@
 from .streamer import MultiClientStreamer
+from .options import StreamOptions
 
-__all__ = ("MultiClientStreamer",)
+__all__ = ("MultiClientStreamer", "StreamOptions")
@@ -0,0 +1,128 @@
+import asyncio
+from collections import deque
+from itertools import islice
+from typing import Deque, Dict, List, Optional, Tuple
+
+from TGLive import get_logger, Telegram
+from TGLive.helpers.encoding.segmenter import TS_PACKET_SIZE, TS_SYNC_BYTE
+
+LOGGER = get_logger(__name__)
+
+
+def has_random_access(data: bytes) -> bool:
+    """
+    True if any packet in the chunk carries random_access_indicator.
+    """
+    for pos in range(0, len(data) - TS_PACKET_SIZE + 1, TS_PACKET_SIZE):
+        if (
+            data[pos] == TS_SYNC_BYTE
+            and data[pos + 3] & 0x20
+            and data[pos + 4] > 0
+            and data[pos + 5] & 0x40
+        ):
+            return True
+    return False
+
+
+class TSRing:
+    """
+    Shared in-memory ring of the channel's continuous TS for
+    /live/<stream>.ts.
+
+    The feeder pushes every chunk once; each HTTP client only keeps a
+    cursor (chunk sequence number). Clients never backpressure the
+    channel: one that falls out of the ring jumps to the newest
+    keyframe, one that stops reading is dropped by its handler. With no
+    clients nothing is buffered.
+    """
+
+    def __init__(self, stream_name: str, max_bytes: int):
+        self.stream_name = stream_name
+        self.max_bytes = max_bytes
+
+        # (seq, data, starts_with_keyframe)
+        self.chunks: Deque[Tuple[int, bytes, bool]] = deque()
+        self.size = 0
+        self.next_seq = 0
+        self.last_keyframe: Optional[int] = None
+
+        self.clients = 0
+        self._event = asyncio.Event()
+
+    def push(self, data: bytes):
+        key = has_random_access(data)
+        seq = self.next_seq
+        self.next_seq += 1
+
+        self.chunks.append((seq, data, key))
+        self.size += len(data)
+        if key:
+            self.last_keyframe = seq
+
+        while self.size > self.max_bytes and len(self.chunks) > 1:
+            _, old, _ = self.chunks.popleft()
+            self.size -= len(old)
+
+        if self.last_keyframe is not None and self.last_keyframe < self.chunks[0][0]:
+            self.last_keyframe = None
+
+        # wake readers; the next wait gets a fresh event
+        self._event.set()
+        self._event = asyncio.Event()
+
+    def clear(self):
+        """
+        Drop the buffered TS once the last client left; the feeder stops
+        pushing until someone joins again.
+        """
+        self.chunks.clear()
+        self.size = 0
+        self.last_keyframe = None
+
+    @property
+    def oldest_seq(self) -> int:
+        return self.chunks[0][0] if self.chunks else self.next_seq
+
+    def join_cursor(self) -> Optional[int]:
+        """
+        Where a new client starts: the newest keyframe, or None to wait.
+        """
+        return self.last_keyframe
+
+    async def read(self, cursor: Optional[int], timeout: float) -> Tuple[List[bytes], Optional[int]]:
+        """
+        Chunks from cursor onwards (waiting up to timeout for new data)
+        and the next cursor.
+        """
+        if cursor is not None and cursor < self.oldest_seq:
+            LOGGER.debug(
+                "[%s] fan-out client fell behind, skipping ahead",
+                self.stream_name,
+            )
+            cursor = self.join_cursor()
+
+        if cursor is None or cursor >= self.next_seq:
+            try:
+                await asyncio.wait_for(self._event.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                return [], cursor
+            if cursor is None:
+                cursor = self.join_cursor()
+                if cursor is None:
+                    return [], None
+
+        start = max(0, cursor - self.oldest_seq)
+        out = [data for _, data, _ in islice(self.chunks, start, None)]
+        return out, self.next_seq
+
+
+TS_RINGS: Dict[str, TSRing] = {}
+
+
+def get_ts_ring(stream_name: str) -> TSRing:
+    ring = TS_RINGS.get(stream_name)
+    if ring is None:
+        ring = TSRing(stream_name, Telegram.TS_FANOUT_BUFFER_MB * 1024 * 1024)
+        TS_RINGS[stream_name] = ring
+        LOGGER.info("[%s] TS fan-out ring created", stream_name)
+    return ring
@@ -0,0 +1,68 @@
+from TGLive.config import Telegram
+
+
+class StreamOptions:
+    """
+    Per-channel settings from Telegram.STREAM_OPTIONS.
+
+    Entries may be keyed by chat id or stream name; the stream name
+    entry wins when both exist.
+    """
+
+    OUTPUTS = ("ts", "cmaf")
+
+    def __init__(self, stream_name: str, chat_id: int | str):
+        raw = {
+            **Telegram.STREAM_OPTIONS.get(str(chat_id), {}),
+            **Telegram.STREAM_OPTIONS.get(stream_name, {}),
+        }
+
+        self.stream_name = stream_name
+        self.chat_id = chat_id
+
+        # ts   -> MPEG-TS segments (python segmenter or ffmpeg runner)
+        # cmaf -> init + .m4s segments with HLS and DASH manifests
+        self.output = str(raw.get("output", "ts")).lower()
+        if self.output not in self.OUTPUTS:
+            self.output = "ts"
+
+        # extra lower renditions + master.m3u8 (TS output only)
+        self.abr = bool(raw.get("abr", False)) and self.output == "ts"
+        renditions = raw.get("renditions", Telegram.ABR_LADDER)
+        if isinstance(renditions, str):
+            renditions = renditions.split(",")
+        if not isinstance(renditions, list):
+            renditions = Telegram.ABR_LADDER
+        self.renditions = [str(r).strip() for r in renditions if str(r).strip()]
+
+        # copy-only AAC rendition listed in master.m3u8 (TS output only)
+        self.audio_only = bool(raw.get("audio_only", False)) and self.output == "ts"
+
+        # audio track selection, applied in the cleaner from probed metadata
+        # (first matching language, else track index, else first track)
+        languages = raw.get("audio_languages") or []
+        if isinstance(languages, str):
+            languages = languages.split(",")
+        self.audio_languages = [l.strip() for l in languages if l.strip()]
+
+        track = raw.get("audio_track")
+        self.audio_track = int(track) if track is not None else None
+        self.audio_first_only = bool(raw.get("audio_first_only", False))
+
+    @property
+    def selects_audio(self) -> bool:
+        """
+        True when only part of the source audio should be transcoded.
+        """
+        return bool(
+            self.audio_languages
+            or self.audio_track is not None
+            or self.audio_first_only
+        )
+
+    @property
+    def playlist(self) -> str:
+        """
+        Entry playlist clients should open.
+        """
+        return "master.m3u8" if self.abr or self.audio_only else "live.m3u8"
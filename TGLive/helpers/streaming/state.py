@@ -0,0 +1,159 @@
+import time
+import asyncio
+from typing import Dict, Optional
+
+from TGLive.helpers.process.registry import FFMPEG_PROCS
+
+# weight of the newest sample in the bytes/s average
+RATE_ALPHA = 0.2
+RATE_WINDOW = 1.0  # seconds per sample
+
+
+class StreamState:
+    """
+    Live, in-memory state of one channel for /api/streams.
+
+    Written by the runner, PlaylistStreamGenerator and
+    MultiClientStreamer; read (never scanned from logs) by the API.
+    """
+
+    def __init__(self, stream_name: str):
+        self.stream_name = stream_name
+        self.chat_id: Optional[int] = None
+        self.channel_name: Optional[str] = None
+        self.status = "starting"
+        self.restarts = 0
+
+        self.current_video: Optional[int] = None
+        self.next_video: Optional[int] = None
+        self.video_started_at: Optional[float] = None
+        self.video_size = 0
+        self.video_offset = 0
+        self.worker: Optional[int] = None
+
+        self.bytes_per_second = 0.0
+        self._window_bytes = 0
+        self._window_start = time.monotonic()
+
+        # TSPacer of the running pipeline (buffered seconds)
+        self.pacer = None
+
+    # --------------------------------------------------
+    # UPDATES
+    # --------------------------------------------------
+    def set_status(self, status: str):
+        if status != self.status:
+            self.status = status
+            STREAM_STATES.changed()
+
+    def start_video(self, video_id: int):
+        self.current_video = video_id
+        self.next_video = None
+        self.video_started_at = time.time()
+        self.video_size = 0
+        self.video_offset = 0
+        self.worker = None
+        self.status = "playing"
+        STREAM_STATES.changed()
+
+    def add_bytes(self, count: int):
+        self.video_offset += count
+        self._window_bytes += count
+        self._sample()
+
+    def _sample(self):
+        """
+        Fold the bytes seen since the last sample into the average.
+        Also run on read, so a stalled upstream decays towards 0
+        instead of showing the last rate forever.
+        """
+        now = time.monotonic()
+        elapsed = now - self._window_start
+        if elapsed < RATE_WINDOW:
+            return
+
+        rate = self._window_bytes / elapsed
+        if self.bytes_per_second:
+            # one EWMA step per RATE_WINDOW that went by
+            weight = 1 - (1 - RATE_ALPHA) ** (elapsed / RATE_WINDOW)
+            self.bytes_per_second += weight * (rate - self.bytes_per_second)
+        else:
+            self.bytes_per_second = rate
+        self._window_bytes = 0
+        self._window_start = now
+
+    # --------------------------------------------------
+    # READ
+    # --------------------------------------------------
+    def as_dict(self) -> dict:
+        self._sample()
+
+        buffered = 0.0
+        if self.pacer is not None and self.status == "playing":
+            buffered = self.pacer.buffered_seconds
+
+        return {
+            "stream": self.stream_name,
+            "chat_id": self.chat_id,
+            "channel_name": self.channel_name,
+            "status": self.status,
+            "restarts": self.restarts,
+            "current_video": self.current_video,
+            "next_video": self.next_video,
+            "video_started_at": self.video_started_at,
+            "video_size": self.video_size,
+            "video_offset": self.video_offset,
+            "progress": (
+                round(self.video_offset / self.video_size * 100, 1)
+                if self.video_size else None
+            ),
+            "bytes_per_second": round(self.bytes_per_second),
+            "buffered_seconds": round(buffered, 2),
+            "worker": self.worker,
+            "ffmpeg_pids": sorted(
+                p["pid"] for p in FFMPEG_PROCS.snapshot()
+                if p["stream"] == self.stream_name
+            ),
+        }
+
+
+class StreamStates:
+    """
+    STREAM_STATES registry; `changed()` wakes SSE subscribers right
+    away on status / video changes (byte counters are picked up by the
+    periodic push).
+    """
+
+    def __init__(self):
+        self._states: Dict[str, StreamState] = {}
+        self._event: Optional[asyncio.Event] = None
+
+    def get(self, stream_name: str) -> StreamState:
+        state = self._states.get(stream_name)
+        if state is None:
+            state = self._states[stream_name] = StreamState(stream_name)
+        return state
+
+    def snapshot(self) -> list:
+        names = sorted(self._states, key=lambda n: (len(n), n))
+        return [self._states[name].as_dict() for name in names]
+
+    def changed(self):
+        if self._event is not None:
+            self._event.set()
+            self._event = None
+
+    async def wait(self, timeout: float):
+        if self._event is None:
+            self._event = asyncio.Event()
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+
+
+STREAM_STATES = StreamStates()
+
+
+def get_stream_state(stream_name: str) -> StreamState:
+    return STREAM_STATES.get(stream_name)
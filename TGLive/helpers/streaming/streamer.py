@@ -1,14 +1,25 @@
 import math
-from typing import AsyncGenerator, Dict
+from typing import AsyncGenerator, Dict, Optional
 
-from TGLive import get_logger
+from TGLive import get_logger, Telegram
 from TGLive.helpers.client import ClientManager
 from TGLive.helpers.ext_utils import ByteStreamer
+from TGLive.helpers.metrics import BYTES_FETCHED
+from TGLive.helpers.streaming.state import get_stream_state
+from TGLive.helpers.encoding.mp4 import (
+    MOOV_MAX_BYTES,
+    is_mp4,
+    top_level_boxes,
+    shift_chunk_offsets,
+)
+from TGLive.helpers.encoding.probe import ProbeError
 
 LOGGER = get_logger(__name__)
 
 _rr_pointer = 0
 
+CHUNK_SIZE = 512 * 1024
+
 
 class MultiClientStreamer:
     """
@@ -27,13 +38,20 @@ class MultiClientStreamer:
     # --------------------------------------------------
     # CLIENT SELECTION (round-robin + least load)
     # --------------------------------------------------
-    def _choose_client(self) -> int:
+    def _choose_client(self, max_load: Optional[int] = None) -> Optional[int]:
+        """
+        Least-loaded client (round-robin on ties). With max_load, None
+        when every client already has that many transfers.
+        """
         global _rr_pointer
 
         if not ClientManager.work_loads:
             return next(iter(ClientManager.multi_clients.keys()))
 
         min_load = min(ClientManager.work_loads.values())
+        if max_load is not None and min_load >= max_load:
+            return None
+
         candidates = [
             i for i, v in ClientManager.work_loads.items()
             if v == min_load
@@ -43,6 +61,9 @@ class MultiClientStreamer:
         _rr_pointer += 1
         return chosen
 
+    def choose_client(self, max_load: Optional[int] = None) -> Optional[int]:
+        return self._choose_client(max_load)
+
     # --------------------------------------------------
     # BYTE STREAMER
     # --------------------------------------------------
@@ -75,9 +96,9 @@ class MultiClientStreamer:
             file_id = await bs.get_file_properties(chat_id, message_id)
             file_size = file_id.file_size or 0
 
-            chunk_size = 512 * 1024
-            part_count = max(1, math.ceil(file_size / chunk_size))
-            last_part_cut = (file_size % chunk_size) or chunk_size
+            state = get_stream_state(stream_name)
+            state.worker = index
+            state.video_size = file_size
 
             LOGGER.info(
                 "[%s] streaming message=%s via client=%s size=%.2fMB",
@@ -87,15 +108,76 @@ class MultiClientStreamer:
                 file_size / (1024 * 1024),
             )
 
-            async for chunk in bs.yield_file(
-                file_id=file_id,
-                index=index,
-                offset=start_offset,
-                first_part_cut=0,
-                last_part_cut=last_part_cut,
-                part_count=part_count,
-                chunk_size=chunk_size,
-            ):
+            if start_offset == 0 and Telegram.MOOV_FIRST:
+                source = self._yield_faststart(
+                    bs, index, file_id, file_size, stream_name, message_id
+                )
+            else:
+                source = self._yield_range(
+                    bs, index, file_id, start_offset, file_size
+                )
+
+            async for chunk in source:
+                BYTES_FETCHED.inc(stream_name, amount=len(chunk))
+                state.add_bytes(len(chunk))
+                yield chunk
+
+        finally:
+            ClientManager.work_loads[index] = max(
+                0,
+                ClientManager.work_loads.get(index, 1) - 1,
+            )
+
+    # --------------------------------------------------
+    # RANGED READS
+    # --------------------------------------------------
+    async def get_file_info(self, chat_id: int, message_id: int, index: Optional[int] = None):
+        """
+        FileId with file_size / mime_type / file_name / unique_id attached.
+        """
+        bs = self._get_bs(self._choose_client() if index is None else index)
+        return await bs.get_file_properties(chat_id, message_id)
+
+    async def get_file_size(self, chat_id: int, message_id: int) -> int:
+        file_id = await self.get_file_info(chat_id, message_id)
+        return file_id.file_size or 0
+
+    async def stream_range(
+        self,
+        chat_id: int,
+        message_id: int,
+        stream_name: str,
+        offset: int,
+        length: int,
+        index: Optional[int] = None,
+    ) -> AsyncGenerator[bytes, None]:
+        """
+        Bytes [offset, offset + length) of the file, through `index` or
+        the least-loaded client.
+        """
+        if index is None:
+            index = self._choose_client()
+        bs = self._get_bs(index)
+
+        ClientManager.work_loads[index] = (
+            ClientManager.work_loads.get(index, 0) + 1
+        )
+
+        try:
+            file_id = await bs.get_file_properties(chat_id, message_id)
+            end = min(offset + length, file_id.file_size or 0)
+
+            LOGGER.debug(
+                "[%s] range message=%s bytes=%s-%s via client=%s",
+                stream_name,
+                message_id,
+                offset,
+                end - 1,
+                index,
+            )
+
+            async for chunk in self._yield_range(bs, index, file_id, offset, end):
+                BYTES_FETCHED.inc(stream_name, amount=len(chunk))
                 yield chunk
 
         finally:
@@ -104,6 +186,156 @@ class MultiClientStreamer:
                 ClientManager.work_loads.get(index, 1) - 1,
             )
 
+    async def read_range(
+        self,
+        chat_id: int,
+        message_id: int,
+        stream_name: str,
+        offset: int,
+        length: int,
+    ) -> bytes:
+        parts = []
+        async for chunk in self.stream_range(
+            chat_id, message_id, stream_name, offset, length
+        ):
+            parts.append(chunk)
+        return b"".join(parts)
+
+    @staticmethod
+    async def _yield_range(bs: ByteStreamer, index: int, file_id, start: int, end: int):
+        # GetFile offsets must be chunk aligned; cut the edges instead
+        if end <= start:
+            return
+
+        aligned = start - (start % CHUNK_SIZE)
+        part_count = max(1, math.ceil((end - aligned) / CHUNK_SIZE))
+        first_part_cut = start - aligned
+        last_part_cut = end - (aligned + (part_count - 1) * CHUNK_SIZE)
+
+        async for chunk in bs.yield_file(
+            file_id=file_id,
+            index=index,
+            offset=aligned,
+            first_part_cut=first_part_cut,
+            last_part_cut=last_part_cut,
+            part_count=part_count,
+            chunk_size=CHUNK_SIZE,
+        ):
+            yield chunk
+
+    # --------------------------------------------------
+    # MOOV-FIRST (faststart on the fly)
+    # --------------------------------------------------
+    async def _yield_faststart(
+        self,
+        bs: ByteStreamer,
+        index: int,
+        file_id,
+        file_size: int,
+        stream_name: str,
+        message_id: int,
+    ):
+        """
+        MP4 with moov after mdat: fetch moov with a ranged read and send
+        it before mdat (chunk offsets shifted), so the cleaner can start
+        without buffering the whole file. Anything else streams as-is.
+        """
+        async def read(offset: int, length: int) -> bytes:
+            end = min(offset + length, file_size)
+            return b"".join(
+                [c async for c in self._yield_range(bs, index, file_id, offset, end)]
+            )
+
+        head = await read(0, CHUNK_SIZE)
+
+        plan = None
+        if is_mp4(head):
+            plan = await self._faststart_plan(head, file_size, read, stream_name, message_id)
+
+        if plan is None:
+            yield head
+            async for chunk in self._yield_range(
+                bs, index, file_id, len(head), file_size
+            ):
+                yield chunk
+            return
+
+        mdat_offset, moov_offset, moov = plan
+
+        LOGGER.info(
+            "[%s] message=%s moov at end, sending it first (%.1f KB)",
+            stream_name,
+            message_id,
+            len(moov) / 1024,
+        )
+
+        # boxes before mdat (ftyp, free, …)
+        if mdat_offset <= len(head):
+            yield head[:mdat_offset]
+        else:
+            yield head
+            async for chunk in self._yield_range(
+                bs, index, file_id, len(head), mdat_offset
+            ):
+                yield chunk
+
+        yield moov
+
+        for start, end in (
+            (mdat_offset, moov_offset),
+            (moov_offset + len(moov), file_size),
+        ):
+            async for chunk in self._yield_range(bs, index, file_id, start, end):
+                yield chunk
+
+    @staticmethod
+    async def _faststart_plan(head, file_size, read, stream_name, message_id):
+        """
+        (mdat offset, moov offset, patched moov), or None when the file
+        is already faststart / not worth rewriting.
+        """
+        try:
+            boxes = await top_level_boxes(head, file_size, read)
+        except ProbeError as e:
+            LOGGER.warning(
+                "[%s] message=%s box walk failed (%s), streaming as-is",
+                stream_name,
+                message_id,
+                e,
+            )
+            return None
+
+        mdat = next((b for b in boxes if b[0] == b"mdat"), None)
+        moov = next((b for b in boxes if b[0] == b"moov"), None)
+
+        if mdat is None or moov is None or moov[1] < mdat[1]:
+            return None
+
+        _, moov_offset, moov_size = moov
+        if moov_size > MOOV_MAX_BYTES:
+            LOGGER.warning(
+                "[%s] message=%s moov too large (%s bytes), streaming as-is",
+                stream_name,
+                message_id,
+                moov_size,
+            )
+            return None
+
+        raw_moov = await read(moov_offset, moov_size)
+        if len(raw_moov) != moov_size:
+            return None
+
+        patched = shift_chunk_offsets(raw_moov, moov_size)
+        if patched is None:
+            LOGGER.warning(
+                "[%s] message=%s stco overflow, streaming as-is",
+                stream_name,
+                message_id,
+            )
+            return None
+
+        return mdat[1], moov_offset, patched
+
     # --------------------------------------------------
     # STOP (ByteStreamer cleanup)
     # --------------------------------------------------
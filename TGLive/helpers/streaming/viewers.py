@@ -0,0 +1,47 @@
+import time
+import asyncio
+from typing import Dict, Set
+
+from TGLive import get_logger
+
+LOGGER = get_logger(__name__)
+
+
+class ViewerTracker:
+    """
+    Last request time per stream, for LAZY_STREAMS.
+
+    The web handlers touch a stream on every playlist / segment / TS
+    request; a channel nobody touched for LAZY_IDLE_MINUTES is parked by
+    its runner and woken by the next touch.
+    """
+
+    def __init__(self):
+        self._seen: Dict[str, float] = {}
+        self._wake: Dict[str, asyncio.Event] = {}
+        self.parked: Set[str] = set()
+
+    def touch(self, stream_name: str):
+        self._seen[stream_name] = time.monotonic()
+        event = self._wake.get(stream_name)
+        if event is not None:
+            event.set()
+
+    def idle_for(self, stream_name: str) -> float:
+        seen = self._seen.get(stream_name)
+        if seen is None:
+            return float("inf")
+        return time.monotonic() - seen
+
+    async def wait_for_viewer(self, stream_name: str):
+        event = self._wake.setdefault(stream_name, asyncio.Event())
+        event.clear()
+
+        self.parked.add(stream_name)
+        try:
+            await event.wait()
+        finally:
+            self.parked.discard(stream_name)
+
+
+VIEWERS = ViewerTracker()
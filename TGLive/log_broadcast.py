@@ -0,0 +1,100 @@
+import asyncio
+import logging
+import threading
+from collections import deque
+from itertools import islice
+from typing import Deque, List, Optional, Tuple
+
+# (seq, levelno, logger name, formatted line)
+LogEntry = Tuple[int, int, str, str]
+
+
+class LogBroadcaster(logging.Handler):
+    """
+    Keeps the last `capacity` formatted records in memory and wakes every
+    /live-logs subscriber once per batch, instead of each client polling
+    log.txt on its own.
+
+    emit() may run on any thread (QueueListener, executor threads); the
+    subscribers are woken on the event loop they registered from.
+    """
+
+    def __init__(self, capacity: int):
+        super().__init__()
+        self.records: Deque[LogEntry] = deque(maxlen=capacity)
+        self.next_seq = 0
+
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._event: Optional[asyncio.Event] = None
+        self._wake_pending = False
+        self.subscribers = 0
+
+    # --------------------------------------------------
+    # HANDLER
+    # --------------------------------------------------
+    def emit(self, record: logging.LogRecord):
+        try:
+            line = self.format(record)
+        except Exception:
+            self.handleError(record)
+            return
+
+        with self._lock:
+            self.records.append((self.next_seq, record.levelno, record.name, line))
+            self.next_seq += 1
+
+            if not self.subscribers or self._wake_pending or self._loop is None:
+                return
+            self._wake_pending = True
+            loop = self._loop
+
+        try:
+            loop.call_soon_threadsafe(self._wake)
+        except RuntimeError:
+            # loop closed during shutdown
+            pass
+
+    def _wake(self):
+        with self._lock:
+            self._wake_pending = False
+        event, self._event = self._event, asyncio.Event()
+        event.set()
+
+    # --------------------------------------------------
+    # SUBSCRIBERS
+    # --------------------------------------------------
+    def subscribe(self):
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+            self._event = asyncio.Event()
+        self.subscribers += 1
+
+    def unsubscribe(self):
+        self.subscribers = max(0, self.subscribers - 1)
+
+    @property
+    def oldest_seq(self) -> int:
+        with self._lock:
+            return self.records[0][0] if self.records else self.next_seq
+
+    def backlog_cursor(self, count: int) -> int:
+        return max(self.oldest_seq, self.next_seq - count)
+
+    async def read(self, cursor: int, timeout: float) -> Tuple[List[LogEntry], int, bool]:
+        """
+        (entries from cursor on, next cursor, whether records were lost
+        because the client fell behind the buffer).
+        """
+        if cursor >= self.next_seq:
+            try:
+                await asyncio.wait_for(self._event.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                return [], cursor, False
+
+        with self._lock:
+            oldest = self.records[0][0] if self.records else self.next_seq
+            lost = cursor < oldest
+            start = max(0, cursor - oldest)
+            entries = list(islice(self.records, start, None))
+            return entries, self.next_seq, lost
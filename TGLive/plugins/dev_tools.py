@@ -12,10 +12,32 @@ from pyrogram.enums.parse_mode import ParseMode
 
 from TGLive.helpers.ext_utils.custom_filter import CustomFilters
 
-from TGLive import get_logger
+import logging
+
+from TGLive import get_logger, set_log_level
+from TGLive.helpers.process.registry import FFMPEG_PROCS
 
 LOGGER = get_logger(__name__)
 
+TELEGRAM_LIMIT = 4096
+
+
+def join_lines(lines, limit=TELEGRAM_LIMIT):
+    """
+    Join whole lines up to Telegram's message limit. Cutting the joined
+    text could split an HTML tag or entity, so lines are dropped instead.
+    """
+    marker = "\n…"
+    out, size = [], 0
+    for i, line in enumerate(lines):
+        # the last line needs no room for the marker
+        room = limit if i == len(lines) - 1 else limit - len(marker)
+        if size + len(line) + (1 if out else 0) > room:
+            return "\n".join(out) + marker
+        size += len(line) + (1 if out else 0)
+        out.append(line)
+    return "\n".join(out)
+
 
 # ==========================================================
 #                     SHELL COMMAND
@@ -154,6 +176,73 @@ async def eval_handler(client, message):
         await status_message.delete()
 
 
+# ==========================================================
+#                    FFMPEG PROCESSES
+# ==========================================================
+@Client.on_message(filters.command(["procs"]) & CustomFilters.owner)
+async def procs_handler(client, message):
+    snapshot = FFMPEG_PROCS.snapshot()
+    if not snapshot:
+        await message.reply_text("No ffmpeg processes running.")
+        return
+
+    lines = ["<b>🎞 FFmpeg processes</b>\n"]
+    for stream, t in sorted(FFMPEG_PROCS.totals().items()):
+        lines.append(
+            f"<b>{html.escape(stream)}</b>: {t['procs']} procs | "
+            f"<code>{t['cpu_percent']}%</code> CPU | "
+            f"<code>{t['rss_mb']} MB</code>"
+        )
+
+    lines.append("")
+    for p in snapshot:
+        lines.append(
+            f"<code>{p['pid']}</code> {html.escape(p['stream'])}/{p['role']} | "
+            f"{p['cpu_percent']}% | {p['rss_mb']} MB | "
+            f"r {p['read_mb']} / w {p['write_mb']} MB"
+        )
+
+    await message.reply_text(join_lines(lines), parse_mode=ParseMode.HTML)
+
+
+# ==========================================================
+#                      LOG LEVELS
+# ==========================================================
+@Client.on_message(filters.command(["loglevel"]) & CustomFilters.owner)
+async def loglevel_handler(client, message):
+    args = message.command[1:]
+
+    if not args:
+        loggers = [("root", logging.getLogger())] + sorted(
+            (name, logger)
+            for name, logger in logging.root.manager.loggerDict.items()
+            if isinstance(logger, logging.Logger) and logger.level != logging.NOTSET
+        )
+        lines = ["<b>📝 Log levels</b>\n"]
+        for name, logger in loggers:
+            lines.append(
+                f"<code>{html.escape(name)}</code>: "
+                f"{logging.getLevelName(logger.level)}"
+            )
+        lines.append("\nUsage: <code>/loglevel [logger] LEVEL</code>")
+        await message.reply_text(join_lines(lines), parse_mode=ParseMode.HTML)
+        return
+
+    name, level = ("root", args[0]) if len(args) == 1 else (args[0], args[1])
+
+    try:
+        value = set_log_level(name, level)
+    except ValueError as e:
+        await message.reply_text(f"❌ {html.escape(str(e))}", parse_mode=ParseMode.HTML)
+        return
+
+    LOGGER.warning("log level of %s set to %s", name, logging.getLevelName(value))
+    await message.reply_text(
+        f"✅ <code>{html.escape(name)}</code> → {logging.getLevelName(value)}",
+        parse_mode=ParseMode.HTML,
+    )
+
+
 # ==========================================================
 #                   ASYNC EXECUTOR
 # ==========================================================
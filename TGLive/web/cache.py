@@ -0,0 +1,134 @@
+import os
+import time
+import asyncio
+import hashlib
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional, Tuple
+
+from aiohttp import web
+
+
+class CachedFile:
+    __slots__ = ("body", "mtime_ns", "etag", "checked_at")
+
+    def __init__(self, body: bytes, mtime_ns: int):
+        self.body = body
+        self.mtime_ns = mtime_ns
+        self.etag = make_etag(body)
+        self.checked_at = time.monotonic()
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=8).hexdigest() + '"'
+
+
+class PlaylistCache:
+    """
+    Playlist bodies held in memory.
+
+    A path is re-checked (one stat, plus a read only when the mtime moved)
+    at most once per `ttl`; concurrent requests during a refresh share
+    the same in-flight task instead of hitting the disk each.
+
+    Playlists are validated by ETag only: Last-Modified has one-second
+    resolution and a live playlist changes more often than that.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._files: Dict[str, CachedFile] = {}
+        # path -> (refresh task, monotonic time it started)
+        self._inflight: Dict[str, Tuple[asyncio.Future, float]] = {}
+
+    async def get(self, path: str, since: Optional[float] = None) -> Optional[CachedFile]:
+        """
+        `since` (monotonic) asks for a copy checked no earlier than that,
+        for callers that were told the file changed (LL-HLS reloads).
+        They still share one refresh per publish instead of each
+        hitting the disk.
+        """
+        cached = self._files.get(path)
+        if cached:
+            if since is not None:
+                if cached.checked_at >= since:
+                    return cached
+            elif time.monotonic() - cached.checked_at < self.ttl:
+                return cached
+
+        inflight = self._inflight.get(path)
+        if inflight is None or (since is not None and inflight[1] < since):
+            started = time.monotonic()
+            future = asyncio.ensure_future(self._refresh(path, cached, started))
+            self._inflight[path] = (future, started)
+            future.add_done_callback(
+                lambda _, f=future: self._drop_inflight(path, f)
+            )
+        else:
+            future = inflight[0]
+
+        return await asyncio.shield(future)
+
+    def _drop_inflight(self, path: str, future: asyncio.Future):
+        inflight = self._inflight.get(path)
+        if inflight is not None and inflight[0] is future:
+            del self._inflight[path]
+
+    async def _refresh(
+        self, path: str, cached: Optional[CachedFile], started: float
+    ) -> Optional[CachedFile]:
+        result = await asyncio.to_thread(self._load, path, cached)
+        if result is None:
+            self._files.pop(path, None)
+        else:
+            # valid as of when the stat began, not when it returned
+            result.checked_at = started
+            self._files[path] = result
+        return result
+
+    @staticmethod
+    def _load(path: str, cached: Optional[CachedFile]) -> Optional[CachedFile]:
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+            if cached and cached.mtime_ns == mtime_ns:
+                return cached
+            with open(path, "rb") as f:
+                return CachedFile(f.read(), mtime_ns)
+        except FileNotFoundError:
+            return None
+
+
+def not_modified(request: web.Request, etag: str, last_modified: Optional[str]) -> bool:
+    """
+    Conditional GET: If-None-Match wins over If-Modified-Since.
+    """
+    inm = request.headers.get("If-None-Match")
+    if inm is not None:
+        return etag in [t.strip() for t in inm.split(",")] or inm.strip() == "*"
+
+    ims = request.headers.get("If-Modified-Since")
+    if ims and last_modified:
+        try:
+            return parsedate_to_datetime(last_modified) <= parsedate_to_datetime(ims)
+        except (TypeError, ValueError):
+            return False
+
+    return False
+
+
+def cached_response(
+    request: web.Request,
+    body: bytes,
+    content_type: str,
+    cache_control: str,
+    etag: Optional[str] = None,
+    last_modified: Optional[str] = None,
+) -> web.Response:
+    etag = etag or make_etag(body)
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if last_modified:
+        headers["Last-Modified"] = last_modified
+
+    if not_modified(request, etag, last_modified):
+        return web.Response(status=304, headers=headers)
+
+    return web.Response(body=body, content_type=content_type, headers=headers)
@@ -1,5 +1,14 @@
+import aiohttp
 from aiohttp import web
 
+from TGLive import Telegram
+from TGLive.helpers.metrics import HTTP_REQUESTS, HTTP_BYTES
+from .ratelimit import LIMITER, RATE_LIMITED, client_ip
+
+KNOWN_STREAMS = {
+    f"stream{idx}" for idx in range(1, len(Telegram.STREAM_DB_IDS) + 1)
+} | {"vod"}
+
 @web.middleware
 async def cors_middleware(request, handler):
     if request.method == "OPTIONS":
@@ -11,3 +20,101 @@ async def cors_middleware(request, handler):
     response.headers["Access-Control-Allow-Methods"] = "GET, OPTIONS"
     response.headers["Access-Control-Allow-Headers"] = "*"
     return response
+
+
+def _stream_label(request) -> tuple:
+    """
+    (stream, route) labels; anything else is bucketed so the label set
+    stays small.
+    """
+    parts = request.path.strip("/").split("/")
+    route = parts[0] if parts[0] in ("hls", "live", "vod") else "other"
+
+    stream = "-"
+    if route == "hls" and len(parts) > 1:
+        stream = parts[1]
+    elif route == "live" and len(parts) > 1:
+        stream = parts[1].rsplit(".", 1)[0]
+    elif route == "vod":
+        stream = "vod"
+
+    if stream not in KNOWN_STREAMS:
+        stream = "-"
+    return stream, route
+
+
+async def _send(request, response) -> int:
+    """
+    Send the response now (prepare is idempotent, so aiohttp finishing
+    it again is a no-op) and return the body bytes written.
+    """
+    try:
+        await response.prepare(request)
+        await response.write_eof()
+    except (ConnectionResetError, aiohttp.ClientConnectionResetError):
+        pass
+
+    sent = response.content_length
+    if sent is None:
+        sent = response.body_length
+    return sent
+
+
+@web.middleware
+async def metrics_middleware(request, handler):
+    stream, route = _stream_label(request)
+
+    try:
+        response = await handler(request)
+    except web.HTTPException as e:
+        HTTP_REQUESTS.inc(stream, route, str(e.status))
+        raise
+
+    # send it here so the bytes actually written can be counted
+    sent = await _send(request, response)
+
+    HTTP_REQUESTS.inc(stream, route, str(response.status))
+    HTTP_BYTES.inc(stream, route, amount=sent)
+    return response
+
+
+@web.middleware
+async def ratelimit_middleware(request, handler):
+    """
+    Refuses over-limit clients before any handler work (tiny 429 /
+    503), counts connections per IP, and charges the bytes sent to the
+    IP, stream and global bandwidth buckets.
+    """
+    if not Telegram.RATE_LIMIT_ENABLED or request.method == "OPTIONS":
+        return await handler(request)
+
+    ip = client_ip(request)
+    stream, _ = _stream_label(request)
+
+    refused = LIMITER.admit(ip, stream)
+    if refused is not None:
+        scope, reason, retry_after = refused
+        RATE_LIMITED.inc(scope, reason)
+        return web.Response(
+            status=429,
+            text="Rate limited",
+            headers={
+                "Retry-After": str(max(1, round(retry_after))),
+                "Access-Control-Allow-Origin": "*",
+            },
+        )
+
+    request["ratelimit"] = (ip, stream)
+    LIMITER.connections[ip] = LIMITER.connections.get(ip, 0) + 1
+    try:
+        response = await handler(request)
+        sent = await _send(request, response)
+    finally:
+        LIMITER.connections[ip] -= 1
+        if LIMITER.connections[ip] <= 0:
+            del LIMITER.connections[ip]
+
+    # streamed handlers charged themselves while writing
+    if not request.get("ratelimit_streamed"):
+        LIMITER.charge(ip, stream, sent)
+    return response
@@ -1,33 +1,32 @@
 from aiohttp import web
-from TGLive import Telegram
+from TGLive.helpers.playlist.guide import CHANNEL_GUIDE
+from .cache import cached_response
 
-DEFAULT_QUALITY = "720p"
+GUIDE_CACHE_CONTROL = "public, max-age=60"
 
 
 async def playlist_handler(request: web.Request):
     """
     IPTV-style M3U playlist (EXTINF)
-    Generated from STREAM_DB_IDS
+    Generated from STREAM_DB_IDS, with channel names and tvg-* tags
     """
     base_url = f"{request.scheme}://{request.host}"
 
-    lines = ["#EXTM3U"]
-
-    for idx, _chat_id in enumerate(Telegram.STREAM_DB_IDS, start=1):
-        stream_name = f"stream{idx}"
-
-        tvg_id = f"{stream_name}@TG"
-        name = stream_name
-        quality = DEFAULT_QUALITY
+    return cached_response(
+        request,
+        CHANNEL_GUIDE.m3u(base_url),
+        "application/vnd.apple.mpegurl",
+        GUIDE_CACHE_CONTROL,
+    )
 
-        lines.append(
-            f'#EXTINF:-1 tvg-id="{tvg_id}",{name} ({quality})'
-        )
-        lines.append(
-            f"{base_url}/hls/{stream_name}/live.m3u8"
-        )
 
-    return web.Response(
-        text="\n".join(lines) + "\n",
-        content_type="application/vnd.apple.mpegurl",
+async def epg_handler(request: web.Request):
+    """
+    XMLTV guide matching the tvg-id of /playlist.m3u
+    """
+    return cached_response(
+        request,
+        await CHANNEL_GUIDE.epg(),
+        "application/xml",
+        GUIDE_CACHE_CONTROL,
     )
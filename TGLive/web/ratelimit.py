@@ -0,0 +1,234 @@
+import os
+import time
+import asyncio
+from typing import Dict, Optional, Tuple
+
+from aiohttp import web
+
+from TGLive import get_logger, Telegram
+from TGLive.helpers.metrics import METRICS
+
+LOGGER = get_logger(__name__)
+
+RATE_LIMITED = METRICS.counter(
+    "tglive_ratelimit_rejected_total", "Requests refused by the rate limiter", ("scope", "reason")
+)
+THROTTLE_SECONDS = METRICS.counter(
+    "tglive_ratelimit_throttle_seconds_total", "Time streamed responses were held back", ("scope",)
+)
+
+# idle, full buckets are dropped after this long
+BUCKET_IDLE = 300
+PRUNE_INTERVAL = 60
+# a streamed response never sleeps longer than this per write
+MAX_THROTTLE = 5.0
+
+
+class TokenBucket:
+    """
+    `rate` tokens per second, up to `burst`. Bandwidth buckets may go
+    into debt (a response is charged after it was sent); new requests
+    are refused until the debt is paid back.
+    """
+
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, amount: float = 1) -> float:
+        """
+        0 if taken, else seconds until `amount` would be available.
+        """
+        self._refill()
+        if self.tokens >= amount:
+            self.tokens -= amount
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def charge(self, amount: float):
+        self._refill()
+        self.tokens -= amount
+
+    def debt(self) -> float:
+        """
+        Seconds until the bucket is out of debt.
+        """
+        self._refill()
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    @property
+    def idle(self) -> bool:
+        elapsed = time.monotonic() - self.updated
+        return elapsed > BUCKET_IDLE and self.tokens + elapsed * self.rate >= self.burst
+
+
+class RateLimiter:
+    """
+    Token buckets for requests and bytes, per client IP and per stream,
+    plus one global egress bucket that only throttles streamed bodies.
+    A limit of 0 disables that bucket.
+
+    Buckets are plain dict entries touched on the event loop; idle ones
+    are pruned so scrapers rotating addresses cannot grow them forever.
+    """
+
+    def __init__(self):
+        self.ip_requests: Dict[str, TokenBucket] = {}
+        self.stream_requests: Dict[str, TokenBucket] = {}
+        self.ip_bytes: Dict[str, TokenBucket] = {}
+        self.stream_bytes: Dict[str, TokenBucket] = {}
+        self.connections: Dict[str, int] = {}
+
+        mbps = Telegram.EGRESS_LIMIT_MBPS
+        self.egress = TokenBucket(mbps * 125_000, mbps * 125_000) if mbps else None
+        self.exempt = set(Telegram.RATE_LIMIT_EXEMPT)
+        self._pruned = time.monotonic()
+
+    # --------------------------------------------------
+    # BUCKETS
+    # --------------------------------------------------
+    @staticmethod
+    def _bucket(table: Dict[str, TokenBucket], key: str, rate: float, burst: float) -> Optional[TokenBucket]:
+        if not rate:
+            return None
+        bucket = table.get(key)
+        if bucket is None:
+            bucket = table[key] = TokenBucket(rate, max(burst, rate))
+        return bucket
+
+    def _byte_buckets(self, ip: str, stream: str):
+        kbps = Telegram.RATE_LIMIT_IP_KBPS
+        yield "ip", self._bucket(self.ip_bytes, ip, kbps * 125, kbps * 125 * 2)
+        if stream != "-":
+            kbps = Telegram.RATE_LIMIT_STREAM_KBPS
+            yield "stream", self._bucket(self.stream_bytes, stream, kbps * 125, kbps * 125 * 2)
+        yield "global", self.egress
+
+    # --------------------------------------------------
+    # ADMISSION
+    # --------------------------------------------------
+    def admit(self, ip: str, stream: str) -> Optional[Tuple[str, str, float]]:
+        """
+        None when the request may proceed, else (scope, reason, retry_after).
+        """
+        self._maybe_prune()
+
+        if ip in self.exempt:
+            return None
+
+        if Telegram.RATE_LIMIT_IP_CONNECTIONS and (
+            self.connections.get(ip, 0) >= Telegram.RATE_LIMIT_IP_CONNECTIONS
+        ):
+            return "ip", "connections", 1.0
+
+        # global egress debt only slows streamed bodies (throttle); it
+        # must not refuse every viewer's playlist and segment requests
+        for scope, bucket in self._byte_buckets(ip, stream):
+            if bucket is not None and scope != "global":
+                wait = bucket.debt()
+                if wait > 0:
+                    return scope, "bandwidth", wait
+
+        checks = [("ip", self._bucket(
+            self.ip_requests, ip,
+            Telegram.RATE_LIMIT_IP_RPS, Telegram.RATE_LIMIT_IP_BURST,
+        ))]
+        if stream != "-":
+            checks.append(("stream", self._bucket(
+                self.stream_requests, stream,
+                Telegram.RATE_LIMIT_STREAM_RPS, Telegram.RATE_LIMIT_STREAM_BURST,
+            )))
+        for scope, bucket in checks:
+            if bucket is not None:
+                wait = bucket.take()
+                if wait > 0:
+                    return scope, "requests", wait
+
+        return None
+
+    def charge(self, ip: str, stream: str, sent: int):
+        if ip in self.exempt or not sent:
+            return
+        for _, bucket in self._byte_buckets(ip, stream):
+            if bucket is not None:
+                bucket.charge(sent)
+
+    async def throttle(self, ip: str, stream: str, sent: int):
+        """
+        Charge `sent` bytes and hold a streamed response back until its
+        buckets are out of debt.
+        """
+        if ip in self.exempt:
+            return
+        wait = 0.0
+        scope = None
+        for name, bucket in self._byte_buckets(ip, stream):
+            if bucket is not None:
+                bucket.charge(sent)
+                if bucket.debt() > wait:
+                    wait, scope = bucket.debt(), name
+        if wait > 0:
+            wait = min(wait, MAX_THROTTLE)
+            THROTTLE_SECONDS.inc(scope, amount=wait)
+            await asyncio.sleep(wait)
+
+    # --------------------------------------------------
+    # HOUSEKEEPING
+    # --------------------------------------------------
+    def _maybe_prune(self):
+        now = time.monotonic()
+        if now - self._pruned < PRUNE_INTERVAL:
+            return
+        self._pruned = now
+        for table in (self.ip_requests, self.stream_requests, self.ip_bytes, self.stream_bytes):
+            for key in [k for k, b in table.items() if b.idle]:
+                del table[key]
+
+
+LIMITER = RateLimiter()
+
+if (
+    Telegram.RATE_LIMIT_ENABLED
+    and not Telegram.RATE_LIMIT_TRUST_PROXY
+    and "DYNO" in os.environ
+):
+    LOGGER.warning(
+        "RATE_LIMIT_ENABLED on Heroku without RATE_LIMIT_TRUST_PROXY: "
+        "all viewers share the router's address and one bucket"
+    )
+
+
+def client_ip(request: web.Request) -> str:
+    """
+    Proxies append the address they saw, so only the rightmost
+    RATE_LIMIT_PROXY_HOPS entries are trustworthy; anything left of
+    them is whatever the client sent.
+    """
+    if Telegram.RATE_LIMIT_TRUST_PROXY:
+        forwarded = [
+            h.strip()
+            for h in request.headers.get("X-Forwarded-For", "").split(",")
+            if h.strip()
+        ]
+        if forwarded:
+            return forwarded[-min(Telegram.RATE_LIMIT_PROXY_HOPS, len(forwarded))]
+    return request.remote or "-"
+
+
+async def throttle(request: web.Request, sent: int):
+    """
+    For handlers that stream (live TS, VOD): call after each write.
+    """
+    key = request.get("ratelimit")
+    if key is not None:
+        request["ratelimit_streamed"] = True
+        await LIMITER.throttle(*key, sent)
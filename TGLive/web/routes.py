@@ -4,8 +4,14 @@ from .views import (
     handle_hls,
     file_browser,
     stream_logs,
+    procs_status,
+    live_ts,
+    metrics,
+    streams_status,
+    streams_events,
 )
-from .playlist_route import playlist_handler
+from .playlist_route import playlist_handler, epg_handler
+from .vod import vod_handler
 
 def setup_routes(app: web.Application):
     app.router.add_get("/", status_page)
@@ -13,3 +19,10 @@ def setup_routes(app: web.Application):
     app.router.add_get("/explorer", file_browser)
     app.router.add_get("/live-logs", stream_logs)
     app.router.add_get("/playlist.m3u", playlist_handler)
+    app.router.add_get("/epg.xml", epg_handler)
+    app.router.add_get("/api/procs", procs_status)
+    app.router.add_get("/api/streams", streams_status)
+    app.router.add_get("/api/streams/events", streams_events)
+    app.router.add_get("/live/{stream}.ts", live_ts)
+    app.router.add_get("/vod/{chat_id}/{message_id}", vod_handler)
+    app.router.add_get("/metrics", metrics)
@@ -1,10 +1,15 @@
 from aiohttp import web
 from .routes import setup_routes
-from .middleware import cors_middleware
+from .middleware import cors_middleware, metrics_middleware, ratelimit_middleware
+from .vod import VOD_STREAMER
 
 
 def create_app():
-    app = web.Application(middlewares=[cors_middleware])
+    # metrics / rate limit outside CORS: they send the response after
+    # the CORS headers are set
+    app = web.Application(
+        middlewares=[metrics_middleware, ratelimit_middleware, cors_middleware]
+    )
     setup_routes(app)
     return app
 
@@ -22,4 +27,5 @@ async def start_server(port: int = 8000):
 
 async def stop_server(runner: web.AppRunner):
     if runner is not None:
-        await runner.cleanup()
\ No newline at end of file
+        await runner.cleanup()
+    await VOD_STREAMER.stop()
\ No newline at end of file
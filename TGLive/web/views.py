@@ -1,8 +1,23 @@
 import os
+import re
+import json
 import asyncio
+import logging
 import aiohttp
 from aiohttp import web
 from html import escape
+from email.utils import formatdate
+
+from TGLive import Telegram, LOG_BROADCASTER
+from TGLive.helpers.encoding.store import SEGMENT_STORES, PLAYLIST_NOTIFIERS
+from TGLive.helpers.process.registry import FFMPEG_PROCS
+from TGLive.helpers.streaming.fanout import TS_RINGS, get_ts_ring
+from TGLive.helpers.streaming.viewers import VIEWERS
+from TGLive.helpers.streaming.state import STREAM_STATES
+from TGLive.helpers.client import ClientManager
+from TGLive.helpers.metrics import METRICS
+from .cache import PlaylistCache, cached_response
+from .ratelimit import throttle
 
 
 
@@ -12,6 +27,35 @@ PROJECT_ROOT = os.path.abspath(
 
 HLS_ROOT = os.path.abspath("hls")
 
+HLS_CONTENT_TYPES = {
+    ".m3u8": "application/x-mpegURL",
+    ".ts": "video/mp2t",
+    ".m4s": "video/iso.segment",
+    ".mp4": "video/mp4",
+    ".mpd": "application/dash+xml",
+}
+
+PLAYLIST_EXTS = {".m3u8", ".mpd"}
+
+# hls/ is wiped on boot and numbering restarts at 1.ts, so a segment
+# name is only cacheable while it can still be in the window (no immutable)
+SEGMENT_MAX_AGE = min(
+    Telegram.HLS_SEGMENT_MAX_AGE,
+    int(Telegram.HLS_TIME * (Telegram.HLS_LIST_SIZE + 2)),
+)
+SEGMENT_CACHE_CONTROL = f"public, max-age={SEGMENT_MAX_AGE}"
+PLAYLIST_CACHE_CONTROL = "public, max-age=1"
+
+# live playlists served from memory, re-checked at most every TTL
+PLAYLISTS = PlaylistCache(ttl=Telegram.HLS_PLAYLIST_TTL)
+
+STREAM_NAMES = {
+    f"stream{idx}" for idx in range(1, len(Telegram.STREAM_DB_IDS) + 1)
+}
+
+# LL-HLS partial segment: <msn>.<part>.ts
+PART_NAME = re.compile(r"^(\d+)\.(\d+)\.ts$")
+
 
 
 
@@ -21,6 +65,112 @@ async def status_page(request: web.Request) -> web.Response:
 
 
 
+async def procs_status(request: web.Request) -> web.Response:
+    """
+    Tracked ffmpeg processes with their last CPU/RSS/IO sample.
+    """
+    return web.json_response(
+        {
+            "processes": FFMPEG_PROCS.snapshot(),
+            "streams": FFMPEG_PROCS.totals(),
+        }
+    )
+
+
+
+
+async def streams_status(request: web.Request) -> web.Response:
+    """
+    Per-stream state: video, progress, rate, buffer, worker, ffmpeg pids.
+    """
+    return web.json_response({"streams": STREAM_STATES.snapshot()})
+
+
+async def streams_events(request: web.Request) -> web.StreamResponse:
+    """
+    SSE feed of /api/streams: pushed on video / status changes and at
+    most once a second otherwise, only when something moved.
+    """
+    response = web.StreamResponse(
+        headers={
+            "Content-Type": "text/event-stream",
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+        }
+    )
+    await response.prepare(request)
+
+    last = None
+    idle = 0
+    try:
+        while True:
+            body = json.dumps(STREAM_STATES.snapshot(), separators=(",", ":"))
+            if body != last:
+                payload = f"event: streams\ndata: {body}\n\n"
+                last, idle = body, 0
+            elif idle >= 15:
+                payload, idle = ": keepalive\n\n", 0
+            else:
+                payload = None
+                idle += 1
+
+            if payload:
+                await asyncio.wait_for(
+                    response.write(payload.encode("utf-8")),
+                    timeout=10,
+                )
+            await STREAM_STATES.wait(timeout=1.0)
+    except (
+        asyncio.TimeoutError,
+        ConnectionResetError,
+        aiohttp.ClientConnectionResetError,
+    ):
+        pass
+
+    return response
+
+
+# scrape-time gauges
+METRICS.gauge(
+    "tglive_client_work_load",
+    "Transfers in flight per Telegram client",
+    ("client",),
+    collect=lambda: {(str(i),): v for i, v in ClientManager.work_loads.items()},
+)
+METRICS.gauge(
+    "tglive_ffmpeg_processes",
+    "Tracked ffmpeg processes",
+    ("stream",),
+    collect=lambda: {(s,): t["procs"] for s, t in FFMPEG_PROCS.totals().items()},
+)
+METRICS.gauge(
+    "tglive_ffmpeg_cpu_percent",
+    "ffmpeg CPU percent per stream (last sample)",
+    ("stream",),
+    collect=lambda: {(s,): t["cpu_percent"] for s, t in FFMPEG_PROCS.totals().items()},
+)
+METRICS.gauge(
+    "tglive_ts_fanout_clients",
+    "Connected /live/<stream>.ts clients",
+    ("stream",),
+    collect=lambda: {(s,): r.clients for s, r in TS_RINGS.items()},
+)
+METRICS.gauge(
+    "tglive_stream_parked",
+    "1 while a lazy channel is parked",
+    ("stream",),
+    collect=lambda: {(s,): int(s in VIEWERS.parked) for s in STREAM_NAMES},
+)
+
+
+async def metrics(request: web.Request) -> web.Response:
+    return web.Response(
+        text=METRICS.render(),
+        content_type="text/plain",
+        headers={"Cache-Control": "no-store"},
+    )
+
+
 async def handle_hls(request: web.Request) -> web.StreamResponse:
     rel_path = request.match_info.get("path", "").lstrip("/")
 
@@ -28,29 +178,178 @@ async def handle_hls(request: web.Request) -> web.StreamResponse:
     if ".." in rel_path:
         return web.Response(status=400, text="Invalid path")
 
+    stream_name, _, name = rel_path.partition("/")
+    ext = os.path.splitext(name)[1]
+
+    if stream_name in STREAM_NAMES:
+        VIEWERS.touch(stream_name)
+
+    notifier = PLAYLIST_NOTIFIERS.get(stream_name)
+    if notifier is not None:
+        blocked = await wait_for_live_edge(request, notifier, name)
+        if blocked is not None:
+            return blocked
+
     abs_path = os.path.abspath(os.path.join(HLS_ROOT, rel_path))
 
     if not abs_path.startswith(HLS_ROOT):
         return web.Response(status=403, text="Access denied")
 
+    if Telegram.LAZY_STREAMS and ext in PLAYLIST_EXTS and stream_name in STREAM_NAMES:
+        await wait_for_playlist(stream_name, name, abs_path)
+
+    # ABR renditions (<stream>/<rendition>/...) are always on disk
+    store = SEGMENT_STORES.get(stream_name)
+    if store is not None and "/" not in name:
+        return serve_from_memory(request, store, name)
+
+    if ext in PLAYLIST_EXTS:
+        # a blocking reload was just released: needs a copy read after the
+        # publish, shared by every client that publish woke
+        since = None
+        if notifier is not None and "_HLS_msn" in request.query:
+            since = notifier.published_at
+        cached = await PLAYLISTS.get(abs_path, since=since)
+        if cached is None:
+            return web.Response(status=404, text="File not found")
+        return cached_response(
+            request,
+            cached.body,
+            HLS_CONTENT_TYPES[ext],
+            PLAYLIST_CACHE_CONTROL,
+            etag=cached.etag,
+        )
+
     if not os.path.exists(abs_path):
         return web.Response(status=404, text="File not found")
 
-    if abs_path.endswith(".m3u8"):
-        return web.FileResponse(
-            abs_path,
-            headers={"Content-Type": "application/x-mpegURL"},
-        )
+    # FileResponse answers If-None-Match / If-Modified-Since itself
+    headers = {"Cache-Control": SEGMENT_CACHE_CONTROL}
+    content_type = HLS_CONTENT_TYPES.get(ext)
+    if content_type:
+        headers["Content-Type"] = content_type
 
-    if abs_path.endswith(".ts"):
-        return web.FileResponse(
-            abs_path,
-            headers={"Content-Type": "video/mp2t"},
-        )
+    return web.FileResponse(abs_path, headers=headers)
 
-    return web.FileResponse(abs_path)
 
 
+async def live_ts(request: web.Request) -> web.StreamResponse:
+    """
+    Continuous MPEG-TS of a channel, fanned out from one shared ring.
+    """
+    stream_name = request.match_info["stream"]
+    if stream_name not in STREAM_NAMES:
+        return web.Response(status=404, text="Unknown stream")
+
+    VIEWERS.touch(stream_name)
+    ring = get_ts_ring(stream_name)
+    if ring.clients >= Telegram.TS_FANOUT_MAX_CLIENTS:
+        return web.Response(status=503, text="Too many viewers")
+
+    response = web.StreamResponse(
+        headers={
+            "Content-Type": "video/mp2t",
+            "Cache-Control": "no-cache",
+        }
+    )
+    await response.prepare(request)
+
+    ring.clients += 1
+    cursor = None
+    try:
+        while True:
+            chunks, cursor = await ring.read(cursor, timeout=Telegram.HLS_TIME * 5)
+            VIEWERS.touch(stream_name)
+            if not chunks:
+                continue
+            # a client that can't take data in time is dropped, never waited on
+            data = b"".join(chunks)
+            await asyncio.wait_for(
+                response.write(data),
+                timeout=Telegram.TS_FANOUT_WRITE_TIMEOUT,
+            )
+            await throttle(request, len(data))
+    except (
+        asyncio.TimeoutError,
+        ConnectionResetError,
+        aiohttp.ClientConnectionResetError,
+    ):
+        pass
+    finally:
+        ring.clients -= 1
+        if not ring.clients:
+            ring.clear()
+
+    return response
+
+
+async def wait_for_playlist(stream_name: str, name: str, abs_path: str):
+    """
+    A parked channel has no playlist until its first segment after
+    waking (a previous window, if any, is served as-is meanwhile).
+    """
+    def ready() -> bool:
+        store = SEGMENT_STORES.get(stream_name)
+        if store is not None and "/" not in name:
+            return store.get(name) is not None
+        return os.path.exists(abs_path)
+
+    deadline = asyncio.get_running_loop().time() + Telegram.LAZY_WAKE_TIMEOUT
+    while not ready() and asyncio.get_running_loop().time() < deadline:
+        await asyncio.sleep(0.25)
+
+
+async def wait_for_live_edge(request: web.Request, notifier, name: str):
+    """
+    LL-HLS blocking: playlist reloads with _HLS_msn/_HLS_part and
+    preload-hinted parts wait until the segmenter publishes them.
+    Returns an error response, or None to serve normally.
+    """
+    if name.endswith(".m3u8") and "_HLS_msn" in request.query:
+        try:
+            msn = int(request.query["_HLS_msn"])
+            part = request.query.get("_HLS_part")
+            part = int(part) if part is not None else None
+        except ValueError:
+            return web.Response(status=400, text="Invalid _HLS_msn/_HLS_part")
+
+        if msn > notifier.open_msn + 2:
+            return web.Response(status=400, text="_HLS_msn too far ahead")
+
+        if not await notifier.wait_for(msn, part, timeout=Telegram.HLS_TIME * 3):
+            return web.Response(status=503, text="Playlist not ready")
+        return None
+
+    match = PART_NAME.match(name)
+    if match:
+        msn, part = int(match.group(1)), int(match.group(2))
+        if msn <= notifier.open_msn + 1:
+            await notifier.wait_for(msn, part, timeout=Telegram.HLS_PART_TIME * 3)
+
+    return None
+
+
+def serve_from_memory(request: web.Request, store, name: str) -> web.Response:
+    body = store.get(name)
+    if body is None:
+        return web.Response(status=404, text="File not found")
+
+    ext = os.path.splitext(name)[1]
+    content_type = HLS_CONTENT_TYPES.get(ext, "application/octet-stream")
+
+    # playlists change within a second: ETag only, never If-Modified-Since
+    if ext in PLAYLIST_EXTS:
+        return cached_response(request, body, content_type, PLAYLIST_CACHE_CONTROL)
+
+    updated = store.updated_at.get(name)
+    return cached_response(
+        request,
+        body,
+        content_type,
+        SEGMENT_CACHE_CONTROL,
+        last_modified=formatdate(updated, usegmt=True) if updated else None,
+    )
+
 
 async def file_browser(request: web.Request) -> web.Response:
     rel_path = request.query.get("path", "").lstrip("/")
@@ -120,8 +419,31 @@ async def file_browser(request: web.Request) -> web.Response:
     return web.Response(status=404, text="Not found")
 
 
+def _sse_event(seq: int, line: str) -> str:
+    # one data: field per line, so tracebacks stay a single event
+    data = "".join(f"data: {part}\n" for part in line.replace("\r", "").split("\n"))
+    return f"id: {seq}\n{data}\n"
+
+
 async def stream_logs(request: web.Request) -> web.StreamResponse:
-    log_file = "log.txt"
+    """
+    SSE tail of the in-memory log buffer.
+
+    ?level=WARNING   minimum level (name or number)
+    ?logger=a,b      only loggers starting with one of these prefixes
+    ?backlog=200     records replayed on connect (Last-Event-ID resumes)
+    """
+    level = request.query.get("level", "NOTSET").upper()
+    min_level = int(level) if level.isdigit() else logging.getLevelName(level)
+    if not isinstance(min_level, int):
+        return web.Response(status=400, text="Invalid level")
+
+    prefixes = tuple(p for p in request.query.get("logger", "").split(",") if p)
+
+    try:
+        backlog = int(request.query.get("backlog", "200"))
+    except ValueError:
+        return web.Response(status=400, text="Invalid backlog")
 
     response = web.StreamResponse(
         headers={
@@ -134,28 +456,42 @@ async def stream_logs(request: web.Request) -> web.StreamResponse:
 
     await response.prepare(request)
 
-    try:
-        f = open(log_file, "r", errors="ignore")
-        f.seek(0)
-    except FileNotFoundError:
-        await response.write(b"data: log.txt not found\n\n")
-        await response.write_eof()
-        return response
+    last_id = request.headers.get("Last-Event-ID", "")
+    if last_id.isdigit():
+        cursor = int(last_id) + 1
+    else:
+        cursor = LOG_BROADCASTER.backlog_cursor(max(0, backlog))
 
+    LOG_BROADCASTER.subscribe()
     try:
+        await response.write(b"retry: 3000\n\n")
         while True:
-            line = f.readline()
-            if line:
-                try:
-                    await response.write(line.encode("utf-8"))
-                except (
-                    ConnectionResetError,
-                    aiohttp.ClientConnectionResetError,
-                ):
-                    break
-            else:
-                await asyncio.sleep(0.3)
+            entries, cursor, lost = await LOG_BROADCASTER.read(cursor, timeout=15)
+
+            out = []
+            if lost:
+                out.append("event: gap\ndata: log records were dropped\n\n")
+            for seq, levelno, name, line in entries:
+                if levelno < min_level:
+                    continue
+                if prefixes and not name.startswith(prefixes):
+                    continue
+                out.append(_sse_event(seq, line))
+            if not out:
+                # keeps proxies from closing the idle stream
+                out.append(": keepalive\n\n")
+
+            await asyncio.wait_for(
+                response.write("".join(out).encode("utf-8")),
+                timeout=10,
+            )
+    except (
+        asyncio.TimeoutError,
+        ConnectionResetError,
+        aiohttp.ClientConnectionResetError,
+    ):
+        pass
     finally:
-        f.close()
+        LOG_BROADCASTER.unsubscribe()
 
     return response
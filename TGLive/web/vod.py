@@ -0,0 +1,146 @@
+import asyncio
+from typing import Dict
+from urllib.parse import quote
+
+import aiohttp
+from aiohttp import web
+
+from TGLive import get_logger, Telegram
+from TGLive.helpers.ext_utils import FIleNotFound
+from TGLive.helpers.streaming.streamer import MultiClientStreamer
+from .ratelimit import client_ip, throttle
+
+LOGGER = get_logger(__name__)
+
+# shared with nothing on the live path: own ByteStreamer cache
+VOD_STREAMER = MultiClientStreamer()
+
+_slots = asyncio.Semaphore(Telegram.VOD_MAX_CONCURRENT)
+_per_ip: Dict[str, int] = {}
+
+
+def _busy(text: str) -> web.Response:
+    return web.Response(status=503, text=text, headers={"Retry-After": "5"})
+
+
+def _parse_range(request: web.Request, size: int):
+    """
+    (start, end) exclusive, or None for the whole file.
+    Raises ValueError on a malformed / unsatisfiable Range.
+    """
+    if "Range" not in request.headers:
+        return None
+
+    rng = request.http_range
+    start, end, _ = rng.indices(size)
+    if rng.start is None and rng.stop is None:
+        return None
+    if start >= size or end <= start:
+        raise ValueError("unsatisfiable range")
+    return start, end
+
+
+async def vod_handler(request: web.Request) -> web.StreamResponse:
+    """
+    Any video message of a configured channel, with HTTP Range (seeking).
+
+    VOD never takes a client that is already busy with
+    VOD_MAX_CLIENT_LOAD transfers, and is capped globally and per IP,
+    so the live channels keep their download capacity.
+    """
+    if not Telegram.VOD_ENABLED:
+        raise web.HTTPNotFound()
+
+    try:
+        chat_id = int(request.match_info["chat_id"])
+        message_id = int(request.match_info["message_id"])
+    except ValueError:
+        raise web.HTTPBadRequest(text="Invalid id")
+
+    if chat_id not in Telegram.STREAM_DB_IDS:
+        raise web.HTTPNotFound()
+
+    ip = client_ip(request)
+    if _per_ip.get(ip, 0) >= Telegram.VOD_MAX_PER_IP:
+        return _busy("Too many VOD requests from this address")
+    if _slots.locked():
+        return _busy("VOD capacity reached")
+
+    index = VOD_STREAMER.choose_client(max_load=Telegram.VOD_MAX_CLIENT_LOAD)
+    if index is None:
+        return _busy("All clients busy")
+
+    async with _slots:
+        _per_ip[ip] = _per_ip.get(ip, 0) + 1
+        try:
+            return await _serve(request, chat_id, message_id, index)
+        finally:
+            _per_ip[ip] -= 1
+            if _per_ip[ip] <= 0:
+                _per_ip.pop(ip, None)
+
+
+async def _serve(request: web.Request, chat_id: int, message_id: int, index: int):
+    try:
+        file_id = await VOD_STREAMER.get_file_info(chat_id, message_id, index=index)
+    except FIleNotFound:
+        raise web.HTTPNotFound(text="Message not found")
+    except ValueError:
+        raise web.HTTPUnsupportedMediaType(text="Not a video")
+
+    size = file_id.file_size or 0
+    headers = {
+        "Accept-Ranges": "bytes",
+        "Content-Type": file_id.mime_type or "video/mp4",
+        "ETag": f'"{file_id.unique_id}"',
+        "Cache-Control": "private, max-age=3600",
+    }
+    if file_id.file_name:
+        headers["Content-Disposition"] = (
+            f"inline; filename*=UTF-8''{quote(file_id.file_name)}"
+        )
+
+    try:
+        rng = _parse_range(request, size)
+    except ValueError:
+        return web.Response(
+            status=416,
+            headers={"Content-Range": f"bytes */{size}", "Accept-Ranges": "bytes"},
+        )
+
+    # If-Range with a different validator: send the whole file
+    if rng and request.headers.get("If-Range", headers["ETag"]) != headers["ETag"]:
+        rng = None
+
+    start, end = rng or (0, size)
+    if rng:
+        headers["Content-Range"] = f"bytes {start}-{end - 1}/{size}"
+
+    response = web.StreamResponse(status=206 if rng else 200, headers=headers)
+    response.content_length = end - start
+    await response.prepare(request)
+
+    if request.method == "HEAD" or end <= start:
+        return response
+
+    stream_name = f"vod:{chat_id}"
+    LOGGER.debug(
+        "[%s] message=%s bytes=%s-%s client=%s",
+        stream_name,
+        message_id,
+        start,
+        end - 1,
+        index,
+    )
+
+    try:
+        async for chunk in VOD_STREAMER.stream_range(
+            chat_id, message_id, stream_name, start, end - start, index=index
+        ):
+            await response.write(chunk)
+            await throttle(request, len(chunk))
+    except (ConnectionResetError, aiohttp.ClientConnectionResetError):
+        # seeking players drop connections all the time
+        pass
+
+    return response